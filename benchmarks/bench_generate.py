@@ -0,0 +1,207 @@
+"""
+资源包生成基准测试
+在临时目录中合成三组素材（无需网络和图形界面），分阶段测量ResourcePackGenerator.generate的耗时：
+- tiny: 一张小纹理、示例打击特效，无音频
+- typical: 8张512px纹理、3个短打击音、30秒结束音乐、8x8示例打击特效
+- worst: 8张2048px噪声纹理、4个60秒音频、50x50示例打击特效
+
+结果可保存为JSON，并与基线比较，任一项变慢超过阈值时以退出码1结束
+
+用法:
+    python benchmarks/bench_generate.py [--repeat 3] [--corpus typical] [--output result.json]
+    python benchmarks/bench_generate.py --baseline result.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from config.constants import IMAGE_MAPPINGS
+from core.batch import default_params
+from core.resource_pack_generator import ResourcePackGenerator
+
+# 各组素材的规格
+CORPORA = {
+    'tiny': {
+        'images': ['tap_image'],
+        'image_size': 64,
+        'sounds': {},
+        'fx_grid': 4,
+        'fx_frame': 32
+    },
+    'typical': {
+        'images': list(IMAGE_MAPPINGS),
+        'image_size': 512,
+        'sounds': {'tap_sound': 0.3, 'drag_sound': 0.3, 'flick_sound': 0.3, 'end_music': 30.0},
+        'fx_grid': 8,
+        'fx_frame': 128
+    },
+    'worst': {
+        'images': list(IMAGE_MAPPINGS),
+        'image_size': 2048,
+        'sounds': {'tap_sound': 60.0, 'drag_sound': 60.0, 'flick_sound': 60.0, 'end_music': 60.0},
+        'fx_grid': 50,
+        'fx_frame': 64
+    }
+}
+
+SAMPLE_RATE = 44100
+
+# 与基线比较时忽略小于该值的绝对差异（秒），避免毫秒级阶段的噪声被当成退化
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def write_image(path, size, rng):
+    """半透明渐变叠加噪声，既不会被压缩成极小的数据，也不是纯随机数据"""
+    noise = Image.frombytes('L', (size, size), rng.randbytes(size * size))
+    gradient = Image.linear_gradient('L').resize((size, size))
+    alpha = Image.radial_gradient('L').resize((size, size)).point(lambda v: 255 - v)
+    # 素材只需合成一次，用最快的压缩级别
+    Image.merge('RGBA', (noise, gradient, Image.blend(noise, gradient, 0.5), alpha)).save(path, compress_level=1)
+
+
+def write_wav(path, seconds, rng):
+    """双声道16位WAV：锯齿波加少量噪声，按整段重复的块写入"""
+    frames = int(seconds * SAMPLE_RATE)
+    noise = [rng.randint(-500, 500) for _ in range(997)]
+    # 锯齿波周期200帧、噪声周期997帧，两者的公倍数长度的块可以直接重复
+    samples = [int(8000 * ((i % 200) / 100 - 1)) + noise[i % 997] for i in range(200 * 997)]
+    block = struct.pack(f'<{len(samples) * 2}h', *[v for sample in samples for v in (sample, sample)])
+    frame_bytes = 4
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        remaining = frames * frame_bytes
+        while remaining > 0:
+            chunk = block[:remaining]
+            wav.writeframes(chunk)
+            remaining -= len(chunk)
+
+
+def build_corpus(name, spec, root):
+    """合成素材，返回生成参数"""
+    rng = random.Random(name)
+    source_dir = os.path.join(root, name)
+    os.makedirs(source_dir, exist_ok=True)
+    params = default_params()
+    params.update({
+        'name': f"bench {name}",
+        'author': 'bench',
+        'description': '',
+        'output_path': os.path.join(root, 'out'),
+        'cache_dir': None,
+        'incremental': False,
+        'fx_cols': spec['fx_grid'],
+        'fx_rows': spec['fx_grid'],
+        'fx_frame_width': spec['fx_frame'],
+        'fx_frame_height': spec['fx_frame'],
+        'fx_total_width': spec['fx_grid'] * spec['fx_frame'],
+        'fx_total_height': spec['fx_grid'] * spec['fx_frame']
+    })
+    for param_key in spec['images']:
+        path = os.path.join(source_dir, f"{param_key}.png")
+        write_image(path, spec['image_size'], rng)
+        params[param_key] = path
+    for param_key, seconds in spec['sounds'].items():
+        path = os.path.join(source_dir, f"{param_key}.wav")
+        write_wav(path, seconds, rng)
+        params[param_key] = path
+    os.makedirs(params['output_path'], exist_ok=True)
+    return params
+
+
+def run_corpus(params, repeat):
+    """重复生成，每个阶段和总耗时都取最快一次"""
+    best_total = None
+    best_stages = {}
+    zip_size = 0
+    for _ in range(repeat):
+        generator = ResourcePackGenerator(params)
+        start = time.perf_counter()
+        success, message = generator.generate()
+        total = time.perf_counter() - start
+        if not success:
+            raise RuntimeError(f"生成失败: {message}")
+        zip_size = os.path.getsize(message)
+        best_total = total if best_total is None else min(best_total, total)
+        for stage, seconds in generator.stage_timings.items():
+            best_stages[stage] = min(seconds, best_stages.get(stage, seconds))
+    return {'total': best_total, 'stages': best_stages, 'zip_bytes': zip_size}
+
+
+def compare(results, baseline, threshold):
+    """返回退化项列表 [(组, 项, 基线秒数, 当前秒数)]"""
+    regressions = []
+    for corpus, result in results.items():
+        base = baseline.get('corpora', {}).get(corpus)
+        if base is None:
+            continue
+        pairs = [('total', base['total'], result['total'])]
+        pairs += [(stage, base['stages'][stage], seconds)
+                  for stage, seconds in result['stages'].items() if stage in base['stages']]
+        for item, before, after in pairs:
+            if after - before > max(MIN_REGRESSION_SECONDS, before * threshold):
+                regressions.append((corpus, item, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="资源包生成基准测试")
+    parser.add_argument('--corpus', action='append', choices=list(CORPORA),
+                        help="只运行指定的素材组（可重复，默认全部）")
+    parser.add_argument('--repeat', type=int, default=3, help="每组重复次数，取最快一次")
+    parser.add_argument('--output', help="把结果保存为JSON文件")
+    parser.add_argument('--baseline', help="与该JSON基线比较")
+    parser.add_argument('--threshold', type=float, default=0.2, help="允许的相对退化比例（默认0.2，即20%%）")
+    args = parser.parse_args()
+
+    names = args.corpus or list(CORPORA)
+    root = tempfile.mkdtemp(prefix='phira_bench_')
+    results = {}
+    try:
+        for name in names:
+            params = build_corpus(name, CORPORA[name], root)
+            results[name] = run_corpus(params, args.repeat)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{'素材组':<10}{'总耗时(s)':>12}{'ZIP大小(KB)':>14}  各阶段耗时(s)")
+    for name, result in results.items():
+        stages = ', '.join(f"{stage} {seconds:.3f}" for stage, seconds in result['stages'].items())
+        print(f"{name:<10}{result['total']:>12.3f}{result['zip_bytes'] / 1024:>14.0f}  {stages}")
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'corpora': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for corpus, item, before, after in regressions:
+            print(f"退化: {corpus} {item} {before:.3f}s -> {after:.3f}s（+{(after / before - 1) * 100:.0f}%）")
+        if regressions:
+            sys.exit(1)
+        print(f"与基线相比没有超过 {args.threshold * 100:.0f}% 的退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+示例打击特效渲染基准测试
+对比旧的逐像素 putpixel 实现与整帧填充实现的耗时，并校验两者输出逐字节一致；
+校验构建时实际使用的write_placeholder_hit_fx_png（默认内存上限，整张图在上限之内时用Pillow编码）的输出同样逐字节一致；
+同时测量按行带流式编码的实现，校验解码后的像素与整帧填充实现一致
+
+用法:
+    python benchmarks/bench_hit_fx.py [--frame-size 64] [--repeat 3] [--skip-legacy-above 50]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from config.constants import DEFAULT_MEMORY_CEILING
+from core.memory_budget import MemoryBudget
+from core.resource_pack_generator import render_placeholder_hit_fx, write_placeholder_hit_fx_png
+
+GRID_SIZES = [8, 20, 50]
+
+
+def render_placeholder_hit_fx_legacy(total_width, total_height, frame_width, frame_height, cols, rows):
+    """旧实现：逐像素调用 putpixel，仅用于对比"""
+    fx_img = Image.new('RGBA', (total_width, total_height), (255, 255, 255, 0))
+    for row in range(rows):
+        for col in range(cols):
+            x = col * frame_width
+            y = row * frame_height
+            r = (row * 30) % 256
+            g = (col * 50) % 256
+            b = ((row + col) * 20) % 256
+            for i in range(frame_width):
+                for j in range(frame_height):
+                    fx_img.putpixel((x + i, y + j), (r, g, b, 255))
+    return fx_img
+
+
+def encode_png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_generator(total_width, total_height, frame_width, frame_height, cols, rows):
+    """构建时的编码路径（默认内存上限），返回PNG数据"""
+    buffer = io.BytesIO()
+    write_placeholder_hit_fx_png(buffer, total_width, total_height, frame_width, frame_height,
+                                 cols, rows, MemoryBudget(DEFAULT_MEMORY_CEILING))
+    return buffer.getvalue()
+
+
+def render_streamed(total_width, total_height, frame_width, frame_height, cols, rows, band_rows):
+    """按行带流式编码，返回PNG数据和缓冲区峰值"""
+    # 行带高度刻意不与帧高对齐，覆盖帧跨越行带边界的情况
+    memory = MemoryBudget(total_width * 4 * 2 * band_rows)
+    buffer = io.BytesIO()
+    write_placeholder_hit_fx_png(buffer, total_width, total_height, frame_width, frame_height,
+                                 cols, rows, memory)
+    return buffer.getvalue(), memory.peak
+
+
+def time_render(render, args, repeat):
+    """返回最快一次的耗时（秒）以及最后一次的渲染结果"""
+    best = None
+    img = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        img = render(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, img
+
+
+def main():
+    parser = argparse.ArgumentParser(description="示例打击特效渲染基准测试")
+    parser.add_argument('--frame-size', type=int, default=64, help="单帧边长（像素）")
+    parser.add_argument('--repeat', type=int, default=3, help="每种实现重复次数，取最快一次")
+    parser.add_argument('--skip-legacy-above', type=int, default=50,
+                        help="网格边长超过该值时跳过旧实现（旧实现非常慢）")
+    parser.add_argument('--band-rows', type=int, default=100, help="流式实现每个行带的行数")
+    args = parser.parse_args()
+
+    frame = args.frame_size
+    print(f"{'网格':>8} {'画布':>12} {'旧实现(s)':>12} {'新实现(s)':>12} {'加速比':>10} {'输出一致':>8}"
+          f" {'流式(s)':>10} {'行带峰值(MB)':>14} {'流式一致':>8}")
+
+    all_identical = True
+    for grid in GRID_SIZES:
+        size = grid * frame
+        grid_label = f"{grid}x{grid}"
+        canvas_label = f"{size}x{size}"
+        render_args = (size, size, frame, frame, grid, grid)
+
+        new_time, new_img = time_render(render_placeholder_hit_fx, render_args, args.repeat)
+        new_png = encode_png(new_img)
+        generator_identical = render_generator(*render_args) == new_png
+        stream_time, (stream_png, stream_peak) = time_render(
+            render_streamed, render_args + (args.band_rows,), args.repeat)
+        with Image.open(io.BytesIO(stream_png)) as stream_img:
+            stream_identical = stream_img.tobytes() == new_img.tobytes()
+        all_identical = all_identical and stream_identical and generator_identical
+        stream_columns = (f" {stream_time:>10.4f} {stream_peak / 1048576:>14.1f}"
+                          f" {'是' if stream_identical else '否':>8}")
+
+        if grid > args.skip_legacy_above:
+            print(f"{grid_label:>8} {canvas_label:>12} {'跳过':>12} {new_time:>12.4f} {'-':>10}"
+                  f" {'是' if generator_identical else '否':>8}"
+                  + stream_columns)
+            continue
+
+        # 旧实现很慢，只运行一次
+        legacy_time, legacy_img = time_render(render_placeholder_hit_fx_legacy, render_args, 1)
+        identical = (legacy_img.tobytes() == new_img.tobytes()
+                     and encode_png(legacy_img) == new_png and generator_identical)
+        all_identical = all_identical and identical
+        speedup = legacy_time / new_time if new_time else float('inf')
+        print(f"{grid_label:>8} {canvas_label:>12} {legacy_time:>12.4f} {new_time:>12.4f} "
+              f"{speedup:>9.1f}x {'是' if identical else '否':>8}" + stream_columns)
+
+    if not all_identical:
+        print("错误：各实现输出不一致")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+冷启动基准测试
+在全新的子进程中分别测量：
+- 导入核心构建模块（core.resource_pack_generator、core.batch）的耗时，以及导入后已加载的重量级依赖
+- 从进程启动到主窗口首次显示的耗时（使用offscreen平台，无需显示器）
+
+用法:
+    python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 关注的重量级依赖，检查它们是否在启动阶段被加载
+HEAVY_MODULES = ('PyQt6.QtWidgets', 'PIL.Image', 'yaml', 'numpy')
+
+IMPORT_CORE_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import core.resource_pack_generator
+import core.batch
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+FIRST_WINDOW_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from PyQt6.QtWidgets import QApplication
+from ui.main_window import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+app.processEvents()
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_script(template, repeat):
+    """在子进程中重复执行脚本，返回 (各次耗时列表, 最后一次已加载的重量级模块)"""
+    script = template.format(root=ROOT, heavy=HEAVY_MODULES)
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                                env=env, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result['seconds'])
+        loaded = result['loaded']
+    return timings, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动基准测试")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测量的子进程次数，报告最快和中位数")
+    args = parser.parse_args()
+
+    print(f"{'测量项':<16}{'最快(ms)':>12}{'中位数(ms)':>14}  已加载的重量级依赖")
+    for label, template in (("导入核心模块", IMPORT_CORE_SCRIPT), ("首个窗口显示", FIRST_WINDOW_SCRIPT)):
+        try:
+            timings, loaded = run_script(template, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{label:<16}失败: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            continue
+        timings.sort()
+        median = timings[len(timings) // 2]
+        print(f"{label:<16}{timings[0] * 1000:>12.1f}{median * 1000:>14.1f}  {', '.join(loaded) or '无'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Phira资源包生成器命令行入口
+无需图形界面，适合在构建机上批量生成资源包
+
+用法:
+    python cli.py build skin_a.yml skin_b.json --workers 4
+    python cli.py analyze MySkin_ResourcePack.zip skin_b.yml
+    python cli.py serve --port 8765 --workers 2
+    python cli.py watch skin_a.yml
+    python cli.py delta create v1.zip v2.zip -o v1-v2.delta.zip
+    python cli.py delta apply v1.zip v1-v2.delta.zip -o v2.zip
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+# 添加项目根目录到Python路径，以便正确导入模块
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config.constants import (
+    DEFAULT_CACHE_DIR, SERVICE_HOST, SERVICE_PORT, SERVICE_QUEUE_SIZE, SERVICE_WORK_DIR,
+    WATCH_POLL_INTERVAL
+)
+from core.batch import ManifestError, load_manifest, build_pack
+
+# 退出码
+EXIT_OK = 0
+EXIT_BUILD_FAILED = 1
+EXIT_BAD_MANIFEST = 2
+EXIT_ANALYSIS_WARNINGS = 3
+
+
+def run_build(args):
+    """并行构建所有清单，返回退出码"""
+    jobs = []
+    exit_code = EXIT_OK
+    for manifest_path in args.manifests:
+        try:
+            params = load_manifest(manifest_path)
+        except ManifestError as e:
+            print(f"[错误] {e}", file=sys.stderr)
+            exit_code = EXIT_BAD_MANIFEST
+            continue
+        if args.no_cache:
+            params['cache_dir'] = None
+        elif args.cache_dir:
+            params['cache_dir'] = args.cache_dir
+        if args.full:
+            params['incremental'] = False
+        if args.reproducible:
+            params['reproducible'] = True
+        jobs.append((manifest_path, params))
+    if exit_code != EXIT_OK and not args.keep_going:
+        return exit_code
+
+    start = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(build_pack, params): manifest_path for manifest_path, params in jobs}
+        for future in as_completed(futures):
+            manifest_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'success': False, 'message': str(e), 'seconds': 0.0, 'report': []}
+
+            if result['success']:
+                print(f"[完成] {manifest_path} ({result['seconds']:.2f}s) -> {result['message']}")
+                print(f"    sha256: {result['sha256']}")
+                if args.verbose:
+                    for line in result['report']:
+                        print(f"    {line}")
+            else:
+                failed += 1
+                print(f"[失败] {manifest_path} ({result['seconds']:.2f}s): {result['message']}",
+                      file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    print(f"共 {len(jobs)} 个资源包，成功 {len(jobs) - failed} 个，失败 {failed} 个，总耗时 {elapsed:.2f}s")
+    if failed:
+        return EXIT_BUILD_FAILED
+    return exit_code
+
+
+def parse_threshold(text):
+    """解析 --threshold 的 键=值"""
+    from config.constants import ANALYZE_THRESHOLDS
+
+    key, sep, value = text.partition('=')
+    if not sep or key not in ANALYZE_THRESHOLDS:
+        raise argparse.ArgumentTypeError(
+            f"阈值格式应为 键=值，可用的键: {', '.join(ANALYZE_THRESHOLDS)}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"阈值 {key} 的值不是数字: {value}")
+    return key, int(number) if number.is_integer() else number
+
+
+def run_analyze(args):
+    """分析资源包ZIP或清单引用的源文件，返回退出码"""
+    from core.pack_analyzer import analyze_zip, analyze_params
+
+    thresholds = dict(args.threshold or [])
+    results = []
+    exit_code = EXIT_OK
+    for target in args.targets:
+        try:
+            if target.lower().endswith('.zip'):
+                analysis = analyze_zip(target, thresholds)
+            else:
+                analysis = analyze_params(load_manifest(target), thresholds)
+        except (ManifestError, OSError, ValueError) as e:
+            print(f"[错误] {target}: {e}", file=sys.stderr)
+            exit_code = EXIT_BAD_MANIFEST
+            continue
+        results.append(analysis)
+        if args.strict and analysis.all_warnings and exit_code == EXIT_OK:
+            exit_code = EXIT_ANALYSIS_WARNINGS
+
+    if args.json:
+        print(json.dumps([analysis.to_dict() for analysis in results], ensure_ascii=False, indent=2))
+    else:
+        for analysis in results:
+            print('\n'.join(analysis.format_report()))
+    return exit_code
+
+
+def run_watch(args):
+    """监视清单及其引用的素材，变化后增量重新构建，直到按Ctrl+C"""
+    from core.watcher import PackWatcher
+
+    def reload():
+        params = load_manifest(args.manifest)
+        if args.cache_dir:
+            params['cache_dir'] = args.cache_dir
+        return params
+
+    try:
+        params = reload()
+    except ManifestError as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return EXIT_BAD_MANIFEST
+
+    def on_build(success, message, generator, changed):
+        stamp = time.strftime('%H:%M:%S')
+        if changed:
+            print(f"[{stamp}] 检测到变化: {', '.join(os.path.basename(path) for path in changed)}")
+        if success:
+            seconds = sum(generator.stage_timings.values())
+            print(f"[{stamp}] [完成] ({seconds:.2f}s) -> {message}")
+            if args.verbose:
+                for line in generator.format_report():
+                    print(f"    {line}")
+        else:
+            print(f"[{stamp}] [失败] {message}", file=sys.stderr)
+
+    watcher = PackWatcher(params, on_build=on_build, reload=reload, extra_paths=[args.manifest],
+                          interval=args.interval)
+    print(f"正在监视 {args.manifest} 引用的 {len(watcher.paths()) - 1} 个素材，按Ctrl+C停止")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return EXIT_OK
+
+
+def run_delta_create(args):
+    """生成两个版本资源包之间的增量包，返回退出码"""
+    from core.pack_delta import DeltaError, create_delta
+
+    output = args.output or os.path.splitext(args.new)[0] + '.delta.zip'
+    try:
+        report = create_delta(args.old, args.new, output)
+    except (OSError, zipfile.BadZipFile, DeltaError) as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return EXIT_BUILD_FAILED
+    print(f"{output}: {report}")
+    if args.verbose:
+        for name in report.changed:
+            print(f"    变化: {name}")
+        for name in report.removed:
+            print(f"    删除: {name}")
+    return EXIT_OK
+
+
+def run_delta_apply(args):
+    """由旧资源包和增量包重建新资源包，返回退出码"""
+    from core.pack_delta import DeltaError, apply_delta
+
+    try:
+        result = apply_delta(args.old, args.delta, args.output)
+    except (OSError, zipfile.BadZipFile, DeltaError) as e:
+        print(f"[错误] {e}", file=sys.stderr)
+        return EXIT_BUILD_FAILED
+    print(result)
+    return EXIT_OK
+
+
+def run_serve(args):
+    """启动本地构建服务，直到按Ctrl+C"""
+    from core.build_service import BuildService, create_server
+
+    cache_dir = None if args.no_cache else args.cache_dir or DEFAULT_CACHE_DIR
+    service = BuildService(args.work_dir, args.workers, args.queue_size, cache_dir)
+    server = create_server(service, args.host, args.port, args.quiet)
+    service.start()
+    host, port = server.server_address[:2]
+    print(f"构建服务已启动: http://{host}:{port}/ （任务目录 {service.work_dir}，{service.workers} 个工作进程）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("正在停止，等待运行中的任务完成...")
+    finally:
+        server.server_close()
+        service.shutdown()
+    return EXIT_OK
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(description="Phira资源包生成器（命令行）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help="根据清单文件批量生成资源包")
+    build_parser.add_argument('manifests', nargs='+', help="YAML或JSON清单文件")
+    build_parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                              help="并行构建的进程数（默认为CPU核心数）")
+    build_parser.add_argument('-k', '--keep-going', action='store_true',
+                              help="部分清单无效时仍构建其余清单")
+    build_parser.add_argument('--cache-dir', help="资源缓存目录（覆盖清单中的cache_dir）")
+    build_parser.add_argument('--no-cache', action='store_true', help="不使用资源缓存")
+    build_parser.add_argument('--full', action='store_true', help="完整重建，不复用已有资源包中的条目")
+    build_parser.add_argument('--reproducible', action='store_true',
+                              help="可复现构建：相同输入生成逐字节相同的资源包（覆盖清单中的reproducible）")
+    build_parser.add_argument('-v', '--verbose', action='store_true', help="输出每个条目的构建报告")
+    build_parser.set_defaults(func=run_build)
+
+    analyze_parser = subparsers.add_parser('analyze', help="分析资源包的压缩大小、解码后内存和加载开销")
+    analyze_parser.add_argument('targets', nargs='+', help="资源包ZIP，或YAML/JSON清单（分析其引用的源文件）")
+    analyze_parser.add_argument('-t', '--threshold', type=parse_threshold, action='append', metavar='KEY=VALUE',
+                                help="覆盖默认阈值（可重复），如 max_texture_edge=1024")
+    analyze_parser.add_argument('--json', action='store_true', help="以JSON格式输出")
+    analyze_parser.add_argument('--strict', action='store_true',
+                                help=f"有条目超出阈值时以退出码 {EXIT_ANALYSIS_WARNINGS} 结束")
+    analyze_parser.set_defaults(func=run_analyze)
+
+    watch_parser = subparsers.add_parser('watch', help="监视素材，变化后自动增量重新构建")
+    watch_parser.add_argument('manifest', help="YAML或JSON清单文件（清单本身的修改也会触发重新构建）")
+    watch_parser.add_argument('--cache-dir', help="资源缓存目录（覆盖清单中的cache_dir）")
+    watch_parser.add_argument('--interval', type=float, default=WATCH_POLL_INTERVAL,
+                              help=f"轮询间隔（秒，默认 {WATCH_POLL_INTERVAL}）")
+    watch_parser.add_argument('-v', '--verbose', action='store_true', help="输出每次构建的报告")
+    watch_parser.set_defaults(func=run_watch)
+
+    delta_parser = subparsers.add_parser('delta', help="生成或应用两个版本资源包之间的增量包")
+    delta_subparsers = delta_parser.add_subparsers(dest='delta_command', required=True)
+    delta_create_parser = delta_subparsers.add_parser('create', help="比较两个版本，生成只包含变化条目的增量包")
+    delta_create_parser.add_argument('old', help="旧版本资源包ZIP")
+    delta_create_parser.add_argument('new', help="新版本资源包ZIP")
+    delta_create_parser.add_argument('-o', '--output', help="增量包路径（默认为 新版本名.delta.zip）")
+    delta_create_parser.add_argument('-v', '--verbose', action='store_true', help="列出变化和删除的条目")
+    delta_create_parser.set_defaults(func=run_delta_create)
+    delta_apply_parser = delta_subparsers.add_parser('apply', help="由旧版本资源包和增量包重建新版本")
+    delta_apply_parser.add_argument('old', help="旧版本资源包ZIP")
+    delta_apply_parser.add_argument('delta', help="增量包")
+    delta_apply_parser.add_argument('-o', '--output', required=True, help="重建的新版本资源包路径")
+    delta_apply_parser.set_defaults(func=run_delta_apply)
+
+    serve_parser = subparsers.add_parser('serve', help="启动本地构建服务（HTTP任务队列）")
+    serve_parser.add_argument('--host', default=SERVICE_HOST,
+                              help=f"监听地址（默认 {SERVICE_HOST}，只接受本机连接）")
+    serve_parser.add_argument('--port', type=int, default=SERVICE_PORT, help=f"监听端口（默认 {SERVICE_PORT}）")
+    serve_parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                              help="同时构建的任务数（默认为CPU核心数）")
+    serve_parser.add_argument('--queue-size', type=int, default=SERVICE_QUEUE_SIZE,
+                              help=f"排队任务的上限，超出时拒绝提交（默认 {SERVICE_QUEUE_SIZE}）")
+    serve_parser.add_argument('--work-dir', default=SERVICE_WORK_DIR, help="任务素材和资源包的保存目录")
+    serve_parser.add_argument('--cache-dir', help="资源缓存目录")
+    serve_parser.add_argument('--no-cache', action='store_true', help="不使用资源缓存")
+    serve_parser.add_argument('-q', '--quiet', action='store_true', help="不输出每个HTTP请求的日志")
+    serve_parser.set_defaults(func=run_serve)
+
+    return parser
+
+
+def main():
+    args = create_parser().parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 """
 Phira资源包生成器配置常量
 """
+import os
 
 # 应用程序配置
 APP_NAME = "Phira资源包生成器"
@@ -24,7 +25,8 @@ DEFAULT_HOLD_ATLAS_MH = [50, 95]
 
 # 文件过滤器
 AUDIO_FILTER = "音频文件 (*.wav *.mp3 *.ogg *.flac)"
-IMAGE_FILTER = "图像文件 (*.png *.jpg *.jpeg *.gif *.bmp)"
+IMAGE_FILTER = "图像文件 (*.png *.apng *.jpg *.jpeg *.gif *.bmp)"
+PACK_FILTER = "Phira资源包 (*.zip)"
 
 # 文件映射
 IMAGE_MAPPINGS = {
@@ -45,6 +47,79 @@ AUDIO_MAPPINGS = {
     'end_music': 'endMusic'
 }
 
+# ZIP打包配置
+ZIP_COPY_CHUNK_SIZE = 1024 * 1024  # 源文件流式写入ZIP时的分块大小
+DEFAULT_ZIP_COMPRESS_LEVEL = 6  # deflate压缩级别（0-9）
+ZIP_PARALLEL_THRESHOLD = 4 * 1024 * 1024  # 超过该大小的条目分块并行压缩
+ZIP_DEFLATE_CHUNK_SIZE = 1024 * 1024  # 并行压缩时每块的大小
+# 可复现构建：相同输入生成逐字节相同的资源包
+DEFAULT_REPRODUCIBLE = False
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # 所有条目的修改时间（ZIP格式能表示的最早时间）
+REPRODUCIBLE_FILE_MODE = 0o644  # 所有条目的Unix权限
+# 已经是压缩格式的文件直接存储，不再deflate
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.ogg', '.mp3', '.flac')
+
+# 资源缓存配置
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'phira_pack_generator')
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 缓存总大小上限，超出时按LRU淘汰
+CACHE_MIN_ENTRY_BYTES = 16 * 1024  # 小于该大小的条目直接压缩，不值得查缓存
+
+# 纹理优化配置
+DEFAULT_OPTIMIZE_PNG = False
+DEFAULT_OPTIMIZE_TIME_BUDGET = 10.0  # PNG无损优化的总时间预算（秒）
+
+# 打击音预处理配置
+HIT_SOUND_KEYS = ('tap_sound', 'drag_sound', 'flick_sound')
+DEFAULT_PROCESS_HIT_SOUNDS = False
+DEFAULT_AUDIO_SAMPLE_RATE = 44100  # 重采样的目标采样率（与游戏混音器一致）
+DEFAULT_AUDIO_SILENCE_DB = -50.0  # 低于该电平（dBFS）的首尾部分视为静音
+DEFAULT_AUDIO_PEAK_DB = -1.0  # 峰值归一化的目标电平（dBFS）
+
+# 纹理透明边距裁剪配置
+DEFAULT_TRIM_TRANSPARENT = False
+DEFAULT_TRIM_MARGIN = 2  # 裁剪后在内容上下保留的透明像素
+# 纹理尺寸预算（0表示不限制）
+DEFAULT_TEXTURE_MAX_EDGE = 0  # 纹理最大边长（像素）
+DEFAULT_TEXTURE_POT = False  # 是否把纹理尺寸调整为2的幂
+DEFAULT_TEXTURE_VRAM_BUDGET = 0  # 所有纹理解码后占用的显存上限（字节）
+# 构建时大块像素缓冲区的内存上限（字节，0表示不限制），超大的打击特效按行带分段编码
+DEFAULT_MEMORY_CEILING = 256 * 1024 * 1024
+# Hold纹理对应的atlas参数（[上端高度, 下端高度]）
+HOLD_ATLAS_KEYS = {
+    'hold.png': ('hold_atlas_x', 'hold_atlas_y'),
+    'hold_mh.png': ('hold_atlas_mh_x', 'hold_atlas_mh_y')
+}
+
+# 资源包分析的默认阈值，超出时在报告中标记
+ANALYZE_THRESHOLDS = {
+    'max_texture_edge': 2048,  # 单张纹理的最大边长（像素）
+    'max_texture_bytes': 16 * 1024 * 1024,  # 单张纹理解码后的大小
+    'max_total_texture_bytes': 64 * 1024 * 1024,  # 所有纹理解码后的总大小
+    'max_hit_fx_frames': 64,  # 打击特效的帧数
+    'max_hit_sound_seconds': 1.0,  # 打击音时长（秒）
+    'max_audio_pcm_bytes': 32 * 1024 * 1024  # 单个音频解码后的PCM大小
+}
+
+# 进度条的刻度数（ProgressEvent.fraction按此换算）
+PROGRESS_BAR_STEPS = 1000
+
+# 图像缩略图
+THUMBNAIL_SIZE = 48  # 缩略图最大边长（像素）
+THUMBNAIL_CACHE_MAX_BYTES = 32 * 1024 * 1024  # 缩略图缓存占用的内存上限
+THUMBNAIL_WORKERS = 2  # 后台解码缩略图的线程数
+
+# 监视模式
+WATCH_POLL_INTERVAL = 0.2  # 轮询素材修改时间的间隔（秒）
+WATCH_DEBOUNCE = 0.3  # 素材连续这么长时间没有变化后才重新构建（秒）
+
+# 本地构建服务（cli.py serve）
+SERVICE_HOST = '127.0.0.1'  # 默认只接受本机连接
+SERVICE_PORT = 8765
+SERVICE_QUEUE_SIZE = 32  # 排队任务的上限，超出时拒绝提交
+SERVICE_MAX_REQUEST_BYTES = 512 * 1024 * 1024  # 提交任务的请求体上限（含base64编码的素材）
+SERVICE_WORK_DIR = os.path.join(DEFAULT_CACHE_DIR, 'service')  # 任务素材和资源包的保存目录
+SERVICE_MAX_FINISHED_JOBS = 100  # 保留的已结束任务数，更早的任务连同其目录一起删除
+
 # 主题样式
 DARK_THEME_STYLESHEET = """
     QMainWindow {
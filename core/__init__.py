@@ -0,0 +1,4 @@
+"""
+资源包构建核心
+不依赖PyQt6，命令行和图形界面共用；Pillow、PyYAML、numpy等依赖在首次使用时才导入
+"""
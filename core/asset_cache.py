@@ -0,0 +1,196 @@
+"""
+内容寻址的本地资源缓存
+以输入内容的哈希加处理参数作为键，缓存渲染、转换和压缩的结果，
+按最近使用时间淘汰，总大小不超过上限
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from config.constants import DEFAULT_CACHE_MAX_BYTES
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class CacheStats:
+    """缓存命中统计"""
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_written = 0
+
+    def __str__(self):
+        return (f"缓存命中 {self.hits} 次，未命中 {self.misses} 次，"
+                f"写入 {self.bytes_written} 字节，淘汰 {self.evictions} 项")
+
+
+class AssetCache:
+    """
+    磁盘缓存
+    目录结构:
+        <cache_dir>/objects/<键的前两位>/<键>   缓存内容
+        <cache_dir>/index.json                  源文件(路径, 大小, mtime) -> 内容哈希，避免重复计算哈希
+    每次命中都会更新对象文件的mtime，淘汰时删除mtime最旧的对象
+    多个进程可以共享同一个缓存目录：所有写入都先写临时文件再原子替换
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._digest_index = {}
+        self._index_dirty = False
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._load_index()
+        self._total_bytes = sum(size for _, size, _ in self._scan_objects())
+
+    @staticmethod
+    def make_key(*parts):
+        """由任意可转为字符串的部分生成缓存键"""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(repr(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    @staticmethod
+    def data_digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def file_digest(self, path):
+        """
+        计算文件内容的SHA-256
+        大小和mtime都未变化时直接使用索引中记录的哈希，不再读取文件
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            record = self._digest_index.get(path)
+        if record and record[0] == stat.st_size and record[1] == stat.st_mtime_ns:
+            return record[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        value = digest.hexdigest()
+        with self._lock:
+            self._digest_index[path] = [stat.st_size, stat.st_mtime_ns, value]
+            self._index_dirty = True
+        return value
+
+    def get(self, key):
+        """读取缓存内容，未命中时返回None"""
+        path = self._object_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.hits += 1
+        return data
+
+    def put(self, key, data):
+        """写入缓存内容，超过总大小上限时按LRU淘汰"""
+        if len(data) > self.max_bytes:
+            return
+        path = self._object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            # 覆盖已有的对象时，总大小中减去旧内容的大小
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self.stats.bytes_written += len(data)
+            self._total_bytes += len(data) - old_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def get_or_create(self, key, producer):
+        """命中时返回缓存内容，否则调用producer()生成并写入缓存"""
+        data = self.get(key)
+        if data is None:
+            data = producer()
+            self.put(key, data)
+        return data
+
+    def evict(self):
+        """删除最久未使用的对象，直到总大小不超过上限"""
+        with self._lock:
+            objects = sorted(self._scan_objects())
+            total = sum(size for _, size, _ in objects)
+            for _, size, path in objects:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats.evictions += 1
+            self._total_bytes = total
+
+    def save(self):
+        """保存哈希索引（构建结束时调用）"""
+        with self._lock:
+            if not self._index_dirty:
+                return
+            # 删除已不存在的源文件记录
+            index = {path: record for path, record in self._digest_index.items()
+                     if os.path.exists(path)}
+            self._index_dirty = False
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _object_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def _scan_objects(self):
+        """返回 (mtime, size, path) 列表"""
+        objects = []
+        for root, dirs, files in os.walk(self.objects_dir):
+            for file in files:
+                if file.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, path))
+        return objects
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._digest_index = json.load(f)
+        except (OSError, ValueError):
+            self._digest_index = {}
@@ -0,0 +1,125 @@
+"""
+打击音预处理
+对WAV打击音去除首尾静音、峰值归一化、混为单声道并重采样到混音器的采样率，
+减少打击延迟和手机上的实时重采样开销
+"""
+import io
+import wave
+import numpy as np
+
+# 重采样低通滤波器的抽头数（奇数）
+_LOWPASS_TAPS = 63
+
+
+class AudioResult:
+    """单个音频文件的处理结果"""
+    def __init__(self, name, original_size, processed_size, latency_removed=0.0,
+                 original_format='', processed_format='', note=''):
+        self.name = name
+        self.original_size = original_size
+        self.processed_size = processed_size
+        # 去除的开头静音时长（秒）
+        self.latency_removed = latency_removed
+        self.original_format = original_format
+        self.processed_format = processed_format
+        self.note = note
+
+    @property
+    def bytes_saved(self):
+        return self.original_size - self.processed_size
+
+    def __str__(self):
+        if self.note:
+            return f"{self.name}: 未处理（{self.note}）"
+        return (f"{self.name}: {self.original_format} -> {self.processed_format}，"
+                f"去除开头静音 {self.latency_removed * 1000:.1f} ms，"
+                f"{self.original_size} -> {self.processed_size} 字节（节省 {self.bytes_saved} 字节）")
+
+
+def _read_pcm(data):
+    """读取PCM WAV，返回 (float32数组[帧, 声道], 采样率, 格式描述)"""
+    with wave.open(io.BytesIO(data), 'rb') as wav:
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif sample_width == 3:
+        # 24位：补齐为32位再右移
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        widened = np.zeros((packed.shape[0], 4), dtype=np.uint8)
+        widened[:, 1:] = packed
+        samples = (widened.view('<i4').ravel() >> 8).astype(np.float32) / 8388608
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"不支持的采样位宽 {sample_width * 8} 位")
+
+    description = f"{channels}声道 {rate}Hz {sample_width * 8}位"
+    return samples.reshape(-1, channels), rate, description
+
+
+def _lowpass(samples, cutoff):
+    """Blackman窗sinc低通滤波，cutoff为相对原采样率的截止频率（0-0.5）"""
+    n = np.arange(_LOWPASS_TAPS) - (_LOWPASS_TAPS - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(_LOWPASS_TAPS)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode='same')
+
+
+def _resample(samples, rate, target_rate):
+    """线性插值重采样；降采样前先低通滤波防止混叠"""
+    if rate == target_rate or len(samples) < 2:
+        return samples
+    if target_rate < rate:
+        samples = _lowpass(samples, 0.5 * target_rate / rate)
+    duration = len(samples) / rate
+    target_length = max(1, int(round(duration * target_rate)))
+    source_times = np.arange(len(samples)) / rate
+    target_times = np.arange(target_length) / target_rate
+    return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def process_wav(name, data, target_rate, silence_db, peak_db):
+    """
+    处理一个WAV打击音
+    silence_db: 低于该电平（dBFS）的首尾部分视为静音
+    peak_db: 归一化后的峰值电平（dBFS）
+    返回: (bytes, AudioResult)，无法处理时返回原始数据
+    """
+    original_size = len(data)
+    try:
+        samples, rate, original_format = _read_pcm(data)
+    except (wave.Error, EOFError, ValueError) as e:
+        return data, AudioResult(name, original_size, original_size, note=f"无法读取: {e}")
+
+    # 以各声道中的最大幅度判断静音
+    amplitude = np.abs(samples).max(axis=1)
+    audible = np.flatnonzero(amplitude > 10 ** (silence_db / 20))
+    if audible.size == 0:
+        return data, AudioResult(name, original_size, original_size, note="整段都是静音")
+    start, end = audible[0], audible[-1] + 1
+
+    mono = samples[start:end].mean(axis=1)
+    peak = np.abs(mono).max()
+    if peak > 0:
+        mono *= 10 ** (peak_db / 20) / peak
+    mono = _resample(mono, rate, target_rate)
+
+    pcm = (np.clip(mono, -1.0, 1.0) * 32767).round().astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(target_rate)
+        wav.writeframes(pcm.tobytes())
+    processed = buffer.getvalue()
+
+    return processed, AudioResult(
+        name, original_size, len(processed), latency_removed=start / rate,
+        original_format=original_format, processed_format=f"1声道 {target_rate}Hz 16位"
+    )
@@ -0,0 +1,133 @@
+"""
+无界面批量构建
+读取YAML/JSON清单文件，参数键与MainWindow.start_generation构建的params一致
+"""
+import json
+import os
+import time
+from config.constants import (
+    DEFAULT_FX_COLS, DEFAULT_FX_ROWS, DEFAULT_FX_TOTAL_WIDTH, DEFAULT_FX_TOTAL_HEIGHT,
+    DEFAULT_FX_FRAME_WIDTH, DEFAULT_FX_FRAME_HEIGHT, DEFAULT_FX_DURATION,
+    DEFAULT_FX_SCALE, DEFAULT_FX_ROTATE, DEFAULT_HOLD_ATLAS, DEFAULT_HOLD_ATLAS_MH,
+    IMAGE_MAPPINGS, AUDIO_MAPPINGS, DEFAULT_CACHE_DIR, DEFAULT_OPTIMIZE_PNG,
+    DEFAULT_PROCESS_HIT_SOUNDS, DEFAULT_TRIM_TRANSPARENT, DEFAULT_TRIM_MARGIN,
+    DEFAULT_TEXTURE_MAX_EDGE, DEFAULT_TEXTURE_POT, DEFAULT_TEXTURE_VRAM_BUDGET,
+    DEFAULT_MEMORY_CEILING, DEFAULT_REPRODUCIBLE
+)
+from core.pack_reader import parse_pack_ref
+
+# 清单中表示文件路径的参数，相对路径按清单文件所在目录解析
+PATH_PARAM_KEYS = tuple(AUDIO_MAPPINGS) + tuple(IMAGE_MAPPINGS) + ('hit_fx_image', 'output_path')
+
+
+class ManifestError(Exception):
+    """清单文件无法读取或内容无效"""
+
+
+def default_params():
+    """与界面默认值一致的参数字典"""
+    params = {
+        'name': '',
+        'author': '',
+        'description': '',
+
+        'fx_cols': DEFAULT_FX_COLS,
+        'fx_rows': DEFAULT_FX_ROWS,
+        'fx_total_width': DEFAULT_FX_TOTAL_WIDTH,
+        'fx_total_height': DEFAULT_FX_TOTAL_HEIGHT,
+        'fx_frame_width': DEFAULT_FX_FRAME_WIDTH,
+        'fx_frame_height': DEFAULT_FX_FRAME_HEIGHT,
+        'fx_duration': DEFAULT_FX_DURATION,
+        'fx_scale': DEFAULT_FX_SCALE,
+        'fx_rotate': DEFAULT_FX_ROTATE,
+        'hit_fx_image': '',
+        'hit_fx_frames': '',
+
+        'hold_atlas_x': DEFAULT_HOLD_ATLAS[0],
+        'hold_atlas_y': DEFAULT_HOLD_ATLAS[1],
+        'hold_atlas_mh_x': DEFAULT_HOLD_ATLAS_MH[0],
+        'hold_atlas_mh_y': DEFAULT_HOLD_ATLAS_MH[1],
+
+        'optimize_png': DEFAULT_OPTIMIZE_PNG,
+        'trim_transparent': DEFAULT_TRIM_TRANSPARENT,
+        'trim_margin': DEFAULT_TRIM_MARGIN,
+        'texture_max_edge': DEFAULT_TEXTURE_MAX_EDGE,
+        'texture_pot': DEFAULT_TEXTURE_POT,
+        'texture_vram_budget': DEFAULT_TEXTURE_VRAM_BUDGET,
+        'memory_ceiling': DEFAULT_MEMORY_CEILING,
+        'reproducible': DEFAULT_REPRODUCIBLE,
+        'process_hit_sounds': DEFAULT_PROCESS_HIT_SOUNDS,
+
+        'output_path': '',
+        'cache_dir': DEFAULT_CACHE_DIR,
+        'incremental': True
+    }
+    for param_key in list(AUDIO_MAPPINGS) + list(IMAGE_MAPPINGS):
+        params[param_key] = ''
+    return params
+
+
+def load_manifest(manifest_path):
+    """
+    读取清单文件并与默认参数合并
+    .json按JSON解析，其余按YAML解析；未指定output_path时输出到清单所在目录
+    """
+    import yaml
+
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            if manifest_path.lower().endswith('.json'):
+                data = json.load(f)
+            else:
+                data = yaml.safe_load(f)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        raise ManifestError(f"无法读取清单 {manifest_path}: {e}")
+
+    if not isinstance(data, dict):
+        raise ManifestError(f"清单 {manifest_path} 的顶层必须是键值映射")
+
+    params = default_params()
+    params.update(data)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    def resolve(value):
+        # 已有资源包中条目的引用（pack://...）保持原样
+        if parse_pack_ref(value) is not None:
+            return value
+        return os.path.join(base_dir, os.path.expanduser(str(value)))
+
+    for key in PATH_PARAM_KEYS:
+        value = params.get(key)
+        if value:
+            params[key] = resolve(value)
+    # hit_fx_frames可以是帧目录，也可以是帧文件列表
+    frames = params.get('hit_fx_frames')
+    if isinstance(frames, list):
+        params['hit_fx_frames'] = [resolve(path) for path in frames]
+    elif frames:
+        params['hit_fx_frames'] = resolve(frames)
+    if not params['output_path']:
+        params['output_path'] = base_dir
+
+    if not str(params.get('name', '')).strip():
+        raise ManifestError(f"清单 {manifest_path} 缺少资源包名称 name")
+    return params
+
+
+def build_pack(params):
+    """
+    在当前进程中构建一个资源包（供进程池调用）
+    返回: dict(success, message, seconds, report, sha256)
+    """
+    from core.resource_pack_generator import ResourcePackGenerator
+
+    start = time.perf_counter()
+    generator = ResourcePackGenerator(params)
+    success, message = generator.generate()
+    return {
+        'success': success,
+        'message': message,
+        'seconds': time.perf_counter() - start,
+        'report': generator.format_report() if success else [],
+        'sha256': generator.pack_sha256
+    }
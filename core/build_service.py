@@ -0,0 +1,373 @@
+"""
+本地构建服务
+基于标准库的HTTP服务：接收构建任务（参数与MainWindow.start_generation一致，素材可以上传或引用本机路径），
+放入有界队列，由固定数量的调度线程交给进程池执行ResourcePackGenerator，并提供任务状态和队列指标。
+只在本机运行，不依赖任何外部服务；默认只监听127.0.0.1
+
+接口:
+    POST /jobs              提交任务（Content-Type必须为application/json，否则返回415），返回202和任务状态；队列已满时返回503
+    GET  /jobs              所有任务的状态
+    GET  /jobs/<id>         单个任务的状态、各阶段耗时和构建报告
+    GET  /jobs/<id>/pack    下载构建成功的资源包
+    GET  /metrics           队列深度、运行中的任务数和耗时统计
+
+提交任务的请求体（JSON）:
+    {
+        "params": {"name": "My Skin", "tap_image": "/abs/path/tap.png", ...},
+        "files": {
+            "hold_image": {"name": "hold.png", "data": "<base64>"},
+            "hit_fx_frames": [{"name": "0.png", "data": "<base64>"}, ...]
+        }
+    }
+files中的素材保存到任务目录后覆盖params中的同名参数；输出路径固定为任务目录
+"""
+import base64
+import binascii
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.constants import (
+    IMAGE_MAPPINGS, AUDIO_MAPPINGS, DEFAULT_CACHE_DIR, SERVICE_QUEUE_SIZE, SERVICE_MAX_REQUEST_BYTES,
+    SERVICE_MAX_FINISHED_JOBS
+)
+from core.batch import default_params, build_pack
+
+# 可以通过files上传的参数（hit_fx_frames为帧文件列表）
+UPLOAD_PARAM_KEYS = tuple(AUDIO_MAPPINGS) + tuple(IMAGE_MAPPINGS) + ('hit_fx_image', 'hit_fx_frames')
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class JobError(Exception):
+    """提交的任务无效"""
+
+
+class QueueFull(Exception):
+    """任务队列已满"""
+
+
+def _safe_filename(name):
+    """只保留文件名部分，去掉路径分隔符和不安全的字符"""
+    name = os.path.basename(str(name).replace('\\', '/'))
+    name = re.sub(r'[^\w.\-]', '_', name).lstrip('.')
+    return name or 'file'
+
+
+def _decode_upload(upload, default_name):
+    """返回 (安全的文件名, 数据)"""
+    if not isinstance(upload, dict) or 'data' not in upload:
+        raise JobError("上传的文件应为 {\"name\": ..., \"data\": <base64>}")
+    name = upload.get('name') or default_name
+    try:
+        return _safe_filename(name), base64.b64decode(upload['data'], validate=True)
+    except (binascii.Error, TypeError) as e:
+        raise JobError(f"文件 {name} 不是有效的base64: {e}")
+
+
+class BuildJob:
+    """一个构建任务"""
+    def __init__(self, job_id, params, job_dir):
+        self.id = job_id
+        self.params = params
+        self.job_dir = job_dir
+        self.state = JOB_QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # build_pack的返回值
+        self.result = None
+
+    @property
+    def wait_seconds(self):
+        """在队列中等待的时间"""
+        if self.started_at is None:
+            return time.time() - self.submitted_at
+        return self.started_at - self.submitted_at
+
+    @property
+    def build_seconds(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def zip_path(self):
+        if self.state != JOB_SUCCEEDED:
+            return None
+        return self.result['message']
+
+    def to_dict(self, detail=False):
+        data = {
+            'id': self.id,
+            'name': self.params['name'],
+            'state': self.state,
+            'submitted_at': self.submitted_at,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'build_seconds': round(self.build_seconds, 3) if self.build_seconds is not None else None
+        }
+        if self.result is not None:
+            data['sha256'] = self.result.get('sha256')
+            if self.state == JOB_FAILED:
+                data['error'] = self.result['message']
+            if detail:
+                data['report'] = self.result['report']
+        return data
+
+
+class BuildService:
+    """
+    任务队列和工作池
+    workers: 同时构建的任务数（进程池大小）；queue_size: 排队任务的上限，超出时拒绝提交
+    work_dir: 上传的素材和生成的资源包按任务保存在 work_dir/<任务id>/ 下
+    cache_dir: 所有任务共用的资源缓存目录（None为不使用缓存），覆盖任务参数中的cache_dir
+    """
+    def __init__(self, work_dir, workers=None, queue_size=SERVICE_QUEUE_SIZE, cache_dir=DEFAULT_CACHE_DIR):
+        self.work_dir = os.path.abspath(work_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.pool = None
+        self.threads = []
+        self.started_at = time.time()
+
+    def start(self):
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # 每个调度线程一次只把一个任务交给进程池，任务的running状态因此是准确的，
+        # 排队中的任务留在有界队列里而不是进程池的内部队列中
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._dispatch, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def submit(self, payload):
+        """校验请求并创建任务，返回BuildJob"""
+        if not isinstance(payload, dict):
+            raise JobError("请求体必须是JSON对象")
+        job_params = payload.get('params') or {}
+        files = payload.get('files') or {}
+        if not isinstance(job_params, dict) or not isinstance(files, dict):
+            raise JobError("params和files必须是JSON对象")
+        unknown = [key for key in files if key not in UPLOAD_PARAM_KEYS]
+        if unknown:
+            raise JobError(f"不支持上传的参数: {', '.join(unknown)}")
+
+        params = default_params()
+        params.update(job_params)
+        if not str(params.get('name', '')).strip():
+            raise JobError("缺少资源包名称 name")
+        params['cache_dir'] = self.cache_dir
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.work_dir, job_id)
+        # 包名原样写入info.yml，只有输出文件名去掉路径分隔符等不安全的字符，并确认不会写到任务目录之外
+        params['output_filename'] = f"{_safe_filename(params['name'])}_ResourcePack.zip"
+        zip_path = os.path.realpath(os.path.join(job_dir, params['output_filename']))
+        if os.path.commonpath([zip_path, os.path.realpath(job_dir)]) != os.path.realpath(job_dir):
+            raise JobError(f"资源包名称 {params['name']} 无效")
+        os.makedirs(job_dir)
+        try:
+            self._save_uploads(files, params, os.path.join(job_dir, 'assets'))
+        except Exception:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        # 每个任务输出到自己的目录，客户端通过 /jobs/<id>/pack 下载
+        params['output_path'] = job_dir
+        params['incremental'] = False
+
+        job = BuildJob(job_id, params, job_dir)
+        with self.lock:
+            try:
+                self.queue.put_nowait(job)
+            except queue.Full:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise QueueFull(f"任务队列已满（{self.queue.maxsize} 个）")
+            self.jobs[job_id] = job
+        return job
+
+    def _save_uploads(self, files, params, assets_dir):
+        os.makedirs(assets_dir)
+        for key, upload in files.items():
+            if key == 'hit_fx_frames':
+                if not isinstance(upload, list):
+                    raise JobError("hit_fx_frames应为文件列表")
+                frames_dir = os.path.join(assets_dir, 'hit_fx_frames')
+                os.makedirs(frames_dir)
+                paths = []
+                for index, frame in enumerate(upload):
+                    name, data = _decode_upload(frame, f"{index}.png")
+                    # 加上序号前缀，保持上传顺序且避免重名
+                    path = os.path.join(frames_dir, f"{index:04d}_{name}")
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    paths.append(path)
+                params[key] = paths
+                continue
+            name, data = _decode_upload(upload, key)
+            # 音频以原文件名写入info.yml，不加前缀；不同参数的文件名相同时再区分
+            path = os.path.join(assets_dir, name)
+            if os.path.exists(path):
+                path = os.path.join(assets_dir, f"{key}_{name}")
+            with open(path, 'wb') as f:
+                f.write(data)
+            params[key] = path
+
+    def _dispatch(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            job.started_at = time.time()
+            job.state = JOB_RUNNING
+            try:
+                result = self.pool.submit(build_pack, job.params).result()
+            except Exception as e:
+                result = {'success': False, 'message': str(e), 'seconds': 0.0, 'report': [], 'sha256': None}
+            job.result = result
+            job.finished_at = time.time()
+            job.state = JOB_SUCCEEDED if result['success'] else JOB_FAILED
+            self._prune()
+
+    def _prune(self):
+        """只保留最近结束的SERVICE_MAX_FINISHED_JOBS个任务"""
+        with self.lock:
+            finished = sorted((job for job in self.jobs.values() if job.finished_at is not None),
+                              key=lambda job: job.finished_at)
+            expired = finished[:max(0, len(finished) - SERVICE_MAX_FINISHED_JOBS)]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.lock:
+            return list(self.jobs.values())
+
+    def metrics(self):
+        """队列深度、各状态任务数和耗时统计"""
+        jobs = self.list_jobs()
+        counts = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED)}
+        for job in jobs:
+            counts[job.state] += 1
+        finished = [job for job in jobs if job.finished_at is not None]
+
+        def average(values):
+            return round(sum(values) / len(values), 3) if values else None
+
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'workers': self.workers,
+            'queue_depth': self.queue.qsize(),
+            'queue_capacity': self.queue.maxsize,
+            'jobs': counts,
+            'avg_wait_seconds': average([job.wait_seconds for job in finished]),
+            'avg_build_seconds': average([job.build_seconds for job in finished]),
+            'max_build_seconds': max((round(job.build_seconds, 3) for job in finished), default=None)
+        }
+
+
+class BuildRequestHandler(BaseHTTPRequestHandler):
+    """HTTP接口，服务对象通过 self.server.service 访问"""
+    server_version = 'PhiraPackService/1.0'
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': "未知的路径"})
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            return self.send_json(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {'error': "请求体必须是application/json"})
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': "Content-Length无效"})
+        if length < 0 or length > SERVICE_MAX_REQUEST_BYTES:
+            return self.send_json(HTTPStatus.BAD_REQUEST,
+                                  {'error': f"Content-Length应在0到{SERVICE_MAX_REQUEST_BYTES}字节之间"})
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job = self.server.service.submit(payload)
+        except ValueError as e:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': f"请求体不是有效的JSON: {e}"})
+        except JobError as e:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except QueueFull as e:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': str(e)})
+        self.send_json(HTTPStatus.ACCEPTED, job.to_dict())
+
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts == ['metrics']:
+            return self.send_json(HTTPStatus.OK, service.metrics())
+        if parts == ['jobs']:
+            return self.send_json(HTTPStatus.OK, {'jobs': [job.to_dict() for job in service.list_jobs()]})
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = service.get(parts[1])
+            if job is None:
+                return self.send_json(HTTPStatus.NOT_FOUND, {'error': f"任务 {parts[1]} 不存在"})
+            if len(parts) == 2:
+                return self.send_json(HTTPStatus.OK, job.to_dict(detail=True))
+            if parts[2] == 'pack':
+                return self.send_pack(job)
+        self.send_json(HTTPStatus.NOT_FOUND, {'error': "未知的路径"})
+
+    def send_pack(self, job):
+        if job.zip_path is None:
+            return self.send_json(HTTPStatus.CONFLICT, {'error': f"任务状态为 {job.state}，没有可下载的资源包"})
+        size = os.path.getsize(job.zip_path)
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(size))
+        self.send_header('Content-Disposition', f'attachment; filename="{os.path.basename(job.zip_path)}"')
+        self.end_headers()
+        with open(job.zip_path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(service, host, port, quiet=False):
+    """创建HTTP服务器（尚未开始监听循环），port为0时由系统分配端口"""
+    server = ThreadingHTTPServer((host, port), BuildRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
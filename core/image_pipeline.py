@@ -0,0 +1,177 @@
+"""
+构建内共享的图像解码与PNG编码
+同一份图像数据（按内容的SHA-256）在一次构建中只解码一次：格式转换、透明边距裁剪、纹理尺寸预算和PNG优化
+都从缓存的解码结果开始，各阶段编码出的新数据也连同解码图像一起放回缓存，下一阶段不必再解码。
+缓存的解码图像按近似字节数计入MemoryBudget，超出上限时按最近最少使用淘汰；
+其他阶段一次性分配大块缓冲区前也会先淘汰缓存腾出空间（make_room）。
+
+IMAGE_FILTER允许选择JPEG、GIF、BMP等格式，而资源包中的纹理条目名为click.png等，
+非PNG的源文件在这里真正转换为PNG，编码在线程池中并行进行（Pillow解码、缩放和编码时释放GIL）
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from core.png_stream import PNG_SIGNATURE
+
+# PNG可以直接保存的颜色模式，其他模式（CMYK、YCbCr、浮点等）转换为RGB或RGBA
+PNG_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I;16')
+
+
+def is_png(data):
+    return data[:8] == PNG_SIGNATURE
+
+
+def decoded_bytes(img):
+    """解码图像占用的近似字节数"""
+    return img.width * img.height * len(img.getbands())
+
+
+def decode_image(data):
+    """完整解码图像数据（不经过缓存），无法解码时抛出OSError或ValueError"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+    return img
+
+
+def png_compatible(img):
+    """转换为PNG能保存的颜色模式，已兼容时返回原图像"""
+    if img.mode in PNG_MODES:
+        return img
+    has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+    return img.convert('RGBA' if has_alpha else 'RGB')
+
+
+def encode_png(img, **save_args):
+    """把解码图像编码为PNG，调色板、灰度和RGB图像的透明色一并保留"""
+    img = png_compatible(img)
+    if 'transparency' in img.info and img.mode in ('P', 'L', 'RGB'):
+        save_args.setdefault('transparency', img.info['transparency'])
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', **save_args)
+    return buffer.getvalue()
+
+
+class ConvertResult:
+    """非PNG源文件转换为PNG的结果"""
+    def __init__(self, name, source_format, size, original_size, converted_size):
+        self.name = name
+        self.source_format = source_format
+        self.size = size
+        self.original_size = original_size
+        self.converted_size = converted_size
+
+    def __str__(self):
+        return (f"{self.name}: {self.source_format} -> PNG，{self.size[0]}x{self.size[1]}，"
+                f"{self.original_size} -> {self.converted_size} 字节")
+
+
+class ImagePipeline:
+    """
+    一次构建内的解码缓存和编码线程池
+    max_bytes: 缓存的解码图像总字节数上限（0为不限制）
+    memory: 可选的core.memory_budget.MemoryBudget，缓存占用计入其当前占用和峰值
+    workers: 并行编码的线程数（None为默认）
+    各阶段可以在线程池中并行调用decode；返回的图像被多个阶段共享，调用方不能原地修改
+    """
+    def __init__(self, max_bytes=0, memory=None, workers=None):
+        self.max_bytes = max_bytes
+        self.memory = memory
+        self.workers = workers
+        self.decode_count = 0
+        self.hit_count = 0
+        self.cached_bytes = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def decode(self, data):
+        """解码图像数据，同一内容只解码一次；无法解码时抛出OSError或ValueError"""
+        key = self.key(data)
+        with self._lock:
+            img = self._images.get(key)
+            if img is not None:
+                self._images.move_to_end(key)
+                self.hit_count += 1
+                return img
+        img = decode_image(data)
+        with self._lock:
+            self.decode_count += 1
+        self._store(key, img)
+        return img
+
+    def encode(self, img, **save_args):
+        """编码为PNG，并把解码图像登记为编码结果的解码结果，后续阶段读取该数据时不必再解码"""
+        img = png_compatible(img)
+        data = encode_png(img, **save_args)
+        self._store(self.key(data), img)
+        return data
+
+    def to_png(self, data, name=None):
+        """
+        转换为真正的PNG数据
+        返回: (bytes, ConvertResult)，已是PNG时原样返回，结果为None
+        """
+        if is_png(data):
+            return data, None
+        img = self.decode(data)
+        png = self.encode(img)
+        return png, ConvertResult(name, img.format or '未知格式', img.size, len(data), len(png))
+
+    def map(self, func, items):
+        """在线程池中并行处理，返回的结果顺序与items一致"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(func, items))
+
+    def make_room(self, nbytes):
+        """
+        即将一次性分配nbytes时调用：分配后超出MemoryBudget上限、而淘汰缓存可以避免时，按LRU淘汰缓存的解码图像
+        返回分配后是否在上限之内（淘汰全部缓存也放不下时不淘汰）
+        """
+        memory = self.memory
+        if memory is None or memory.fits(nbytes):
+            return True
+        with self._lock:
+            if not memory.fits(nbytes - self.cached_bytes):
+                return False
+            while self._images and not memory.fits(nbytes):
+                _, evicted = self._images.popitem(last=False)
+                self._release(evicted)
+        return True
+
+    def _store(self, key, img):
+        size = decoded_bytes(img)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = img
+            self.cached_bytes += size
+            if self.memory is not None:
+                self.memory.acquire(size)
+            while self.max_bytes and self.cached_bytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._release(evicted)
+
+    def _release(self, img):
+        size = decoded_bytes(img)
+        self.cached_bytes -= size
+        if self.memory is not None:
+            self.memory.release(size)
+
+    def clear(self):
+        """释放所有缓存的解码图像（构建结束时调用）"""
+        with self._lock:
+            for img in self._images.values():
+                self._release(img)
+            self._images.clear()
+
+    def __str__(self):
+        return f"图像解码 {self.decode_count} 次，复用解码结果 {self.hit_count} 次"
@@ -0,0 +1,76 @@
+"""
+构建过程的内存上限和峰值统计
+MemoryBudget记录构建中分配的大块像素缓冲区，决定按多大的行带处理图像，并统计峰值；
+进程级的峰值RSS通过resource模块读取（Windows上不可用时为None）
+"""
+import sys
+import threading
+from contextlib import contextmanager
+
+
+def process_peak_rss():
+    """进程迄今为止的峰值常驻内存（字节），无法获取时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """
+    像素缓冲区的内存预算
+    ceiling为0时不限制（行带按整张图处理）
+    """
+    def __init__(self, ceiling=0):
+        self.ceiling = ceiling
+        self.current = 0
+        self.peak = 0
+        # 解码缓存等会在线程池中计入占用
+        self._lock = threading.Lock()
+
+    def fits(self, nbytes):
+        """在当前占用（如解码缓存）之外再一次性分配nbytes是否在上限之内"""
+        return not self.ceiling or self.current + nbytes <= self.ceiling
+
+    def band_rows(self, row_bytes, total_rows, align=1, factor=2, reserved=0):
+        """
+        每个行带的行数：行带占用（factor倍的行带缓冲区，默认为缓冲区及其过滤副本）加上reserved字节，
+        与当前占用之和不超过上限，且为align的整数倍
+        至少为align行（单帧行高超过上限时仍以一行帧为单位处理）
+        """
+        if not self.ceiling:
+            return total_rows
+        rows = max(0, self.ceiling - self.current - reserved) // (factor * max(1, row_bytes))
+        rows = max(align, rows // align * align)
+        return min(rows, total_rows)
+
+    def acquire(self, nbytes):
+        """把nbytes计入当前占用（由持续持有缓冲区的对象调用，如解码缓存）"""
+        with self._lock:
+            self.current += nbytes
+            self.peak = max(self.peak, self.current)
+
+    def release(self, nbytes):
+        with self._lock:
+            self.current -= nbytes
+
+    @contextmanager
+    def hold(self, nbytes):
+        """在with块内把nbytes计入当前占用"""
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def __str__(self):
+        text = f"图像缓冲区峰值 {self.peak / 1048576:.1f} MB"
+        if self.ceiling:
+            text += f"（上限 {self.ceiling / 1048576:.0f} MB）"
+        rss = process_peak_rss()
+        if rss is not None:
+            text += f"，进程峰值RSS {rss / 1048576:.1f} MB"
+        return text
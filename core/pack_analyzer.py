@@ -0,0 +1,393 @@
+"""
+资源包占用分析
+统计每个条目的压缩大小、纹理解码后的内存、音频解码后的PCM内存和时长，检查hitFx网格与特效图片是否匹配，
+并按阈值标记异常条目。尽量只读取文件头：图片只解析尺寸，WAV/FLAC/OGG/MP3只解析头部和少量尾部数据
+"""
+import os
+import struct
+import wave
+import zipfile
+from config.constants import IMAGE_MAPPINGS, AUDIO_MAPPINGS, ANALYZE_THRESHOLDS
+from core.pack_reader import asset_exists, asset_basename, asset_size, open_asset, read_asset_head
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+AUDIO_EXTENSIONS = ('.wav', '.ogg', '.mp3', '.flac')
+HIT_FX_NAMES = ('hit_fx.png', 'hitFx.png')
+
+# 纹理解码为RGBA8888，音频解码为32位浮点PCM（与游戏混音器一致）
+TEXTURE_BYTES_PER_PIXEL = 4
+PCM_BYTES_PER_SAMPLE = 4
+
+# OGG时长取最后一页的granule position，只读取文件末尾的这部分数据
+_OGG_TAIL_BYTES = 64 * 1024
+
+# MPEG音频帧头中的比特率（kbps）和采样率表
+_MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+class AudioInfo:
+    """音频头信息"""
+    def __init__(self, format_name, sample_rate, channels, frames):
+        self.format_name = format_name
+        self.sample_rate = sample_rate
+        self.channels = channels
+        # 每声道的采样数，无法确定时为None
+        self.frames = frames
+
+    @property
+    def duration(self):
+        if self.frames is None or not self.sample_rate:
+            return None
+        return self.frames / self.sample_rate
+
+    @property
+    def pcm_bytes(self):
+        if self.frames is None:
+            return None
+        return self.frames * self.channels * PCM_BYTES_PER_SAMPLE
+
+
+def _read_wav_info(fp):
+    with wave.open(fp, 'rb') as wav:
+        return AudioInfo('WAV', wav.getframerate(), wav.getnchannels(), wav.getnframes())
+
+
+def _read_flac_info(fp):
+    if fp.read(4) != b'fLaC':
+        raise ValueError("不是FLAC文件")
+    # 第一个元数据块必须是STREAMINFO
+    header = fp.read(4)
+    if len(header) < 4 or header[0] & 0x7F != 0:
+        raise ValueError("缺少STREAMINFO")
+    info = fp.read(18)
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    channels = ((info[12] >> 1) & 0x07) + 1
+    total_samples = ((info[13] & 0x0F) << 32) | struct.unpack('>I', info[14:18])[0]
+    return AudioInfo('FLAC', sample_rate, channels, total_samples or None)
+
+
+def _read_ogg_info(fp, size):
+    header = fp.read(64)
+    if not header.startswith(b'OggS'):
+        raise ValueError("不是OGG文件")
+    # 第一页只有一个段，紧跟页头(27字节+段表)的是编码器的识别头
+    packet = header[27 + header[26]:]
+    if packet.startswith(b'\x01vorbis'):
+        format_name = 'OGG Vorbis'
+        channels = packet[11]
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+    elif packet.startswith(b'OpusHead'):
+        # Opus的granule position始终以48kHz计
+        format_name = 'OGG Opus'
+        channels = packet[9]
+        sample_rate = 48000
+    else:
+        raise ValueError("不支持的OGG编码")
+
+    fp.seek(max(0, size - _OGG_TAIL_BYTES))
+    tail = fp.read()
+    last_page = tail.rfind(b'OggS')
+    frames = None
+    if last_page >= 0 and last_page + 14 <= len(tail):
+        granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+        if granule >= 0:
+            frames = granule
+    return AudioInfo(format_name, sample_rate, channels, frames)
+
+
+def _read_mp3_info(fp, size):
+    head = fp.read(10)
+    offset = 0
+    if head.startswith(b'ID3') and len(head) == 10:
+        # 跳过ID3v2标签（大小为4个7位字节）
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        offset = 10 + tag_size
+    fp.seek(offset)
+    data = fp.read(4096)
+    for index in range(len(data) - 4):
+        if data[index] != 0xFF or data[index + 1] & 0xE0 != 0xE0:
+            continue
+        version_bits = (data[index + 1] >> 3) & 0x03
+        layer_bits = (data[index + 1] >> 1) & 0x03
+        bitrate_index = data[index + 2] >> 4
+        rate_index = (data[index + 2] >> 2) & 0x03
+        if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            continue
+        version = 1 if version_bits == 3 else 2
+        layer = 4 - layer_bits
+        sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+        channels = 1 if data[index + 3] >> 6 == 3 else 2
+        samples_per_frame = 384 if layer == 1 else (1152 if layer == 2 or version == 1 else 576)
+
+        # VBR文件在第一帧中记录总帧数（Xing/Info标签）
+        for tag in (b'Xing', b'Info'):
+            position = data.find(tag, index + 4, index + 64)
+            if position >= 0 and position + 12 <= len(data):
+                flags = struct.unpack('>I', data[position + 4:position + 8])[0]
+                if flags & 0x01:
+                    frame_count = struct.unpack('>I', data[position + 8:position + 12])[0]
+                    return AudioInfo('MP3', sample_rate, channels, frame_count * samples_per_frame)
+
+        # CBR：按比特率和数据长度估算
+        bitrate = _MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+        seconds = (size - offset - index) * 8 / bitrate
+        return AudioInfo('MP3', sample_rate, channels, int(seconds * sample_rate))
+    raise ValueError("找不到MPEG音频帧")
+
+
+def read_audio_info(fp, name, size):
+    """根据扩展名解析音频头，fp需要支持seek"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.wav':
+        return _read_wav_info(fp)
+    if extension == '.flac':
+        return _read_flac_info(fp)
+    if extension == '.ogg':
+        return _read_ogg_info(fp, size)
+    if extension == '.mp3':
+        return _read_mp3_info(fp, size)
+    raise ValueError(f"不支持的音频格式 {extension}")
+
+
+class EntryAnalysis:
+    """单个条目的分析结果"""
+    def __init__(self, name, file_size, compressed_size=None):
+        self.name = name
+        self.file_size = file_size
+        # 已打包的资源包中的压缩大小，分析源文件时为None
+        self.compressed_size = compressed_size
+        self.kind = 'other'
+        # 纹理：(宽, 高)
+        self.image_size = None
+        self.audio = None
+        self.note = ''
+        self.warnings = []
+
+    @property
+    def decoded_bytes(self):
+        """解码后的内存占用（纹理为RGBA像素，音频为PCM）"""
+        if self.image_size is not None:
+            return self.image_size[0] * self.image_size[1] * TEXTURE_BYTES_PER_PIXEL
+        if self.audio is not None:
+            return self.audio.pcm_bytes
+        return None
+
+    def __str__(self):
+        text = f"{self.name}: {self.file_size} 字节"
+        if self.compressed_size is not None:
+            text += f"（压缩后 {self.compressed_size} 字节）"
+        if self.image_size is not None:
+            text += (f"，{self.image_size[0]}x{self.image_size[1]}，"
+                     f"解码后 {self.decoded_bytes / 1048576:.2f} MB")
+        elif self.audio is not None:
+            text += f"，{self.audio.format_name} {self.audio.channels}声道 {self.audio.sample_rate}Hz"
+            if self.audio.duration is not None:
+                text += f"，{self.audio.duration:.2f} 秒，PCM {self.audio.pcm_bytes / 1048576:.2f} MB"
+        if self.note:
+            text += f"（{self.note}）"
+        return text
+
+
+class PackAnalysis:
+    """整个资源包的分析结果"""
+    def __init__(self, source):
+        self.source = source
+        self.entries = []
+        # info.yml中的hitFx网格 (列数, 行数)
+        self.hit_fx_grid = None
+        # 打击音（不含结束音乐）的条目名，用于检查打击音时长
+        self.hit_sound_names = set()
+        self.warnings = []
+
+    @property
+    def texture_bytes(self):
+        return sum(entry.decoded_bytes or 0 for entry in self.entries if entry.kind == 'image')
+
+    @property
+    def audio_bytes(self):
+        return sum(entry.decoded_bytes or 0 for entry in self.entries if entry.kind == 'audio')
+
+    @property
+    def all_warnings(self):
+        warnings = list(self.warnings)
+        for entry in self.entries:
+            warnings += [f"{entry.name}: {warning}" for warning in entry.warnings]
+        return warnings
+
+    def format_report(self):
+        lines = [f"资源包: {self.source}"]
+        lines += [f"  {entry}" for entry in self.entries]
+        compressed = [entry.compressed_size for entry in self.entries if entry.compressed_size is not None]
+        total = f"共 {len(self.entries)} 个条目，原始 {sum(entry.file_size for entry in self.entries)} 字节"
+        if compressed:
+            total += f"，压缩后 {sum(compressed)} 字节"
+        lines.append(total)
+        lines.append(f"纹理解码后 {self.texture_bytes / 1048576:.2f} MB，"
+                     f"音频PCM {self.audio_bytes / 1048576:.2f} MB")
+        warnings = self.all_warnings
+        if warnings:
+            lines.append(f"警告 {len(warnings)} 项:")
+            lines += [f"  [警告] {warning}" for warning in warnings]
+        else:
+            lines.append("没有超出阈值的条目")
+        return lines
+
+    def to_dict(self):
+        return {
+            'source': self.source,
+            'hit_fx_grid': self.hit_fx_grid,
+            'texture_bytes': self.texture_bytes,
+            'audio_bytes': self.audio_bytes,
+            'entries': [{
+                'name': entry.name,
+                'kind': entry.kind,
+                'file_size': entry.file_size,
+                'compressed_size': entry.compressed_size,
+                'image_size': entry.image_size,
+                'decoded_bytes': entry.decoded_bytes,
+                'duration': entry.audio.duration if entry.audio is not None else None,
+                'note': entry.note,
+                'warnings': entry.warnings
+            } for entry in self.entries],
+            'warnings': self.all_warnings
+        }
+
+
+def _inspect_entry(entry, open_fp):
+    """读取条目的头部信息，open_fp()返回可seek的文件对象"""
+    from PIL import Image
+
+    extension = os.path.splitext(entry.name)[1].lower()
+    try:
+        if extension in IMAGE_EXTENSIONS:
+            entry.kind = 'image'
+            with open_fp() as fp, Image.open(fp) as img:
+                entry.image_size = img.size
+        elif extension in AUDIO_EXTENSIONS:
+            entry.kind = 'audio'
+            with open_fp() as fp:
+                entry.audio = read_audio_info(fp, entry.name, entry.file_size)
+    except Exception as e:
+        entry.note = f"无法读取文件头: {e}"
+        entry.image_size = None
+
+
+def _check_thresholds(analysis, thresholds):
+    for entry in analysis.entries:
+        if entry.kind == 'image' and entry.image_size is not None:
+            edge = max(entry.image_size)
+            if edge > thresholds['max_texture_edge']:
+                entry.warnings.append(f"边长 {edge} 超过 {thresholds['max_texture_edge']}")
+            if entry.decoded_bytes > thresholds['max_texture_bytes']:
+                entry.warnings.append(f"解码后 {entry.decoded_bytes / 1048576:.1f} MB，"
+                                      f"超过 {thresholds['max_texture_bytes'] / 1048576:.1f} MB")
+        elif entry.kind == 'audio' and entry.audio is not None:
+            duration = entry.audio.duration
+            if entry.name in analysis.hit_sound_names:
+                if duration is not None and duration > thresholds['max_hit_sound_seconds']:
+                    entry.warnings.append(f"打击音时长 {duration:.2f} 秒，"
+                                          f"超过 {thresholds['max_hit_sound_seconds']} 秒")
+            if entry.audio.pcm_bytes is not None and entry.audio.pcm_bytes > thresholds['max_audio_pcm_bytes']:
+                entry.warnings.append(f"PCM {entry.audio.pcm_bytes / 1048576:.1f} MB，"
+                                      f"超过 {thresholds['max_audio_pcm_bytes'] / 1048576:.1f} MB")
+
+    if analysis.texture_bytes > thresholds['max_total_texture_bytes']:
+        analysis.warnings.append(f"纹理解码后共 {analysis.texture_bytes / 1048576:.1f} MB，"
+                                 f"超过 {thresholds['max_total_texture_bytes'] / 1048576:.1f} MB")
+
+
+def _check_hit_fx(analysis, thresholds):
+    """检查hitFx网格与特效图片的尺寸是否匹配"""
+    if analysis.hit_fx_grid is None:
+        return
+    cols, rows = analysis.hit_fx_grid
+    entry = next((entry for entry in analysis.entries if entry.name in HIT_FX_NAMES), None)
+    if entry is None:
+        analysis.warnings.append("info.yml中有hitFx，但资源包中没有打击特效图片")
+        return
+    if entry.image_size is None or cols <= 0 or rows <= 0:
+        return
+    width, height = entry.image_size
+    entry.note = f"hitFx {cols}x{rows} 网格，共 {cols * rows} 帧，单帧 {width // cols}x{height // rows}"
+    if width % cols or height % rows:
+        entry.warnings.append(f"尺寸 {width}x{height} 不能被hitFx网格 {cols}x{rows} 整除，帧会错位")
+    if cols * rows > thresholds['max_hit_fx_frames']:
+        entry.warnings.append(f"共 {cols * rows} 帧，超过 {thresholds['max_hit_fx_frames']} 帧")
+
+
+def _finish(analysis, thresholds):
+    merged = dict(ANALYZE_THRESHOLDS)
+    merged.update(thresholds or {})
+    _check_hit_fx(analysis, merged)
+    _check_thresholds(analysis, merged)
+    return analysis
+
+
+def analyze_zip(zip_path, thresholds=None):
+    """分析已生成的资源包ZIP"""
+    import yaml
+
+    analysis = PackAnalysis(zip_path)
+    with zipfile.ZipFile(zip_path) as zipf:
+        info = {}
+        if 'info.yml' in zipf.NameToInfo:
+            info = yaml.safe_load(zipf.read('info.yml')) or {}
+        hit_fx = info.get('hitFx')
+        if isinstance(hit_fx, list) and len(hit_fx) == 2:
+            analysis.hit_fx_grid = (int(hit_fx[0]), int(hit_fx[1]))
+        audio = info.get('audio') or {}
+        analysis.hit_sound_names = {name for key, name in audio.items() if key != 'endMusic'}
+
+        for zinfo in zipf.infolist():
+            if zinfo.is_dir():
+                continue
+            entry = EntryAnalysis(zinfo.filename, zinfo.file_size, zinfo.compress_size)
+            # 压缩条目的ZipExtFile也支持seek；只读取文件头时解压的数据量很小
+            _inspect_entry(entry, lambda zinfo=zinfo: zipf.open(zinfo))
+            analysis.entries.append(entry)
+    return _finish(analysis, thresholds)
+
+
+def _is_animation(src_path):
+    from core.sprite_packer import ANIMATION_HEAD_BYTES, is_animation
+
+    try:
+        return is_animation(read_asset_head(src_path, ANIMATION_HEAD_BYTES), lambda: open_asset(src_path))
+    except Exception:
+        return False
+
+
+def analyze_params(params, thresholds=None):
+    """分析构建参数引用的源文件（打包前）"""
+    analysis = PackAnalysis(params.get('name') or '未命名资源包')
+    sources = []
+    for param_key, arcname in IMAGE_MAPPINGS.items():
+        sources.append((arcname, params.get(param_key)))
+    if params.get('hit_fx_image'):
+        sources.append(('hit_fx.png', params['hit_fx_image']))
+    for param_key in AUDIO_MAPPINGS:
+        src_path = params.get(param_key)
+        if src_path:
+            sources.append((asset_basename(src_path), src_path))
+            if param_key != 'end_music':
+                analysis.hit_sound_names.add(asset_basename(src_path))
+    if params.get('hit_fx_image') and params.get('fx_cols') and params.get('fx_rows') \
+            and not _is_animation(params['hit_fx_image']):
+        # 动画打击特效在生成时才拼合为精灵图，网格由帧数推导，不与设置的网格比较
+        analysis.hit_fx_grid = (int(params['fx_cols']), int(params['fx_rows']))
+
+    for arcname, src_path in sources:
+        if not src_path or os.path.isdir(src_path) or not asset_exists(src_path):
+            continue
+        entry = EntryAnalysis(arcname, asset_size(src_path))
+        _inspect_entry(entry, lambda src_path=src_path: open_asset(src_path))
+        analysis.entries.append(entry)
+    return _finish(analysis, thresholds)
@@ -0,0 +1,204 @@
+"""
+资源包增量更新
+比较同一资源包的两个版本，只把变化的条目放进增量包；应用增量包时由旧版本重建新版本。
+
+比较只读取两个ZIP的中央目录：名称、CRC32、原始大小、压缩方式和压缩后大小都相同的条目视为未变化，
+不需要解压。未变化的条目即使改了名（如更换了同内容的音频文件名）也能从旧包中复制。
+增量包本身是一个ZIP：
+    phira-delta.json    清单：新包每个条目的元数据和数据来源（旧包中的条目或增量包中的条目）
+    entries/<名称>      变化的条目，压缩数据从新包原样复制
+应用时所有条目的压缩数据都原样复制（core.zip_writer.RawArchive.copy_raw），不解压也不重新压缩，
+通常能得到与新包逐字节相同的文件（清单中记录了新包的SHA-256用于核对）
+"""
+import base64
+import json
+import os
+import zipfile
+from core.zip_writer import RawArchive, file_sha256
+
+DELTA_MANIFEST_NAME = 'phira-delta.json'
+DELTA_ENTRY_PREFIX = 'entries/'
+DELTA_FORMAT_VERSION = 1
+
+# 数据来源
+SOURCE_OLD = 'old'
+SOURCE_DELTA = 'delta'
+
+
+class DeltaError(Exception):
+    """增量包无效，或与旧资源包不匹配"""
+
+
+def _entry_key(info):
+    """判断两个条目压缩数据相同的依据（均来自中央目录）"""
+    return info.CRC, info.file_size, info.compress_type, info.compress_size
+
+
+def _entry_metadata(info):
+    """重建条目时需要的元数据"""
+    return {
+        'name': info.filename,
+        'date_time': list(info.date_time),
+        'compress_type': info.compress_type,
+        'create_system': info.create_system,
+        'external_attr': info.external_attr,
+        'internal_attr': info.internal_attr,
+        'extra': base64.b64encode(info.extra).decode('ascii'),
+        'crc': info.CRC,
+        'file_size': info.file_size,
+        'compress_size': info.compress_size
+    }
+
+
+def _make_zipinfo(meta, name=None):
+    zinfo = zipfile.ZipInfo(name or meta['name'], date_time=tuple(meta['date_time']))
+    zinfo.compress_type = meta['compress_type']
+    zinfo.create_system = meta['create_system']
+    zinfo.external_attr = meta['external_attr']
+    zinfo.internal_attr = meta['internal_attr']
+    zinfo.extra = base64.b64decode(meta['extra'])
+    return zinfo
+
+
+def _check_readable(info, path):
+    if info.flag_bits & 0x1:
+        raise DeltaError(f"{os.path.basename(path)} 中的 {info.filename} 已加密，无法复制")
+
+
+class DeltaReport:
+    """增量包的统计"""
+    def __init__(self, delta_path, new_size, delta_size, copied, changed, removed):
+        self.delta_path = delta_path
+        self.new_size = new_size
+        self.delta_size = delta_size
+        # 从旧包复制的条目名、放入增量包的条目名、新包中不再存在的旧条目名
+        self.copied = copied
+        self.changed = changed
+        self.removed = removed
+
+    def __str__(self):
+        percent = self.delta_size * 100 / self.new_size if self.new_size else 0
+        return (f"增量包 {self.delta_size} 字节（新资源包的 {percent:.1f}%）：复用 {len(self.copied)} 个条目，"
+                f"变化 {len(self.changed)} 个，删除 {len(self.removed)} 个")
+
+
+class ApplyResult:
+    """应用增量包的结果"""
+    def __init__(self, output_path, sha256, expected_sha256, copied, changed):
+        self.output_path = output_path
+        self.sha256 = sha256
+        self.expected_sha256 = expected_sha256
+        self.copied = copied
+        self.changed = changed
+
+    @property
+    def identical(self):
+        """重建的资源包是否与生成增量包时的新包逐字节相同"""
+        return self.sha256 == self.expected_sha256
+
+    def __str__(self):
+        text = f"{self.output_path}: 复用 {self.copied} 个条目，写入 {self.changed} 个条目，SHA-256 {self.sha256}"
+        if not self.identical:
+            text += "（与原新包不是逐字节相同，条目内容已按CRC校验）"
+        return text
+
+
+def create_delta(old_path, new_path, delta_path):
+    """比较两个版本的资源包，生成由old_path重建new_path所需的增量包，返回DeltaReport"""
+    partial_path = f"{delta_path}.{os.getpid()}.tmp"
+    try:
+        with RawArchive(old_path) as old, RawArchive(new_path) as new, \
+                zipfile.ZipFile(partial_path, 'w') as delta:
+            old_by_name = {info.filename: info for info in old.zipf.infolist()}
+            old_by_key = {}
+            for info in old.zipf.infolist():
+                if not info.flag_bits & 0x1:
+                    old_by_key.setdefault(_entry_key(info), info)
+
+            entries = []
+            copied, changed = [], []
+            used_old_names = set()
+            for info in new.zipf.infolist():
+                _check_readable(info, new_path)
+                meta = _entry_metadata(info)
+                # 优先匹配同名条目，其次匹配内容相同的其他条目
+                source = old_by_name.get(info.filename)
+                if source is None or source.flag_bits & 0x1 or _entry_key(source) != _entry_key(info):
+                    source = old_by_key.get(_entry_key(info))
+                if source is not None:
+                    meta.update(source=SOURCE_OLD, source_name=source.filename)
+                    used_old_names.add(source.filename)
+                    copied.append(info.filename)
+                else:
+                    delta_name = DELTA_ENTRY_PREFIX + info.filename
+                    new.copy_raw(info, _make_zipinfo(meta, delta_name), delta)
+                    meta.update(source=SOURCE_DELTA, source_name=delta_name)
+                    changed.append(info.filename)
+                entries.append(meta)
+
+            removed = [name for name in old_by_name if name not in used_old_names
+                       and name not in {meta['name'] for meta in entries}]
+            manifest = {
+                'format': DELTA_FORMAT_VERSION,
+                'old': {'size': os.path.getsize(old_path), 'sha256': file_sha256(old_path)},
+                'new': {'size': os.path.getsize(new_path), 'sha256': file_sha256(new_path),
+                        'comment': base64.b64encode(new.zipf.comment).decode('ascii')},
+                'entries': entries,
+                'removed': removed
+            }
+            delta.writestr(DELTA_MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=1),
+                           compress_type=zipfile.ZIP_DEFLATED)
+        os.replace(partial_path, delta_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return DeltaReport(delta_path, manifest['new']['size'], os.path.getsize(delta_path), copied, changed, removed)
+
+
+def read_delta_manifest(delta_zipf):
+    try:
+        manifest = json.loads(delta_zipf.read(DELTA_MANIFEST_NAME))
+    except KeyError:
+        raise DeltaError(f"不是资源包增量包（缺少 {DELTA_MANIFEST_NAME}）")
+    except ValueError as e:
+        raise DeltaError(f"增量包清单无效: {e}")
+    if manifest.get('format') != DELTA_FORMAT_VERSION:
+        raise DeltaError(f"不支持的增量包格式版本 {manifest.get('format')}")
+    return manifest
+
+
+def apply_delta(old_path, delta_path, output_path):
+    """
+    由旧资源包和增量包重建新资源包，写入临时文件后原子替换output_path
+    从旧包复制的条目按中央目录中的CRC和大小核对，旧包版本不匹配时抛出DeltaError
+    """
+    partial_path = os.path.join(os.path.dirname(os.path.abspath(output_path)),
+                                f".{os.path.basename(output_path)}.{os.getpid()}.tmp")
+    copied = changed = 0
+    try:
+        with RawArchive(old_path) as old, RawArchive(delta_path) as delta, \
+                zipfile.ZipFile(partial_path, 'w') as output:
+            manifest = read_delta_manifest(delta.zipf)
+            sources = {SOURCE_OLD: old, SOURCE_DELTA: delta}
+            for meta in manifest['entries']:
+                archive = sources[meta['source']]
+                try:
+                    info = archive.zipf.getinfo(meta['source_name'])
+                except KeyError:
+                    raise DeltaError(f"{os.path.basename(archive.path)} 中缺少条目 {meta['source_name']}，"
+                                     f"旧资源包版本不匹配")
+                _check_readable(info, archive.path)
+                if (info.CRC, info.file_size) != (meta['crc'], meta['file_size']):
+                    raise DeltaError(f"{os.path.basename(archive.path)} 中的 {meta['source_name']} 内容不一致，"
+                                     f"旧资源包版本不匹配")
+                archive.copy_raw(info, _make_zipinfo(meta), output)
+                if meta['source'] == SOURCE_OLD:
+                    copied += 1
+                else:
+                    changed += 1
+            output.comment = base64.b64decode(manifest['new']['comment'])
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return ApplyResult(output_path, file_sha256(output_path), manifest['new']['sha256'], copied, changed)
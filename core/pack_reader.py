@@ -0,0 +1,201 @@
+"""
+读取已有的资源包
+只读取中央目录和info.yml，把资源包还原为构建参数；其余条目以惰性引用表示：
+    pack://<资源包ZIP的路径>#<条目名>
+引用可以像普通文件路径一样放在params中。只有预览（缩略图）或需要处理内容（裁剪、优化等）时才解压，
+重新构建时由ZIP写入器把压缩数据原样复制到新包，不解压也不重新压缩。
+因此打开很大的资源包也几乎是瞬间完成的
+"""
+import io
+import os
+import zipfile
+from config.constants import IMAGE_MAPPINGS, AUDIO_MAPPINGS, HOLD_ATLAS_KEYS
+
+PACK_REF_PREFIX = 'pack://'
+
+# 用户提供的打击特效图片在包中的名称；示例特效（hitFx.png）不映射，重新构建时按info.yml的参数重新生成
+HIT_FX_ARCNAME = 'hit_fx.png'
+PLACEHOLDER_HIT_FX_ARCNAME = 'hitFx.png'
+
+
+def make_pack_ref(zip_path, arcname):
+    return f"{PACK_REF_PREFIX}{os.path.abspath(zip_path)}#{arcname}"
+
+
+def parse_pack_ref(value):
+    """解析惰性引用，返回 (ZIP路径, 条目名)；不是引用时返回None"""
+    if not isinstance(value, str) or not value.startswith(PACK_REF_PREFIX):
+        return None
+    zip_path, sep, arcname = value[len(PACK_REF_PREFIX):].rpartition('#')
+    if not sep or not zip_path or not arcname:
+        return None
+    return zip_path, arcname
+
+
+def _ref_info(ref):
+    zip_path, arcname = ref
+    try:
+        with zipfile.ZipFile(zip_path) as zipf:
+            return zipf.getinfo(arcname)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+# 以下函数接受普通文件路径或惰性引用
+
+def asset_exists(value):
+    ref = parse_pack_ref(value)
+    if ref is None:
+        return bool(value) and os.path.exists(value)
+    return _ref_info(ref) is not None
+
+
+def asset_basename(value):
+    """文件名（引用为条目名）"""
+    ref = parse_pack_ref(value)
+    return os.path.basename(ref[1] if ref is not None else value)
+
+
+def asset_size(value):
+    """未压缩的大小"""
+    ref = parse_pack_ref(value)
+    if ref is None:
+        return os.path.getsize(value)
+    info = _ref_info(ref)
+    if info is None:
+        raise FileNotFoundError(f"资源包中没有条目: {value}")
+    return info.file_size
+
+
+def asset_mtime_ns(value):
+    """修改时间（引用为资源包文件的修改时间）"""
+    ref = parse_pack_ref(value)
+    return os.stat(ref[0] if ref is not None else value).st_mtime_ns
+
+
+def watch_path(value):
+    """监视修改时应检查的磁盘路径"""
+    ref = parse_pack_ref(value)
+    return ref[0] if ref is not None else value
+
+
+def open_asset(value):
+    """以二进制方式打开（引用在此时才解压），返回可seek的文件对象"""
+    ref = parse_pack_ref(value)
+    if ref is None:
+        return open(value, 'rb')
+    zip_path, arcname = ref
+    with zipfile.ZipFile(zip_path) as zipf:
+        return io.BytesIO(zipf.read(arcname))
+
+
+def read_asset(value):
+    with open_asset(value) as f:
+        return f.read()
+
+
+def read_asset_head(value, size):
+    """读取开头的size个字节（引用只解压这一部分），用于判断文件格式"""
+    ref = parse_pack_ref(value)
+    if ref is None:
+        with open(value, 'rb') as f:
+            return f.read(size)
+    zip_path, arcname = ref
+    with zipfile.ZipFile(zip_path) as zipf, zipf.open(arcname) as f:
+        return f.read(size)
+
+
+class OpenedPack:
+    """
+    从资源包还原的结果
+    params: 可直接填入界面或交给ResourcePackGenerator的参数（只包含资源包中能确定的键）
+    unmapped: 无法对应到任何参数的条目名，重新构建时不会包含
+    """
+    def __init__(self, zip_path, params, entry_count, unmapped, notes):
+        self.zip_path = zip_path
+        self.params = params
+        self.entry_count = entry_count
+        self.unmapped = unmapped
+        self.notes = notes
+
+    def format_report(self):
+        lines = [f"已打开 {self.zip_path}：{self.entry_count} 个条目"]
+        lines += self.notes
+        if self.unmapped:
+            lines.append(f"以下条目不对应任何参数，重新生成时不会包含: {', '.join(self.unmapped)}")
+        return lines
+
+
+def _read_png_header_size(zipf, arcname):
+    """只解压PNG开头的几十个字节读取尺寸"""
+    from core.png_stream import read_png_size
+
+    with zipf.open(arcname) as f:
+        return read_png_size(f.read(32))
+
+
+def read_pack(zip_path):
+    """读取资源包的info.yml和中央目录，返回OpenedPack"""
+    import yaml
+
+    with zipfile.ZipFile(zip_path) as zipf:
+        names = zipf.namelist()
+        try:
+            info = yaml.safe_load(zipf.read('info.yml').decode('utf-8')) or {}
+        except KeyError:
+            raise ValueError(f"{os.path.basename(zip_path)} 中没有info.yml，不是Phira资源包")
+        if not isinstance(info, dict):
+            raise ValueError("info.yml的顶层必须是键值映射")
+
+        params = {
+            'name': str(info.get('name', '')),
+            'author': str(info.get('author', '')),
+            'description': str(info.get('description', ''))
+        }
+        notes = []
+        mapped = {'info.yml'}
+
+        for param_key, arcname in IMAGE_MAPPINGS.items():
+            if arcname in names:
+                params[param_key] = make_pack_ref(zip_path, arcname)
+                mapped.add(arcname)
+
+        audio = info.get('audio') or {}
+        for param_key, audio_key in AUDIO_MAPPINGS.items():
+            arcname = audio.get(audio_key)
+            if arcname in names:
+                params[param_key] = make_pack_ref(zip_path, arcname)
+                mapped.add(arcname)
+            elif arcname:
+                notes.append(f"info.yml引用的音频 {arcname} 不在资源包中")
+
+        hit_fx = info.get('hitFx')
+        if isinstance(hit_fx, list) and len(hit_fx) == 2:
+            params['fx_cols'], params['fx_rows'] = int(hit_fx[0]), int(hit_fx[1])
+        for key, param_key in (('hitFxDuration', 'fx_duration'), ('hitFxScale', 'fx_scale'),
+                               ('hitFxRotate', 'fx_rotate')):
+            if key in info:
+                params[param_key] = info[key]
+
+        hit_fx_arcname = None
+        if HIT_FX_ARCNAME in names:
+            hit_fx_arcname = HIT_FX_ARCNAME
+            params['hit_fx_image'] = make_pack_ref(zip_path, HIT_FX_ARCNAME)
+        elif PLACEHOLDER_HIT_FX_ARCNAME in names:
+            hit_fx_arcname = PLACEHOLDER_HIT_FX_ARCNAME
+            notes.append("资源包使用示例打击特效，重新生成时按特效参数重新绘制")
+        if hit_fx_arcname is not None:
+            mapped.add(hit_fx_arcname)
+            size = _read_png_header_size(zipf, hit_fx_arcname)
+            if size is not None and 'fx_cols' in params:
+                params['fx_total_width'], params['fx_total_height'] = size
+                params['fx_frame_width'] = size[0] // params['fx_cols']
+                params['fx_frame_height'] = size[1] // params['fx_rows']
+
+        for info_key, arcname in (('holdAtlas', 'hold.png'), ('holdAtlasMH', 'hold_mh.png')):
+            atlas = info.get(info_key)
+            if isinstance(atlas, list) and len(atlas) == 2:
+                params.update(zip(HOLD_ATLAS_KEYS[arcname], (int(atlas[0]), int(atlas[1]))))
+
+        unmapped = [name for name in names if name not in mapped and not name.endswith('/')]
+        return OpenedPack(os.path.abspath(zip_path), params, len(names), unmapped, notes)
@@ -0,0 +1,162 @@
+"""
+PNG无损优化
+去除元数据块，在像素完全不变的前提下尝试更紧凑的颜色模式（去掉全不透明的alpha、灰度、调色板），
+并在多种zlib压缩策略中选出最小的编码结果
+"""
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PIL import Image
+from core.image_pipeline import ImagePipeline
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 可以安全转换的颜色模式，其余模式（如16位）保持原样
+_SUPPORTED_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+
+# 尝试的zlib策略：默认、Z_FILTERED、Z_RLE
+# 行过滤器由Pillow按行自适应选择（对每一行选择差值和最小的过滤器）
+_ZLIB_STRATEGIES = (0, 1, 3)
+
+
+class OptimizeResult:
+    """单个文件的优化结果"""
+    def __init__(self, name, original_size, optimized_size, mode=None, note='', complete=True):
+        self.name = name
+        self.original_size = original_size
+        self.optimized_size = optimized_size
+        self.mode = mode
+        self.note = note
+        # 因时间预算提前结束时为False，此时结果不应写入缓存
+        self.complete = complete
+
+    @property
+    def bytes_saved(self):
+        return self.original_size - self.optimized_size
+
+    def __str__(self):
+        if self.note:
+            return f"{self.name}: 未优化（{self.note}）"
+        percent = self.bytes_saved * 100 / self.original_size if self.original_size else 0
+        return (f"{self.name}: {self.original_size} -> {self.optimized_size} 字节"
+                f"（-{percent:.1f}%，{self.mode}）")
+
+
+def _encode(img, strategy):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', compress_level=9, compress_type=strategy)
+    return buffer.getvalue()
+
+
+def _strip_metadata(img):
+    """去掉convert()从原图复制来的元数据（Pillow保存时会写回info中的icc_profile等），只保留透明色"""
+    img.info = {key: value for key, value in img.info.items() if key == 'transparency'}
+    return img
+
+
+def _same_pixels(a, b):
+    # 逐字节比较全部通道；ImageChops.difference(...).getbbox()对RGBA图像默认只看alpha通道
+    return a.mode == b.mode and a.size == b.size and a.tobytes() == b.tobytes()
+
+
+def _candidate_images(img):
+    """生成与原图像素完全一致的候选图像（按模式从宽到窄）"""
+    has_alpha = img.mode in ('LA', 'RGBA', 'P') or 'transparency' in img.info
+    base = img.convert('RGBA' if has_alpha else 'RGB')
+    candidates = [base]
+
+    if has_alpha and base.getchannel('A').getextrema() == (255, 255):
+        base = base.convert('RGB')
+        has_alpha = False
+        candidates.append(base)
+
+    red, green, blue = base.getchannel('R'), base.getchannel('G'), base.getchannel('B')
+    if _same_pixels(red, green) and _same_pixels(green, blue):
+        candidates.append(base.convert('LA' if has_alpha else 'L'))
+
+    colors = base.getcolors(256)
+    if colors is not None:
+        if has_alpha:
+            palette_img = base.quantize(colors=len(colors), method=Image.Quantize.FASTOCTREE)
+        else:
+            # 调色板中包含全部颜色时，最近颜色映射就是精确映射
+            palette = Image.new('P', (1, 1))
+            palette.putpalette([channel for _, color in colors for channel in color])
+            palette_img = base.quantize(palette=palette, dither=Image.Dither.NONE)
+        candidates.append(palette_img)
+
+    return [_strip_metadata(candidate) for candidate in candidates]
+
+
+def optimize_png(name, data, deadline=None, cancel_event=None, pipeline=None):
+    """
+    无损优化一张PNG
+    cancel_event: threading.Event，被设置后在下一次编码前放弃
+    pipeline: 构建共享的ImagePipeline，前面的阶段已解码过的数据不再解码
+    返回: (bytes, OptimizeResult)，没有更小的结果时返回原始数据
+    """
+    original_size = len(data)
+    if cancel_event is not None and cancel_event.is_set():
+        return data, OptimizeResult(name, original_size, original_size, note="已取消", complete=False)
+    if not data.startswith(PNG_SIGNATURE):
+        return data, OptimizeResult(name, original_size, original_size, note="不是PNG文件")
+
+    if pipeline is None:
+        pipeline = ImagePipeline()
+    try:
+        img = pipeline.decode(data)
+        if getattr(img, 'n_frames', 1) > 1:
+            return data, OptimizeResult(name, original_size, original_size, note="动画PNG")
+        if img.mode not in _SUPPORTED_MODES:
+            return data, OptimizeResult(name, original_size, original_size,
+                                        note=f"不支持的颜色模式 {img.mode}")
+        reference = img.convert('RGBA')
+        candidates = _candidate_images(img)
+    except (OSError, ValueError) as e:
+        return data, OptimizeResult(name, original_size, original_size, note=f"无法解码: {e}")
+
+    best, best_mode = data, None
+    timed_out = False
+    for candidate in candidates:
+        for strategy in _ZLIB_STRATEGIES:
+            if deadline is not None and time.monotonic() > deadline:
+                timed_out = True
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                return data, OptimizeResult(name, original_size, original_size, note="已取消",
+                                            complete=False)
+            encoded = _encode(candidate, strategy)
+            if len(encoded) >= len(best):
+                continue
+            # 解码编码结果逐像素核对，确保无损
+            with Image.open(io.BytesIO(encoded)) as check:
+                if not _same_pixels(check.convert('RGBA'), reference):
+                    break
+            best, best_mode = encoded, candidate.mode
+
+    if best_mode is None:
+        note = "超出时间预算" if timed_out else "已是最优"
+        return data, OptimizeResult(name, original_size, original_size, note=note,
+                                    complete=not timed_out)
+    return best, OptimizeResult(name, original_size, len(best), mode=best_mode, complete=not timed_out)
+
+
+def optimize_pngs(items, time_budget=None, workers=None, on_done=None, cancel_event=None, pipeline=None):
+    """
+    并行优化多张PNG
+    items: [(name, data), ...]
+    time_budget: 总时间预算（秒），超出后剩余文件保持原样
+    on_done: 每个文件完成时在调用线程中调用 on_done(name, 原始大小)
+    cancel_event: 被设置后尚未完成的文件保持原样
+    pipeline: 共享的ImagePipeline（解码缓存）
+    返回: [(bytes, OptimizeResult), ...]，顺序与items一致
+    """
+    deadline = time.monotonic() + time_budget if time_budget else None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(optimize_png, name, data, deadline, cancel_event, pipeline)
+                   for name, data in items]
+        if on_done is not None:
+            names = {future: (name, len(data)) for future, (name, data) in zip(futures, items)}
+            for future in as_completed(futures):
+                on_done(*names[future])
+        return [future.result() for future in futures]
@@ -0,0 +1,115 @@
+"""
+流式PNG编码
+按行带（band）逐段写入像素，整张图片不需要同时存在于内存中。
+每行使用Up过滤（与上一行逐字节相减），对打击特效这类按帧成块的图像压缩效果很好
+"""
+import struct
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG颜色类型
+_COLOR_TYPES = {'RGBA': (6, 4), 'RGB': (2, 3), 'LA': (4, 2), 'L': (0, 1)}
+
+# 每个IDAT块的最大数据量
+IDAT_CHUNK_SIZE = 256 * 1024
+
+_FILTER_UP = 2
+
+
+def _chunk(chunk_type, data):
+    return (struct.pack('>I', len(data)) + chunk_type + data
+            + struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+
+def read_png_size(data):
+    """
+    从PNG数据的IHDR块读取 (宽, 高)，不是PNG时返回None
+    不经过Pillow，超大图像不会触发其解压炸弹检查
+    """
+    if data[:8] != PNG_SIGNATURE or data[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', data[16:24])
+
+
+def png_is_animated(head):
+    """
+    根据PNG开头的数据判断是否为APNG（acTL块出现在第一个IDAT之前）
+    head不足以判断（开头的块太大）时返回None；不是PNG时返回False
+    """
+    if head[:8] != PNG_SIGNATURE:
+        return False
+    offset = 8
+    while offset + 8 <= len(head):
+        length, chunk_type = struct.unpack('>I4s', head[offset:offset + 8])
+        if chunk_type == b'acTL':
+            return True
+        if chunk_type in (b'IDAT', b'IEND'):
+            return False
+        offset += 12 + length
+    return None
+
+
+class PngStreamWriter:
+    """
+    用法:
+        with PngStreamWriter(fp, width, height) as writer:
+            writer.write_rows(band)  # numpy数组 [行数, 宽, 通道数]，uint8
+    所有行写完后才能退出；行数不足时抛出ValueError
+    """
+    def __init__(self, fp, width, height, mode='RGBA', compress_level=6):
+        if mode not in _COLOR_TYPES:
+            raise ValueError(f"不支持的颜色模式 {mode}")
+        self.fp = fp
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.channels = _COLOR_TYPES[mode][1]
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+        self._previous_row = None
+
+    def __enter__(self):
+        color_type = _COLOR_TYPES[self.mode][0]
+        self.fp.write(PNG_SIGNATURE)
+        self.fp.write(_chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, color_type, 0, 0, 0)))
+        return self
+
+    def write_rows(self, band):
+        """写入若干行像素"""
+        import numpy as np
+
+        band = np.ascontiguousarray(band, dtype=np.uint8).reshape(-1, self.width * self.channels)
+        if self.rows_written + band.shape[0] > self.height:
+            raise ValueError("写入的行数超过图像高度")
+
+        previous = self._previous_row
+        if previous is None:
+            previous = np.zeros(self.width * self.channels, dtype=np.uint8)
+        # Up过滤：每行减去上一行（uint8按256取模），带内第一行与上一带的最后一行相减
+        filtered = np.empty((band.shape[0], band.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = _FILTER_UP
+        filtered[0, 1:] = band[0] - previous
+        filtered[1:, 1:] = band[1:] - band[:-1]
+        self._previous_row = band[-1].copy()
+        self.rows_written += band.shape[0]
+
+        self._pending += self._compressor.compress(filtered.tobytes())
+        self._flush_idat(final=False)
+
+    def _flush_idat(self, final):
+        while len(self._pending) >= IDAT_CHUNK_SIZE or (final and self._pending):
+            data = bytes(self._pending[:IDAT_CHUNK_SIZE])
+            del self._pending[:IDAT_CHUNK_SIZE]
+            self.fp.write(_chunk(b'IDAT', data))
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        if self.rows_written != self.height:
+            raise ValueError(f"只写入了 {self.rows_written}/{self.height} 行")
+        self._pending += self._compressor.flush()
+        self._flush_idat(final=True)
+        self.fp.write(_chunk(b'IEND', b''))
+        return False
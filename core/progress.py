@@ -0,0 +1,153 @@
+"""
+构建进度上报
+ResourcePackGenerator在每个阶段、每个文件和每个写入的数据块后调用进度回调，
+回调只接收一个ProgressEvent，不依赖Qt，界面和命令行都可以使用
+"""
+import time
+
+# 构建阶段及其显示名称
+STAGE_LABELS = {
+    'images': "收集图像",
+    'trim': "裁剪透明边距",
+    'hit_fx': "处理打击特效",
+    'budget': "纹理尺寸预算",
+    'optimize': "PNG无损优化",
+    'info': "生成info.yml",
+    'audio': "打击音预处理",
+    'zip': "写入ZIP",
+    'done': "完成"
+}
+
+# 同一文件内两次进度回调的最小间隔（秒），避免回调过于频繁
+MIN_EMIT_INTERVAL = 0.05
+
+
+class ProgressEvent:
+    """某一时刻的构建进度"""
+    def __init__(self, stage, stage_index, stage_count, filename, bytes_done, bytes_total, elapsed,
+                 bytes_per_second, eta_seconds):
+        self.stage = stage
+        self.stage_index = stage_index
+        self.stage_count = stage_count
+        self.filename = filename
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        # 从构建开始到现在的秒数
+        self.elapsed = elapsed
+        # 当前阶段的平均吞吐量，未知时为0
+        self.bytes_per_second = bytes_per_second
+        # 预计剩余秒数，无法估算时为None
+        self.eta_seconds = eta_seconds
+
+    @property
+    def stage_label(self):
+        return STAGE_LABELS.get(self.stage, self.stage)
+
+    @property
+    def fraction(self):
+        """整体进度（0-1）：已完成的阶段加上当前阶段按字节计算的进度"""
+        if self.stage == 'done':
+            return 1.0
+        if not self.stage_count:
+            return 0.0
+        stage_fraction = self.bytes_done / self.bytes_total if self.bytes_total else 0.0
+        return min(1.0, (self.stage_index + stage_fraction) / self.stage_count)
+
+    def __str__(self):
+        if self.stage == 'done':
+            return f"{self.stage_label}，用时 {self.elapsed:.1f} 秒"
+        text = f"[{self.stage_index + 1}/{self.stage_count}] {self.stage_label}"
+        if self.filename:
+            text += f" {self.filename}"
+        if self.bytes_total:
+            text += (f" {self.bytes_done / 1048576:.1f}/{self.bytes_total / 1048576:.1f} MB"
+                     f" {self.bytes_per_second / 1048576:.1f} MB/s")
+        if self.eta_seconds is not None:
+            text += f" 剩余约 {self.eta_seconds:.0f} 秒"
+        return text
+
+
+class ProgressTracker:
+    """
+    统计进度并调用回调，同时记录每个阶段的耗时（stage_timings）
+    callback为None时不发出进度事件
+    """
+    def __init__(self, callback=None, stages=()):
+        self.callback = callback
+        self.stages = list(stages)
+        self.stage = None
+        self.stage_index = 0
+        self.filename = ''
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.started_at = time.perf_counter()
+        self.stage_started_at = self.started_at
+        self._file_start_bytes = 0
+        self._last_emit = 0.0
+        # 每个阶段的耗时（秒），按阶段进入的顺序排列
+        self.stage_timings = {}
+
+    def _close_stage(self):
+        if self.stage is not None and self.stage != 'done':
+            elapsed = time.perf_counter() - self.stage_started_at
+            self.stage_timings[self.stage] = self.stage_timings.get(self.stage, 0.0) + elapsed
+
+    def start_stage(self, stage, bytes_total=0):
+        """进入一个新阶段，bytes_total为该阶段预计处理的字节数"""
+        if stage == self.stage:
+            # 同一阶段内重新设置预计字节数（如先收集文件、再开始处理），不重新计时
+            self.bytes_total = bytes_total
+            self.bytes_done = 0
+            self.emit(force=True)
+            return
+        self._close_stage()
+        if stage in self.stages:
+            self.stage_index = self.stages.index(stage)
+        self.stage = stage
+        self.filename = ''
+        self.bytes_done = 0
+        self.bytes_total = bytes_total
+        self._file_start_bytes = 0
+        self.stage_started_at = time.perf_counter()
+        self.emit(force=True)
+
+    def start_file(self, filename):
+        self.filename = filename
+        self._file_start_bytes = self.bytes_done
+        self.emit(force=True)
+
+    def advance(self, nbytes):
+        """当前文件又处理了nbytes字节"""
+        self.bytes_done += nbytes
+        self.emit()
+
+    def finish_file(self, file_size):
+        """当前文件处理完成（缓存命中等未逐块读取的情况也会计入完整大小）"""
+        self.bytes_done = self._file_start_bytes + file_size
+        self.emit()
+
+    def finish(self):
+        """全部完成"""
+        self._close_stage()
+        self.stage = 'done'
+        self.stage_index = len(self.stages)
+        self.filename = ''
+        self.emit(force=True)
+
+    def emit(self, force=False):
+        if self.callback is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_emit < MIN_EMIT_INTERVAL:
+            return
+        self._last_emit = now
+
+        stage_elapsed = now - self.stage_started_at
+        rate = self.bytes_done / stage_elapsed if stage_elapsed > 0 else 0.0
+        eta = None
+        if self.bytes_total and rate > 0:
+            eta = (self.bytes_total - self.bytes_done) / rate
+        self.callback(ProgressEvent(
+            self.stage, self.stage_index, len(self.stages), self.filename,
+            self.bytes_done, self.bytes_total, now - self.started_at, rate, eta
+        ))
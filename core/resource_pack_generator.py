@@ -2,103 +2,766 @@
 Phira资源包生成器核心逻辑
 负责处理资源包生成的各种操作
 """
+import io
+import json
 import os
-import shutil
-import zipfile
-import tempfile
-from PIL import Image
-import yaml
-from config.constants import IMAGE_MAPPINGS, AUDIO_MAPPINGS
+import threading
+from config.constants import (
+    IMAGE_MAPPINGS, AUDIO_MAPPINGS, DEFAULT_ZIP_COMPRESS_LEVEL, DEFAULT_CACHE_MAX_BYTES,
+    DEFAULT_OPTIMIZE_TIME_BUDGET, HIT_SOUND_KEYS, DEFAULT_AUDIO_SAMPLE_RATE,
+    DEFAULT_AUDIO_SILENCE_DB, DEFAULT_AUDIO_PEAK_DB, DEFAULT_TRIM_MARGIN, HOLD_ATLAS_KEYS,
+    DEFAULT_MEMORY_CEILING, DEFAULT_REPRODUCIBLE
+)
+from core.asset_cache import AssetCache
+from core.image_pipeline import ImagePipeline
+from core.memory_budget import MemoryBudget
+from core.pack_reader import (
+    parse_pack_ref, asset_exists, asset_basename, asset_size, read_asset, read_asset_head, open_asset
+)
+from core.progress import ProgressTracker
+from core.zip_writer import PackZipWriter, file_sha256
+
+# Pillow、PyYAML、numpy以及依赖它们的模块在首次使用时才导入，
+# 使只导入本模块（如命令行解析清单、界面启动）时不必付出加载这些依赖的开销
+
+
+class BuildCancelled(Exception):
+    """构建被ResourcePackGenerator.cancel()取消"""
+
+
+class CancellableBuffer(io.BytesIO):
+    """
+    每次写入前检查是否已取消的内存缓冲区
+    PNG编码会分块写入输出文件，借此让耗时的大图编码也能及时中止
+    """
+    def __init__(self, cancel_check):
+        super().__init__()
+        self.cancel_check = cancel_check
+
+    def write(self, data):
+        self.cancel_check()
+        return super().write(data)
+
+
+class PackEntry:
+    """
+    资源包中的一个条目
+    内容来自磁盘上的源文件（src_path）、内存中生成的数据（data）或已有资源包中的条目（ref，
+    core.pack_reader的惰性引用），三者取其一
+    """
+    def __init__(self, arcname, src_path=None, data=None, ref=None):
+        self.arcname = arcname
+        self.src_path = src_path
+        self.data = data
+        self.ref = ref
+
+    def read(self):
+        """读取条目的完整内容（引用在此时才解压）"""
+        if self.data is not None:
+            return self.data
+        if self.ref is not None:
+            return read_asset(self.ref)
+        with open(self.src_path, 'rb') as f:
+            return f.read()
+
+    def head(self, size):
+        """读取开头的size个字节"""
+        if self.data is not None:
+            return self.data[:size]
+        return read_asset_head(self.ref if self.ref is not None else self.src_path, size)
+
+    @property
+    def size(self):
+        """未压缩的大小"""
+        if self.data is not None:
+            return len(self.data)
+        return asset_size(self.ref if self.ref is not None else self.src_path)
+
+
+def _check_placeholder_grid(total_width, total_height, frame_width, frame_height, cols, rows):
+    # 网格超出画布时无法完整绘制（旧的逐像素实现此时会抛出越界异常）
+    if cols * frame_width > total_width or rows * frame_height > total_height:
+        raise ValueError(
+            f"打击特效网格 {cols}x{rows}（单帧 {frame_width}x{frame_height}）"
+            f"超出特效总尺寸 {total_width}x{total_height}"
+        )
+
+
+def _placeholder_color(row, col):
+    """示例打击特效中位于(row, col)的帧的颜色"""
+    return (row * 30) % 256, (col * 50) % 256, ((row + col) * 20) % 256, 255
+
+
+def render_placeholder_hit_fx(total_width, total_height, frame_width, frame_height, cols, rows,
+                              cancel_check=None):
+    """
+    绘制示例打击特效图像
+    每一帧整块填充为由行列位置决定的颜色，其余区域保持透明
+    cancel_check: 每绘制一行帧前调用，用于响应取消
+    """
+    _check_placeholder_grid(total_width, total_height, frame_width, frame_height, cols, rows)
+
+    from PIL import Image
+
+    fx_img = Image.new('RGBA', (total_width, total_height), (255, 255, 255, 0))
+
+    # 在每个帧位置填充不同颜色的方块以示区分（整帧填充，避免逐像素调用）
+    for row in range(rows):
+        if cancel_check is not None:
+            cancel_check()
+        for col in range(cols):
+            x = col * frame_width
+            y = row * frame_height
+            fx_img.paste(_placeholder_color(row, col), (x, y, x + frame_width, y + frame_height))
+
+    return fx_img
+
+
+def write_placeholder_hit_fx_png(fp, total_width, total_height, frame_width, frame_height, cols, rows,
+                                 memory=None, cancel_check=None):
+    """
+    绘制示例打击特效并编码为PNG写入fp，像素与render_placeholder_hit_fx一致
+    整张图在内存上限之内时用Pillow编码，输出与旧版本逐字节一致；超出上限时按行带绘制并流式编码
+    memory: MemoryBudget，决定是否流式编码、行带高度并统计缓冲区占用；为None时不限制
+    cancel_check: 每行帧（流式编码时为每个行带）前调用，用于响应取消
+    """
+    _check_placeholder_grid(total_width, total_height, frame_width, frame_height, cols, rows)
+
+    import numpy as np
+    from core.memory_budget import MemoryBudget
+    from core.png_stream import PngStreamWriter
+
+    memory = memory or MemoryBudget()
+    row_bytes = total_width * 4
+    if memory.fits(total_height * row_bytes):
+        with memory.hold(total_height * row_bytes):
+            render_placeholder_hit_fx(total_width, total_height, frame_width, frame_height, cols, rows,
+                                      cancel_check).save(fp, format='PNG')
+        return
+
+    band_rows = memory.band_rows(row_bytes, total_height)
+    with PngStreamWriter(fp, total_width, total_height) as writer:
+        for top in range(0, total_height, band_rows):
+            if cancel_check is not None:
+                cancel_check()
+            bottom = min(top + band_rows, total_height)
+            # 行带缓冲区和编码时的过滤副本
+            with memory.hold((bottom - top) * row_bytes * 2):
+                band = np.empty((bottom - top, total_width, 4), dtype=np.uint8)
+                band[:] = (255, 255, 255, 0)
+                for row in range(top // frame_height, min(rows, (bottom - 1) // frame_height + 1)):
+                    y0 = max(row * frame_height, top) - top
+                    y1 = min((row + 1) * frame_height, bottom) - top
+                    for col in range(cols):
+                        band[y0:y1, col * frame_width:(col + 1) * frame_width] = _placeholder_color(row, col)
+                writer.write_rows(band)
 
 
 class ResourcePackGenerator:
-    def __init__(self, params):
-        self.params = params
-        self.temp_dir = None
+    def __init__(self, params, progress_callback=None):
+        # 复制一份参数，构建过程中推导出的值（如打击特效网格）不会写回调用方的字典
+        self.params = dict(params)
+        # 进度回调，接收core.progress.ProgressEvent，在调用generate()的线程中被调用
+        self.progress_callback = progress_callback
+        self.progress = ProgressTracker()
+        # cancel()可以在其他线程中调用，构建在下一个检查点抛出BuildCancelled
+        self.cancel_event = threading.Event()
+        # 待写入ZIP的条目，按arcname去重（后加入的覆盖先加入的）
+        self.entries = {}
+        self.zip_path = None
+        # 生成的资源包的SHA-256
+        self.pack_sha256 = None
+        # 正在写入的临时ZIP，写完后原子替换为zip_path
+        self.partial_path = None
+        # 每个条目的写入报告（EntryReport列表）
+        self.report = []
+        # PNG无损优化的结果（OptimizeResult列表）
+        self.optimize_report = []
+        # 由单帧图片拼合打击特效时的网格布局（SheetLayout）
+        self.hit_fx_layout = None
+        # 打击特效图片为GIF/APNG动画时的帧信息（AnimationInfo）
+        self.hit_fx_animation = None
+        # 成功构建后每个阶段的耗时（秒），键与core.progress.STAGE_LABELS一致
+        self.stage_timings = {}
+        # 透明边距裁剪的结果（TrimResult列表）
+        self.trim_report = []
+        # 纹理尺寸预算的调整方案（TexturePlan列表）
+        self.budget_report = []
+        # 打击音预处理的结果（AudioResult列表）
+        self.audio_report = []
+        # 内容寻址缓存，params中未指定cache_dir时不启用
+        self.cache = None
+        # 像素缓冲区的内存上限和本次构建的峰值占用
+        self.memory = MemoryBudget(DEFAULT_MEMORY_CEILING)
+        # 构建内共享的图像解码缓存和编码线程池
+        self.images = ImagePipeline(0, self.memory)
+        # 非PNG纹理转换为PNG的结果（ConvertResult列表）
+        self.convert_report = []
 
     def generate(self):
         """
         生成资源包的主要方法
+        所有条目直接写入ZIP：源文件分块流式写入，生成的内容从内存写入，不再经过临时目录
         返回: (success: bool, message: str)
         """
         try:
-            # 创建临时目录
-            self.temp_dir = tempfile.mkdtemp(prefix='phira_pack_')
-            
-            # 复制基本图像文件
+            self.entries = {}
+            self.report = []
+            self.optimize_report = []
+            self.hit_fx_layout = None
+            self.hit_fx_animation = None
+            self.audio_report = []
+            self.trim_report = []
+            self.budget_report = []
+            self.stage_timings = {}
+            self.pack_sha256 = None
+            self.memory = MemoryBudget(self.params.get('memory_ceiling', DEFAULT_MEMORY_CEILING))
+            # 解码缓存最多占用内存上限的一半，另一半留给按行带处理的大图
+            self.images = ImagePipeline(self.memory.ceiling // 2, self.memory, self.params.get('zip_workers'))
+            self.convert_report = []
+            self.progress = ProgressTracker(self.progress_callback, self.planned_stages())
+            if self.params.get('cache_dir'):
+                self.cache = AssetCache(
+                    self.params['cache_dir'],
+                    self.params.get('cache_max_bytes', DEFAULT_CACHE_MAX_BYTES)
+                )
+
+            # 收集基本图像文件
+            self.progress.start_stage('images')
             self.copy_basic_images()
-            
+
+            # 裁剪音符纹理的透明边距（可选）
+            if self.params.get('trim_transparent'):
+                self.trim_textures()
+
             # 处理打击特效
+            self.progress.start_stage('hit_fx')
             self.process_hit_effects()
-            
+
+            # 纹理尺寸预算（可选）
+            if self.texture_budget_enabled():
+                self.enforce_texture_budget()
+
+            # PNG无损优化（可选）
+            if self.params.get('optimize_png'):
+                self.optimize_textures()
+
             # 生成info.yml文件
+            self.progress.start_stage('info')
             self.generate_info_yml()
-            
+
+            # 打击音预处理（可选）
+            if self.params.get('process_hit_sounds'):
+                self.process_hit_sounds()
+
             # 打包为ZIP文件
             zip_path = self.create_zip_package()
-            
-            # 清理临时目录
-            self.cleanup()
-            
+
+            if self.cache is not None:
+                self.cache.save()
+
+            self.progress.finish()
+            self.stage_timings = dict(self.progress.stage_timings)
             return True, zip_path
-            
+
+        except BuildCancelled:
+            self.cleanup()
+            # 已完成的处理结果仍然有效，保留在缓存中
+            if self.cache is not None:
+                self.cache.save()
+            return False, "已取消"
+
         except Exception as e:
-            # 如果出错也要清理临时目录
-            if self.temp_dir:
-                self.cleanup()
+            # 如果出错要删除写了一半的临时ZIP文件
+            self.cleanup()
             return False, str(e)
 
+        finally:
+            self.images.clear()
+
+    def cancel(self):
+        """
+        请求取消构建（线程安全）
+        构建会在处理下一个文件、下一行帧或下一个数据块之前停止，并删除未完成的ZIP文件
+        """
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """已请求取消时抛出BuildCancelled"""
+        if self.cancel_event.is_set():
+            raise BuildCancelled()
+
+    def planned_stages(self):
+        """本次构建会经过的阶段（用于计算整体进度）"""
+        stages = ['images']
+        if self.params.get('trim_transparent'):
+            stages.append('trim')
+        stages.append('hit_fx')
+        if self.texture_budget_enabled():
+            stages.append('budget')
+        if self.params.get('optimize_png'):
+            stages.append('optimize')
+        stages.append('info')
+        if self.params.get('process_hit_sounds'):
+            stages.append('audio')
+        stages.append('zip')
+        return stages
+
+    def add_file_entry(self, arcname, src_path):
+        """登记一个来自磁盘文件（或已有资源包中条目的引用）的条目"""
+        if parse_pack_ref(src_path) is not None:
+            self.entries[arcname] = PackEntry(arcname, ref=src_path)
+        else:
+            self.entries[arcname] = PackEntry(arcname, src_path=src_path)
+
+    def add_data_entry(self, arcname, data):
+        """登记一个内存中生成的条目"""
+        self.entries[arcname] = PackEntry(arcname, data=data)
+
     def copy_basic_images(self):
-        """复制基础图像文件"""
+        """收集基础图像文件"""
         for param_key, dest_filename in IMAGE_MAPPINGS.items():
+            self.check_cancelled()
             src_path = self.params.get(param_key)
-            if src_path and os.path.exists(src_path):
-                dest_path = os.path.join(self.temp_dir, dest_filename)
-                shutil.copy2(src_path, dest_path)
+            if src_path and asset_exists(src_path):
+                self.add_file_entry(dest_filename, src_path)
+        self.convert_textures(IMAGE_MAPPINGS.values())
+
+    def convert_textures(self, arcnames):
+        """
+        把非PNG格式的纹理源文件（JPEG、GIF、BMP等）转换为真正的PNG
+        只读取文件头判断格式，PNG源文件（包括已有资源包中的条目）不读取内容；转换在线程池中并行编码，
+        结果按源数据的哈希缓存
+        """
+        from core.image_pipeline import ConvertResult, is_png
+
+        pending = []
+        for arcname in arcnames:
+            entry = self.entries.get(arcname)
+            if entry is None or is_png(entry.head(8)):
+                continue
+            self.check_cancelled()
+            self.progress.start_file(arcname)
+            data = entry.read()
+            key = None
+            if self.cache is not None:
+                key = AssetCache.make_key('png-convert-v1', AssetCache.data_digest(data))
+                cached = self.cache.get(key)
+                if cached is not None:
+                    # 缓存格式：一行JSON描述转换结果 + 换行 + PNG数据
+                    summary, _, png = cached.partition(b'\n')
+                    self.add_data_entry(arcname, png)
+                    self.convert_report.append(ConvertResult(arcname, **json.loads(summary)))
+                    continue
+            source = entry.ref or entry.src_path or arcname
+            pending.append((arcname, asset_basename(source), data, key))
+
+        def convert(item):
+            arcname, source_name, data, _ = item
+            from PIL import UnidentifiedImageError
+
+            try:
+                return self.images.to_png(data, arcname)
+            except UnidentifiedImageError:
+                raise ValueError(f"{source_name} 不是支持的图像格式")
+            except (OSError, ValueError) as e:
+                raise ValueError(f"{source_name} 无法解码: {e}")
+
+        results = self.images.map(convert, pending)
+        self.check_cancelled()
+        for (arcname, _, _, key), (png, result) in zip(pending, results):
+            self.add_data_entry(arcname, png)
+            self.convert_report.append(result)
+            if key is not None:
+                summary = {
+                    'source_format': result.source_format,
+                    'size': result.size,
+                    'original_size': result.original_size,
+                    'converted_size': result.converted_size
+                }
+                self.cache.put(key, json.dumps(summary).encode('utf-8') + b'\n' + png)
+
+    def trim_textures(self):
+        """
+        裁剪音符纹理上下的透明边距
+        Hold纹理的裁剪量受holdAtlas限制，并同步减小params中的atlas值，保证渲染结果不变
+        """
+        from core.texture_trim import TrimResult, trim_texture
+
+        margin = self.params.get('trim_margin', DEFAULT_TRIM_MARGIN)
+        self.progress.start_stage('trim')
+        for arcname in IMAGE_MAPPINGS.values():
+            entry = self.entries.get(arcname)
+            if entry is None:
+                continue
+            self.check_cancelled()
+            self.progress.start_file(arcname)
+            data = entry.read()
+            size, decoded = self.texture_size(data)
+            if not self.images.make_room(decoded):
+                self.trim_report.append(TrimResult(arcname, size, note="超出内存上限"))
+                continue
+
+            atlas_keys = HOLD_ATLAS_KEYS.get(arcname)
+            atlas = None
+            if atlas_keys is not None and all(key in self.params for key in atlas_keys):
+                atlas = tuple(self.params[key] for key in atlas_keys)
+
+            def produce():
+                # 缓存格式：一行JSON描述裁剪结果 + 换行 + 裁剪后的数据（未裁剪时为空）
+                with self.memory.hold(decoded):
+                    trimmed, result = trim_texture(arcname, data, margin, atlas, self.images)
+                summary = {
+                    'original_size': result.original_size,
+                    'trimmed_size': result.trimmed_size,
+                    'cut_top': result.cut_top,
+                    'cut_bottom': result.cut_bottom,
+                    'atlas': result.atlas,
+                    'note': result.note
+                }
+                return json.dumps(summary).encode('utf-8') + b'\n' + (b'' if result.note else trimmed)
+
+            cached = self.cached(('trim-v1', AssetCache.data_digest(data), margin, atlas), produce)
+            summary, _, trimmed = cached.partition(b'\n')
+            result = TrimResult(arcname, **json.loads(summary))
+            self.trim_report.append(result)
+            if trimmed:
+                self.add_data_entry(arcname, trimmed)
+                if atlas is not None:
+                    self.params.update(zip(atlas_keys, result.atlas))
 
     def process_hit_effects(self):
         """处理打击特效"""
+        # 提供了单帧图片时，拼合为精灵图
+        if self.params.get('hit_fx_frames'):
+            self.pack_hit_fx_frames()
         # 检查是否提供了特效图片
-        if self.params['hit_fx_image'] and os.path.exists(self.params['hit_fx_image']):
-            # 如果提供了特效图片，则复制该图片到目标目录
-            dest_path = os.path.join(self.temp_dir, 'hit_fx.png')
-            shutil.copy2(self.params['hit_fx_image'], dest_path)
+        elif self.params['hit_fx_image'] and asset_exists(self.params['hit_fx_image']):
+            if self.hit_fx_image_animated():
+                # 动画图片的各帧拼合为精灵图
+                self.pack_animated_hit_fx()
+            else:
+                # 如果提供了特效图片，则直接打包该图片（非PNG格式时转换为PNG）
+                self.add_file_entry('hit_fx.png', self.params['hit_fx_image'])
+                self.convert_textures(['hit_fx.png'])
         else:
             # 如果没有提供特效图片，则创建一个示例特效图像
-            total_width = self.params['fx_total_width']
-            total_height = self.params['fx_total_height']
-            frame_width = self.params['fx_frame_width']
-            frame_height = self.params['fx_frame_height']
-            
-            # 计算网格
-            cols = self.params['fx_cols']
-            rows = self.params['fx_rows']
-            total_frames = cols * rows
-            
-            fx_image_path = os.path.join(self.temp_dir, 'hitFx.png')
-            
-            # 创建一个示例特效图像
-            fx_img = Image.new('RGBA', (total_width, total_height), (255, 255, 255, 0))
-            
-            # 在每个帧位置绘制不同颜色的方块以示区分
-            for row in range(rows):
-                for col in range(cols):
-                    x = col * frame_width
-                    y = row * frame_height
-                    
-                    # 根据位置计算颜色
-                    r = (row * 30) % 256
-                    g = (col * 50) % 256
-                    b = ((row + col) * 20) % 256
-                    
-                    for i in range(frame_width):
-                        for j in range(frame_height):
-                            fx_img.putpixel((x + i, y + j), (r, g, b, 255))
-            
-            fx_img.save(fx_image_path)
+            # 超出内存上限时改为流式编码，输出的PNG字节不同，上限也是缓存键的一部分
+            self.add_data_entry('hitFx.png', self.cached(
+                ('hitfx-placeholder-v3', self.memory.ceiling,
+                 self.params['fx_total_width'], self.params['fx_total_height'],
+                 self.params['fx_frame_width'], self.params['fx_frame_height'],
+                 self.params['fx_cols'], self.params['fx_rows']),
+                self.render_placeholder_png
+            ))
+
+    def pack_hit_fx_frames(self):
+        """
+        把目录或列表中的单帧图片拼合为hit_fx.png
+        网格行列数和帧尺寸自动推导，并写回params，使info.yml中的hitFx与精灵图一致
+        """
+        from core.sprite_packer import list_frame_files, plan_layout, sheet_bytes, write_frames_png
+
+        frame_paths = list_frame_files(self.params['hit_fx_frames'])
+        layout = plan_layout(frame_paths)
+
+        def render():
+            self.images.make_room(sheet_bytes(layout))
+            buffer = CancellableBuffer(self.check_cancelled)
+            write_frames_png(buffer, frame_paths, layout, self.memory, self.check_cancelled)
+            return buffer.getvalue()
+
+        if self.cache is not None:
+            digests = [self.cache.file_digest(path) for path in frame_paths]
+        else:
+            digests = frame_paths
+        self.add_data_entry('hit_fx.png', self.cached(
+            ('hitfx-frames-v4', self.memory.ceiling, layout.cols, layout.rows, layout.frame_width, layout.frame_height,
+             digests),
+            render
+        ))
+
+        self.params.update({
+            'fx_cols': layout.cols,
+            'fx_rows': layout.rows,
+            'fx_frame_width': layout.frame_width,
+            'fx_frame_height': layout.frame_height,
+            'fx_total_width': layout.total_width,
+            'fx_total_height': layout.total_height
+        })
+        self.hit_fx_layout = layout
+
+    def hit_fx_image_animated(self):
+        """打击特效图片是否为多帧的GIF或APNG"""
+        from core.sprite_packer import ANIMATION_HEAD_BYTES, is_animation
+
+        src_path = self.params['hit_fx_image']
+        return is_animation(read_asset_head(src_path, ANIMATION_HEAD_BYTES), lambda: open_asset(src_path))
+
+    def pack_animated_hit_fx(self):
+        """
+        把GIF/APNG动画的各帧拼合为hit_fx.png
+        逐帧seek解码（精灵图超出内存上限时按行带流式编码），网格行列数和帧尺寸写回params；
+        动画记录了帧时长时，由总时长换算hitFxDuration（网格末尾重复最后一帧的格子也计入）
+        """
+        from core.sprite_packer import AnimationInfo, read_animation, sheet_bytes, write_animation_png
+
+        data = read_asset(self.params['hit_fx_image'])
+
+        def render():
+            # 缓存格式：一行JSON描述动画 + 换行 + 精灵图
+            animation = read_animation(data, self.check_cancelled)
+            self.images.make_room(sheet_bytes(animation.layout()))
+            buffer = CancellableBuffer(self.check_cancelled)
+            write_animation_png(buffer, data, animation.layout(), self.memory, self.check_cancelled)
+            summary = {
+                'source_format': animation.source_format,
+                'frame_count': animation.frame_count,
+                'frame_width': animation.frame_width,
+                'frame_height': animation.frame_height,
+                'durations': animation.durations
+            }
+            return json.dumps(summary).encode('utf-8') + b'\n' + buffer.getvalue()
+
+        cached = self.cached(('hitfx-animation-v3', self.memory.ceiling, AssetCache.data_digest(data)), render)
+        summary, _, sheet = cached.partition(b'\n')
+        animation = AnimationInfo(**json.loads(summary))
+        layout = animation.layout()
+        self.add_data_entry('hit_fx.png', sheet)
+
+        self.params.update({
+            'fx_cols': layout.cols,
+            'fx_rows': layout.rows,
+            'fx_frame_width': layout.frame_width,
+            'fx_frame_height': layout.frame_height,
+            'fx_total_width': layout.total_width,
+            'fx_total_height': layout.total_height
+        })
+        duration = animation.sheet_duration(layout)
+        if duration is not None:
+            self.params['fx_duration'] = duration
+        self.hit_fx_layout = layout
+        self.hit_fx_animation = animation
+
+    def render_placeholder_png(self):
+        """渲染示例打击特效并编码为PNG，超出内存上限时按行带流式编码"""
+        # 解码缓存占用的内存可以让出时，整张图仍由Pillow编码
+        self.images.make_room(self.params['fx_total_width'] * self.params['fx_total_height'] * 4)
+        buffer = CancellableBuffer(self.check_cancelled)
+        write_placeholder_hit_fx_png(
+            buffer, self.params['fx_total_width'], self.params['fx_total_height'],
+            self.params['fx_frame_width'], self.params['fx_frame_height'],
+            self.params['fx_cols'], self.params['fx_rows'], self.memory, self.check_cancelled
+        )
+        return buffer.getvalue()
+
+    def texture_budget_enabled(self):
+        return bool(self.params.get('texture_max_edge') or self.params.get('texture_pot')
+                    or self.params.get('texture_vram_budget'))
+
+    def enforce_texture_budget(self):
+        """
+        按最大边长、2的幂和显存上限调整纹理尺寸
+        打击特效的帧尺寸和Hold纹理的atlas值同步写回params，使info.yml与调整后的纹理一致
+        """
+        from core.texture_budget import TexturePlan, plan_budget, apply_plans
+
+        self.progress.start_stage('budget')
+        plans = []
+        contents = {}
+        for arcname in self.texture_arcnames():
+            self.check_cancelled()
+            data = self.entries[arcname].read()
+            size, _ = self.texture_size(data)
+            if arcname in ('hit_fx.png', 'hitFx.png'):
+                plan = TexturePlan(arcname, 'hit_fx', size, (self.params['fx_cols'], self.params['fx_rows']))
+            else:
+                plan = TexturePlan(arcname, 'hold' if arcname in HOLD_ATLAS_KEYS else 'note', size)
+            plans.append(plan)
+            contents[arcname] = data
+
+        plan_budget(plans, self.params.get('texture_max_edge', 0), self.params.get('texture_pot', False),
+                    self.params.get('texture_vram_budget', 0))
+        self.budget_report = plans
+
+        pending = []
+        for plan in plans:
+            if not plan.changed:
+                continue
+            data = contents[plan.name]
+            key = None
+            if self.cache is not None:
+                key = AssetCache.make_key('budget-v1', AssetCache.data_digest(data), plan.scaled_size,
+                                          plan.pad_top, plan.pad_bottom, plan.grid)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.add_data_entry(plan.name, cached)
+                    continue
+            pending.append((data, plan, key))
+
+        self.check_cancelled()
+        # 缩放需要完整解码原图并生成新图，并行处理时同时占用（计入峰值，不分段）
+        decoded = sum(plan.original_size[0] * plan.original_size[1] * 4 + plan.decoded_bytes
+                      for _, plan, _ in pending)
+        with self.memory.hold(decoded):
+            results = apply_plans([(data, plan) for data, plan, _ in pending], self.images)
+        for (_, plan, key), resized in zip(pending, results):
+            self.add_data_entry(plan.name, resized)
+            if key is not None:
+                self.cache.put(key, resized)
+
+        for plan in plans:
+            if not plan.changed:
+                continue
+            if plan.kind == 'hit_fx':
+                cols, rows = plan.grid
+                self.params.update({
+                    'fx_frame_width': plan.scaled_size[0] // cols,
+                    'fx_frame_height': plan.scaled_size[1] // rows,
+                    'fx_total_width': plan.scaled_size[0],
+                    'fx_total_height': plan.scaled_size[1]
+                })
+            elif plan.kind == 'hold':
+                top_key, bottom_key = HOLD_ATLAS_KEYS[plan.name]
+                if top_key in self.params and bottom_key in self.params:
+                    # 缩放后的atlas按高度比例换算，补的透明行计入上下两端
+                    height_scale = plan.scaled_size[1] / plan.original_size[1]
+                    self.params[top_key] = round(self.params[top_key] * height_scale) + plan.pad_top
+                    self.params[bottom_key] = round(self.params[bottom_key] * height_scale) + plan.pad_bottom
+
+    def texture_size(self, data):
+        """只读取文件头，返回纹理尺寸和解码为RGBA后的字节数"""
+        from core.png_stream import read_png_size
+
+        size = read_png_size(data)
+        if size is None:
+            from PIL import Image
+
+            with Image.open(io.BytesIO(data)) as img:
+                size = img.size
+        return size, size[0] * size[1] * 4
+
+    def texture_arcnames(self):
+        """当前已登记的纹理条目名"""
+        names = list(IMAGE_MAPPINGS.values()) + ['hit_fx.png', 'hitFx.png']
+        return [name for name in names if name in self.entries]
+
+    def optimize_textures(self):
+        """
+        对所有纹理做PNG无损优化
+        在时间预算内并行处理，结果按内容哈希缓存；超出预算的文件保持原样
+        """
+        from core.png_optimizer import OptimizeResult, optimize_pngs
+
+        self.progress.start_stage('optimize')
+        pending = []
+        for arcname in self.texture_arcnames():
+            self.check_cancelled()
+            data = self.entries[arcname].read()
+            # 优化时会生成多个完整解码的候选图像，超大纹理保持原样
+            if not self.images.make_room(self.texture_size(data)[1]):
+                self.optimize_report.append(
+                    OptimizeResult(arcname, len(data), len(data), note="超出内存上限", complete=False))
+                continue
+            key = None
+            if self.cache is not None:
+                key = AssetCache.make_key('png-opt-v1', AssetCache.data_digest(data))
+                cached = self.cache.get(key)
+                if cached is not None:
+                    # 缓存格式：颜色模式 + 换行 + 优化后的数据（模式为空表示无法进一步优化）
+                    mode, _, optimized = cached.partition(b'\n')
+                    if mode:
+                        self.add_data_entry(arcname, optimized)
+                        self.optimize_report.append(
+                            OptimizeResult(arcname, len(data), len(optimized), mode.decode('ascii')))
+                    else:
+                        self.optimize_report.append(
+                            OptimizeResult(arcname, len(data), len(data), note="已是最优"))
+                    continue
+            pending.append((arcname, data, key))
+
+        time_budget = self.params.get('optimize_time_budget', DEFAULT_OPTIMIZE_TIME_BUDGET)
+        if self.reproducible():
+            # 超出时间预算的文件保持原样，结果会随机器快慢变化，可复现构建不限制时间
+            time_budget = None
+        self.progress.start_stage('optimize', sum(len(data) for _, data, _ in pending))
+
+        def on_done(arcname, size):
+            self.progress.start_file(arcname)
+            self.progress.advance(size)
+
+        results = optimize_pngs([(arcname, data) for arcname, data, _ in pending], time_budget,
+                                self.params.get('zip_workers'), on_done, self.cancel_event, self.images)
+        self.check_cancelled()
+        for (arcname, data, key), (optimized, result) in zip(pending, results):
+            self.optimize_report.append(result)
+            if result.mode:
+                self.add_data_entry(arcname, optimized)
+            # 只缓存完整且确定的结果（优化成功或确认无法进一步优化）
+            if key is not None and result.complete and (result.mode or result.note == "已是最优"):
+                self.cache.put(key, (result.mode or '').encode('ascii') + b'\n'
+                               + (optimized if result.mode else b''))
+
+    def process_hit_sounds(self):
+        """
+        预处理WAV格式的打击音（tap/drag/flick，不含结束音乐）
+        去除首尾静音、峰值归一化、混为单声道并重采样，结果按内容哈希和处理参数缓存
+        """
+        from core.audio_processing import AudioResult, process_wav
+
+        target_rate = self.params.get('audio_sample_rate', DEFAULT_AUDIO_SAMPLE_RATE)
+        silence_db = self.params.get('audio_silence_db', DEFAULT_AUDIO_SILENCE_DB)
+        peak_db = self.params.get('audio_peak_db', DEFAULT_AUDIO_PEAK_DB)
+        self.progress.start_stage('audio')
+
+        for param_key in HIT_SOUND_KEYS:
+            src_path = self.params.get(param_key)
+            if not src_path or not src_path.lower().endswith('.wav'):
+                continue
+            arcname = asset_basename(src_path)
+            entry = self.entries.get(arcname)
+            if entry is None or src_path not in (entry.src_path, entry.ref):
+                continue
+
+            self.check_cancelled()
+            self.progress.start_file(arcname)
+            data = entry.read()
+
+            def produce():
+                # 缓存格式：一行JSON描述处理结果 + 换行 + 处理后的数据（无法处理时为空）
+                processed, result = process_wav(arcname, data, target_rate, silence_db, peak_db)
+                summary = {
+                    'latency_removed': result.latency_removed,
+                    'original_format': result.original_format,
+                    'processed_format': result.processed_format,
+                    'note': result.note
+                }
+                return json.dumps(summary).encode('utf-8') + b'\n' + (b'' if result.note else processed)
+
+            cached = self.cached(
+                ('wav-v1', AssetCache.data_digest(data), target_rate, silence_db, peak_db), produce
+            )
+            summary, _, processed = cached.partition(b'\n')
+            summary = json.loads(summary)
+            self.audio_report.append(AudioResult(
+                arcname, len(data), len(processed) if processed else len(data), **summary
+            ))
+            if processed:
+                self.add_data_entry(arcname, processed)
+
+    def cached(self, key_parts, producer):
+        """
+        通过缓存获取处理结果
+        key_parts应包含输入内容的哈希以及所有影响输出的处理参数
+        """
+        if self.cache is None:
+            return producer()
+        return self.cache.get_or_create(AssetCache.make_key(*key_parts), producer)
 
     def generate_info_yml(self):
         """生成info.yml文件"""
+        import yaml
+
         info_data = {
             'name': self.params['name'],
             'author': self.params['author'],
@@ -108,47 +771,101 @@ class ResourcePackGenerator:
             'hitFxScale': self.params['fx_scale'],
             'hitFxRotate': self.params['fx_rotate']
         }
-        
+
         # 添加holdAtlas参数（如果存在）
         if 'hold_atlas_x' in self.params and 'hold_atlas_y' in self.params:
             info_data['holdAtlas'] = [self.params['hold_atlas_x'], self.params['hold_atlas_y']]
         if 'hold_atlas_mh_x' in self.params and 'hold_atlas_mh_y' in self.params:
             info_data['holdAtlasMH'] = [self.params['hold_atlas_mh_x'], self.params['hold_atlas_mh_y']]
-        
+
         # 如果有音频文件，添加到info.yml中
         audio_files = {}
         for param_key, audio_key in AUDIO_MAPPINGS.items():
             src_path = self.params.get(param_key)
-            if src_path and os.path.exists(src_path):
-                audio_files[audio_key] = os.path.basename(src_path)
-                # 复制音频文件
-                dest_path = os.path.join(self.temp_dir, os.path.basename(src_path))
-                shutil.copy2(src_path, dest_path)
-        
+            if src_path and asset_exists(src_path):
+                audio_files[audio_key] = asset_basename(src_path)
+                # 登记音频文件
+                self.add_file_entry(asset_basename(src_path), src_path)
+
         if audio_files:
             info_data['audio'] = audio_files
-        
-        # 写入info.yml文件
-        info_yml_path = os.path.join(self.temp_dir, 'info.yml')
-        with open(info_yml_path, 'w', encoding='utf-8') as f:
-            yaml.dump(info_data, f, default_flow_style=False, allow_unicode=True)
+
+        # info.yml直接在内存中生成，键按字母排序，输出与字典的构造顺序无关
+        info_yml = yaml.dump(info_data, default_flow_style=False, allow_unicode=True, sort_keys=True)
+        self.add_data_entry('info.yml', info_yml.encode('utf-8'))
 
     def create_zip_package(self):
-        """创建ZIP压缩包"""
+        """
+        创建ZIP压缩包
+        先写入同目录下的临时文件再原子替换，失败时不会破坏已有的资源包。
+        增量模式（params['incremental']）下，与已有资源包比较，未变化的源文件直接复制旧的压缩数据
+        """
         output_dir = self.params['output_path']
-        package_name = f"{self.params['name'].replace(' ', '_')}_ResourcePack.zip"
-        zip_path = os.path.join(output_dir, package_name)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(self.temp_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, self.temp_dir)
-                    zipf.write(file_path, arcname)
-        
-        return zip_path
+        # 构建服务等调用方可以指定输出文件名（与包名无关），默认由包名生成
+        package_name = (self.params.get('output_filename')
+                        or f"{self.params['name'].replace(' ', '_')}_ResourcePack.zip")
+        self.zip_path = os.path.join(output_dir, package_name)
+
+        previous = None
+        if self.params.get('incremental') and os.path.exists(self.zip_path):
+            previous = self.zip_path
+
+        self.partial_path = os.path.join(output_dir, f".{package_name}.{os.getpid()}.tmp")
+
+        bytes_total = sum(entry.size for entry in self.entries.values())
+        self.progress.start_stage('zip', bytes_total)
+
+        compress_level = self.params.get('zip_compress_level', DEFAULT_ZIP_COMPRESS_LEVEL)
+        with PackZipWriter(self.partial_path, compress_level=compress_level,
+                           workers=self.params.get('zip_workers'), cache=self.cache,
+                           previous=previous, progress=self.progress,
+                           cancel_check=self.check_cancelled, reproducible=self.reproducible()) as writer:
+            self.report = writer.write_entries(self.entries.values())
+
+        os.replace(self.partial_path, self.zip_path)
+        self.partial_path = None
+        self.pack_sha256 = file_sha256(self.zip_path)
+        return self.zip_path
+
+    def reproducible(self):
+        return bool(self.params.get('reproducible', DEFAULT_REPRODUCIBLE))
+
+    def format_report(self):
+        """生成构建报告的文本行"""
+        lines = [str(item) for item in self.convert_report]
+        if self.hit_fx_animation is not None:
+            lines.append(str(self.hit_fx_animation))
+        if self.hit_fx_layout is not None:
+            lines.append(str(self.hit_fx_layout))
+        lines += [str(item) for item in self.trim_report]
+        if self.budget_report:
+            lines += [str(plan) for plan in self.budget_report if plan.changed]
+            before = sum(plan.original_size[0] * plan.original_size[1] * 4 for plan in self.budget_report)
+            after = sum(plan.decoded_bytes for plan in self.budget_report)
+            lines.append(f"纹理解码后共占用 {before / 1048576:.1f} MB -> {after / 1048576:.1f} MB")
+        lines += [str(item) for item in self.optimize_report]
+        lines += [str(item) for item in self.audio_report]
+        if self.optimize_report:
+            saved = sum(item.bytes_saved for item in self.optimize_report)
+            lines.append(f"PNG优化共节省 {saved} 字节")
+        lines += [str(item) for item in self.report]
+        if self.report:
+            total_size = sum(item.file_size for item in self.report)
+            total_saved = sum(item.bytes_saved for item in self.report)
+            total_seconds = sum(item.seconds for item in self.report)
+            lines.append(f"共 {len(self.report)} 个条目，原始 {total_size} 字节，"
+                         f"节省 {total_saved} 字节，耗时 {total_seconds * 1000:.1f} ms")
+        if self.cache is not None:
+            lines.append(str(self.cache.stats))
+        lines.append(str(self.images))
+        lines.append(str(self.memory))
+        if self.pack_sha256 is not None:
+            mode = "（可复现构建）" if self.reproducible() else ""
+            lines.append(f"资源包SHA-256{mode}: {self.pack_sha256}")
+        return lines
 
     def cleanup(self):
-        """清理临时目录"""
-        if self.temp_dir and os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
\ No newline at end of file
+        """删除未完成的ZIP文件"""
+        if self.partial_path and os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        self.partial_path = None
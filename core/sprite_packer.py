@@ -0,0 +1,265 @@
+"""
+打击特效精灵图打包
+把一组单帧图片或一张动画图片（GIF/APNG）的各帧按顺序拼成hitFx精灵图，并自动推导网格行列数和帧尺寸
+"""
+import io
+import math
+import os
+import re
+from PIL import Image
+
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')
+
+# 帧数无法分解成接近方形的网格时，允许的最大宽高比（列数/行数）
+MAX_GRID_ASPECT = 4
+
+# 判断APNG时读取的文件头大小（acTL块位于第一个IDAT之前）
+ANIMATION_HEAD_BYTES = 64 * 1024
+
+
+class SheetLayout:
+    """精灵图的网格布局"""
+    def __init__(self, frame_count, cols, rows, frame_width, frame_height):
+        self.frame_count = frame_count
+        self.cols = cols
+        self.rows = rows
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+    @property
+    def total_width(self):
+        return self.cols * self.frame_width
+
+    @property
+    def total_height(self):
+        return self.rows * self.frame_height
+
+    @property
+    def cell_count(self):
+        return self.cols * self.rows
+
+    @property
+    def empty_cells(self):
+        """帧数填不满网格时多出的格子数，这些格子重复最后一帧"""
+        return self.cell_count - self.frame_count
+
+    def __str__(self):
+        text = (f"打击特效: {self.frame_count} 帧拼合为 {self.cols}x{self.rows} 网格，"
+                f"单帧 {self.frame_width}x{self.frame_height}，"
+                f"总尺寸 {self.total_width}x{self.total_height}")
+        if self.empty_cells:
+            text += f"，末尾 {self.empty_cells} 格重复最后一帧"
+        return text
+
+
+class AnimationInfo:
+    """动画图片的帧信息，durations为每帧的时长（毫秒，未记录时为0）"""
+    def __init__(self, source_format, frame_count, frame_width, frame_height, durations):
+        self.source_format = source_format
+        self.frame_count = frame_count
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+        self.durations = durations
+
+    @property
+    def total_duration(self):
+        """动画总时长（秒），没有记录帧时长时为None"""
+        total = sum(self.durations)
+        return round(total / 1000, 3) if total else None
+
+    def sheet_duration(self, layout):
+        """
+        精灵图的hitFxDuration（秒），没有记录帧时长时为None
+        游戏按总时长均匀播放网格中的所有格子，末尾重复最后一帧的格子按平均帧时长计入，各帧的播放时长不会被压缩
+        """
+        total = self.total_duration
+        if total is None:
+            return None
+        return round(total * layout.cell_count / self.frame_count, 3)
+
+    @property
+    def uniform(self):
+        return len(set(self.durations)) <= 1
+
+    def layout(self):
+        cols, rows = choose_grid(self.frame_count)
+        return SheetLayout(self.frame_count, cols, rows, self.frame_width, self.frame_height)
+
+    def __str__(self):
+        text = f"{self.source_format}动画: {self.frame_count} 帧"
+        if self.total_duration is None:
+            return text + "，未记录帧时长，使用设置的特效持续时间"
+        text += f"，总时长 {self.total_duration} 秒"
+        if not self.uniform:
+            # Phira只有整体的hitFxDuration，各帧均分
+            text += "（各帧时长不一致，游戏中按总时长均匀播放）"
+        return text
+
+
+def _natural_key(path):
+    """按文件名中的数字自然排序（frame2排在frame10之前）"""
+    name = os.path.basename(path).lower()
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', name)]
+
+
+def list_frame_files(source):
+    """
+    解析帧来源：目录（取其中的图片文件）或文件路径列表
+    目录中的文件按文件名自然顺序排列；文件列表保持给定的顺序
+    """
+    if isinstance(source, str):
+        if not os.path.isdir(source):
+            raise ValueError(f"打击特效帧目录不存在: {source}")
+        paths = sorted((os.path.join(source, name) for name in os.listdir(source)
+                        if name.lower().endswith(FRAME_EXTENSIONS)), key=_natural_key)
+    else:
+        paths = list(source)
+    if not paths:
+        raise ValueError("没有找到打击特效帧图片")
+    return paths
+
+
+def choose_grid(frame_count):
+    """
+    为帧数选择网格（列数, 行数）
+    优先选择恰好放下所有帧、最接近方形且列数不少于行数的分解；
+    帧数为质数等无法合理分解时使用接近方形的网格，末尾留空
+    """
+    best = None
+    for rows in range(1, int(math.isqrt(frame_count)) + 1):
+        if frame_count % rows == 0:
+            best = (frame_count // rows, rows)
+    cols, rows = best
+    if cols / rows <= MAX_GRID_ASPECT:
+        return cols, rows
+    cols = math.ceil(math.sqrt(frame_count))
+    return cols, math.ceil(frame_count / cols)
+
+
+def is_animation(head, open_fp):
+    """
+    判断图片是否为多帧的GIF或APNG
+    head: 文件开头的数据，APNG通常只看文件头就能判断；open_fp: 需要进一步检查时调用，返回文件对象
+    """
+    from core.png_stream import png_is_animated
+
+    if head[:6] not in (b'GIF87a', b'GIF89a'):
+        animated = png_is_animated(head)
+        if animated is not None:
+            return animated
+    # GIF需要找到第二帧才能确定
+    with open_fp() as fp, Image.open(fp) as img:
+        return getattr(img, 'is_animated', False)
+
+
+def read_animation(data, cancel_check=None):
+    """
+    按顺序逐帧seek，读取动画的帧数、尺寸和每帧时长
+    Pillow把每帧合成为完整画布大小的图像，同一时刻只有一帧处于解码状态
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        durations = []
+        while True:
+            if cancel_check is not None:
+                cancel_check()
+            durations.append(img.info.get('duration') or 0)
+            try:
+                img.seek(img.tell() + 1)
+            except EOFError:
+                break
+        return AnimationInfo(img.format, len(durations), img.width, img.height, durations)
+
+
+def plan_layout(frame_paths):
+    """只读取文件头，根据帧数和最大帧宽高确定网格布局"""
+    frame_width = frame_height = 0
+    for path in frame_paths:
+        with Image.open(path) as img:
+            frame_width = max(frame_width, img.width)
+            frame_height = max(frame_height, img.height)
+    cols, rows = choose_grid(len(frame_paths))
+    return SheetLayout(len(frame_paths), cols, rows, frame_width, frame_height)
+
+
+def write_frames_png(fp, frame_paths, layout, memory=None, cancel_check=None):
+    """
+    按布局把帧图片依次拼成精灵图，并流式编码为PNG写入fp
+    每帧放在自己网格的中央，尺寸不一致的帧周围保持透明；帧数填不满网格时末尾的格子重复最后一帧
+    整张精灵图在memory（MemoryBudget）的上限之内时用Pillow编码（与旧版本逐字节一致），
+    超出上限时按整行帧分成行带流式编码，整张图不会同时解码在内存中
+    cancel_check: 每读取一帧前调用，用于响应取消
+    """
+    def read_frame(index):
+        with Image.open(frame_paths[index]) as frame:
+            return frame.convert('RGBA')
+
+    _write_sheet(fp, layout, read_frame, memory, cancel_check)
+
+
+def write_animation_png(fp, data, layout, memory=None, cancel_check=None):
+    """
+    把动画图片（GIF/APNG）的各帧按布局拼成精灵图，并流式编码为PNG写入fp
+    各帧按顺序逐个seek解码后立即放入行带，不会同时保留所有帧
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        def read_frame(index):
+            img.seek(index)
+            return img.convert('RGBA')
+
+        _write_sheet(fp, layout, read_frame, memory, cancel_check)
+
+
+def _frame_bytes(layout):
+    """解码一帧的占用：原帧和转换出的RGBA副本"""
+    return layout.frame_width * layout.frame_height * 4 * 2
+
+
+def sheet_bytes(layout):
+    """整张拼合精灵图时的内存占用（精灵图加上正在粘贴的一帧），超出上限时改为按行带流式编码"""
+    return layout.total_width * layout.total_height * 4 + _frame_bytes(layout)
+
+
+def _write_sheet(fp, layout, read_frame, memory, cancel_check):
+    """拼合精灵图并编码为PNG，read_frame(index)按帧序号非递减的顺序调用，返回RGBA图像"""
+    import numpy as np
+    from core.memory_budget import MemoryBudget
+    from core.png_stream import PngStreamWriter
+
+    memory = memory or MemoryBudget()
+    width, height = layout.total_width, layout.total_height
+    row_bytes = width * 4
+    frame_bytes = _frame_bytes(layout)
+    if memory.fits(sheet_bytes(layout)):
+        with memory.hold(sheet_bytes(layout)):
+            sheet = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+            _paste_frames(sheet, layout, read_frame, 0, layout.cell_count, 0, cancel_check)
+            sheet.save(fp, format='PNG')
+        return
+
+    # 行带图像、numpy副本和编码时的过滤副本（3倍），再加上正在粘贴的一帧
+    band_rows = memory.band_rows(row_bytes, height, align=layout.frame_height, factor=3, reserved=frame_bytes)
+    frames_per_band = band_rows // layout.frame_height * layout.cols
+    with PngStreamWriter(fp, width, height) as writer:
+        for top in range(0, height, band_rows):
+            bottom = min(top + band_rows, height)
+            first = top // layout.frame_height * layout.cols
+            with memory.hold((bottom - top) * row_bytes * 3 + frame_bytes):
+                band = Image.new('RGBA', (width, bottom - top), (0, 0, 0, 0))
+                _paste_frames(band, layout, read_frame, first, min(first + frames_per_band, layout.cell_count),
+                              top, cancel_check)
+                writer.write_rows(np.asarray(band))
+
+
+def _paste_frames(image, layout, read_frame, start, stop, top, cancel_check):
+    """
+    把序号为[start, stop)的格子贴到image中各自网格的中央，image的第0行对应精灵图的第top行
+    游戏会播放网格中的每一格，帧数填不满网格时末尾的格子重复最后一帧，不会播放空白帧
+    """
+    for index in range(start, stop):
+        if cancel_check is not None:
+            cancel_check()
+        row, col = divmod(index, layout.cols)
+        frame = read_frame(min(index, layout.frame_count - 1))
+        x = col * layout.frame_width + (layout.frame_width - frame.width) // 2
+        y = row * layout.frame_height + (layout.frame_height - frame.height) // 2 - top
+        image.paste(frame, (x, y))
@@ -0,0 +1,170 @@
+"""
+纹理尺寸预算
+限制纹理的最大边长和解码后的总显存占用，并可选地把尺寸调整为2的幂：
+- 超出预算的纹理按同一比例高质量缩小（LANCZOS），打击特效逐帧缩放，避免相邻帧互相渗色
+- 游戏按宽度缩放音符纹理，所以2的幂调整通过等比缩小使宽度成为2的幂，再在上下对称补透明行，
+  渲染结果不变；Hold纹理补的行计入holdAtlas的上下端；打击特效的网格不能补边，不做2的幂调整
+"""
+import math
+from core.image_pipeline import ImagePipeline
+
+# 解码后每像素占用的字节数（RGBA8888）
+BYTES_PER_PIXEL = 4
+
+# 显存预算的缩放迭代次数上限（2的幂调整使显存与缩放比例不成正比，需要多次逼近）
+_MAX_BUDGET_ITERATIONS = 16
+
+
+def next_power_of_two(n):
+    return 1 << max(0, n - 1).bit_length()
+
+
+def previous_power_of_two(n):
+    return 1 << (max(1, n).bit_length() - 1)
+
+
+class TexturePlan:
+    """
+    一个纹理的尺寸调整方案
+    kind: 'note'（Tap/Drag/Flick）、'hold' 或 'hit_fx'
+    grid: 打击特效的 (列数, 行数)，其他纹理为None
+    """
+    def __init__(self, name, kind, original_size, grid=None):
+        self.name = name
+        self.kind = kind
+        self.original_size = original_size
+        self.grid = grid
+        # 缩放后的尺寸（不含补边）；打击特效为整张精灵图的尺寸
+        self.scaled_size = original_size
+        # 上下补的透明行数
+        self.pad_top = 0
+        self.pad_bottom = 0
+
+    @property
+    def scale(self):
+        return self.scaled_size[0] / self.original_size[0]
+
+    @property
+    def final_size(self):
+        return self.scaled_size[0], self.scaled_size[1] + self.pad_top + self.pad_bottom
+
+    @property
+    def changed(self):
+        return self.final_size != self.original_size
+
+    @property
+    def decoded_bytes(self):
+        width, height = self.final_size
+        return width * height * BYTES_PER_PIXEL
+
+    def scale_to(self, factor, pot):
+        """按比例缩小（factor<=1），pot为True时宽度向下取2的幂并在上下补边使高度成为2的幂"""
+        width, height = self.original_size
+        if self.grid is not None:
+            # 打击特效按单帧尺寸缩放，保证每帧大小一致
+            cols, rows = self.grid
+            frame_width = max(1, round(width // cols * factor))
+            frame_height = max(1, round(height // rows * factor))
+            self.scaled_size = (frame_width * cols, frame_height * rows)
+            return
+
+        new_width = max(1, round(width * factor))
+        if pot:
+            new_width = previous_power_of_two(new_width)
+        new_height = max(1, round(height * new_width / width))
+        self.scaled_size = (new_width, new_height)
+        self.pad_top = self.pad_bottom = 0
+        if pot:
+            padding = next_power_of_two(new_height) - new_height
+            self.pad_top = padding // 2
+            self.pad_bottom = padding - self.pad_top
+
+    def __str__(self):
+        original = f"{self.original_size[0]}x{self.original_size[1]}"
+        final = f"{self.final_size[0]}x{self.final_size[1]}"
+        if not self.changed:
+            return f"{self.name}: {original} 未调整"
+        text = f"{self.name}: {original} -> {final}"
+        if self.scaled_size != self.original_size:
+            text += f"（缩放 {self.scale:.3f}）"
+        if self.pad_top or self.pad_bottom:
+            text += f"（上补 {self.pad_top} 行，下补 {self.pad_bottom} 行）"
+        return text
+
+
+def plan_budget(plans, max_edge=0, pot=False, vram_budget=0):
+    """
+    为一组TexturePlan确定尺寸
+    max_edge: 最大边长（0为不限制）；pot: 是否调整为2的幂；vram_budget: 解码后总字节数上限（0为不限制）
+    超出显存预算时所有纹理按同一比例继续缩小，保持相互之间的清晰度一致
+    """
+    def edge_factor(plan):
+        width, height = plan.original_size
+        limit = max_edge
+        if limit and pot and plan.grid is None:
+            # 补边后的高度会向上取2的幂，边长上限也取2的幂才能保证不超出
+            limit = previous_power_of_two(limit)
+        return min(1.0, limit / max(width, height)) if limit else 1.0
+
+    global_factor = 1.0
+    for _ in range(_MAX_BUDGET_ITERATIONS):
+        for plan in plans:
+            plan.scale_to(min(edge_factor(plan), global_factor), pot and plan.grid is None)
+            # 最大边长按最终尺寸检查（2的幂补边、单帧取整都可能使尺寸略有变化）
+            while max_edge and max(plan.final_size) > max_edge and plan.scaled_size[0] > 1:
+                plan.scale_to(plan.scale * 0.5 if pot else plan.scale * 0.99, pot and plan.grid is None)
+        total = sum(plan.decoded_bytes for plan in plans)
+        if not vram_budget or total <= vram_budget:
+            break
+        global_factor *= min(0.99, math.sqrt(vram_budget / total))
+    return plans
+
+
+def _resize_frames(img, plan):
+    """打击特效逐帧缩放后重新拼合"""
+    from PIL import Image
+
+    cols, rows = plan.grid
+    frame_width = img.width // cols
+    frame_height = img.height // rows
+    new_frame_width = plan.scaled_size[0] // cols
+    new_frame_height = plan.scaled_size[1] // rows
+    sheet = Image.new('RGBA', plan.scaled_size, (0, 0, 0, 0))
+    for row in range(rows):
+        for col in range(cols):
+            box = (col * frame_width, row * frame_height,
+                   (col + 1) * frame_width, (row + 1) * frame_height)
+            frame = img.crop(box).resize((new_frame_width, new_frame_height), Image.Resampling.LANCZOS)
+            sheet.paste(frame, (col * new_frame_width, row * new_frame_height))
+    return sheet
+
+
+def apply_plan(data, plan, pipeline=None):
+    """按方案缩放和补边，返回PNG数据（解码结果取自pipeline）"""
+    from PIL import Image
+
+    if pipeline is None:
+        pipeline = ImagePipeline()
+    img = pipeline.decode(data).convert('RGBA')
+    if plan.scaled_size != img.size:
+        if plan.grid is not None:
+            img = _resize_frames(img, plan)
+        else:
+            # Pillow缩放RGBA时按预乘alpha处理，透明边缘不会出现黑边
+            img = img.resize(plan.scaled_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    if plan.pad_top or plan.pad_bottom:
+        padded = Image.new('RGBA', plan.final_size, (0, 0, 0, 0))
+        padded.paste(img, (0, plan.pad_top))
+        img = padded
+    return pipeline.encode(img)
+
+
+def apply_plans(items, pipeline=None):
+    """
+    在pipeline的线程池中并行处理多个纹理（Pillow缩放和编码时释放GIL）
+    items: [(data, TexturePlan), ...]
+    返回: [bytes, ...]，顺序与items一致
+    """
+    if pipeline is None:
+        pipeline = ImagePipeline()
+    return pipeline.map(lambda item: apply_plan(*item, pipeline), items)
@@ -0,0 +1,84 @@
+"""
+音符纹理透明边距裁剪
+用alpha通道的包围盒（Pillow在C层逐行扫描）找出上下两侧完全透明的行并裁掉，减少解码和显存占用
+
+游戏按音符宽度缩放纹理、按宽高比计算高度，因此只裁剪上下边距、不裁剪左右：
+- Tap/Drag/Flick：上下裁掉相同的行数，纹理中心和缩放比例不变
+- Hold：holdAtlas为 [上端高度, 下端高度]（像素），中间部分被拉伸；
+  上下各自最多裁到atlas区域为止，并相应减小atlas值，拉伸部分保持不变
+"""
+from core.image_pipeline import ImagePipeline
+
+
+class TrimResult:
+    """单个纹理的裁剪结果"""
+    def __init__(self, name, original_size, trimmed_size=None, cut_top=0, cut_bottom=0,
+                 atlas=None, note=''):
+        self.name = name
+        # (宽, 高)
+        self.original_size = original_size
+        self.trimmed_size = trimmed_size or original_size
+        self.cut_top = cut_top
+        self.cut_bottom = cut_bottom
+        # Hold纹理调整后的atlas值，其他纹理为None
+        self.atlas = atlas
+        self.note = note
+
+    @property
+    def pixels_saved(self):
+        return (self.original_size[0] * self.original_size[1]
+                - self.trimmed_size[0] * self.trimmed_size[1])
+
+    def __str__(self):
+        if self.note:
+            return f"{self.name}: 未裁剪（{self.note}）"
+        text = (f"{self.name}: {self.original_size[0]}x{self.original_size[1]} -> "
+                f"{self.trimmed_size[0]}x{self.trimmed_size[1]}（上 {self.cut_top} 行，下 {self.cut_bottom} 行）")
+        if self.atlas is not None:
+            text += f"，atlas调整为 {list(self.atlas)}"
+        return text
+
+
+def trim_texture(name, data, margin, atlas=None, pipeline=None):
+    """
+    裁剪纹理上下的透明边距，保留margin像素的安全边距
+    atlas: Hold纹理的 (上端高度, 下端高度)，其他纹理为None
+    pipeline: 构建共享的ImagePipeline，从其中取解码结果，裁剪结果的解码图像也放回其中
+    返回: (bytes, TrimResult)，无需裁剪时返回原始数据
+    """
+    if pipeline is None:
+        pipeline = ImagePipeline()
+    try:
+        img = pipeline.decode(data)
+    except (OSError, ValueError) as e:
+        return data, TrimResult(name, (0, 0), atlas=atlas, note=f"无法解码: {e}")
+
+    size = img.size
+    if img.mode not in ('RGBA', 'LA', 'PA') and 'transparency' not in img.info:
+        return data, TrimResult(name, size, atlas=atlas, note="没有透明通道")
+    if img.mode in ('RGBA', 'LA', 'PA'):
+        alpha = img.getchannel('A')
+    else:
+        alpha = img.convert('RGBA').getchannel('A')
+    bbox = alpha.getbbox()
+    if bbox is None:
+        return data, TrimResult(name, size, atlas=atlas, note="完全透明")
+
+    free_top = max(0, bbox[1] - margin)
+    free_bottom = max(0, size[1] - bbox[3] - margin)
+    if atlas is None:
+        cut_top = cut_bottom = min(free_top, free_bottom)
+        new_atlas = None
+    else:
+        cut_top = min(free_top, atlas[0])
+        cut_bottom = min(free_bottom, atlas[1])
+        new_atlas = (atlas[0] - cut_top, atlas[1] - cut_bottom)
+    if cut_top == 0 and cut_bottom == 0:
+        return data, TrimResult(name, size, atlas=atlas, note="没有可裁剪的透明边距")
+
+    cropped = img.crop((0, cut_top, size[0], size[1] - cut_bottom))
+    save_args = {}
+    if 'transparency' in img.info:
+        save_args['transparency'] = img.info['transparency']
+    trimmed = pipeline.encode(cropped, **save_args)
+    return trimmed, TrimResult(name, size, cropped.size, cut_top, cut_bottom, new_atlas)
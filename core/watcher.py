@@ -0,0 +1,157 @@
+"""
+监视模式
+轮询参数中引用的所有素材（图片、音频、打击特效图片或帧目录），发生变化并稳定一段时间（防抖）后重新构建。
+重新构建使用增量模式和资源缓存：未变化的素材直接复用缓存结果和旧包中的压缩数据，只重新处理变化的文件；
+资源包先写入临时文件再原子替换，游戏不会读到写了一半的文件。
+使用轮询而不是inotify等系统接口，不需要额外依赖，各平台行为一致
+"""
+import os
+import threading
+import time
+from config.constants import (
+    IMAGE_MAPPINGS, AUDIO_MAPPINGS, DEFAULT_CACHE_DIR, WATCH_POLL_INTERVAL, WATCH_DEBOUNCE
+)
+from core.pack_reader import watch_path
+
+# 被监视的文件参数（hit_fx_frames单独处理，可以是目录或文件列表）
+WATCH_PARAM_KEYS = tuple(IMAGE_MAPPINGS) + tuple(AUDIO_MAPPINGS) + ('hit_fx_image',)
+
+
+def watched_paths(params):
+    """参数中引用的所有素材路径（引用已有资源包中条目时为资源包本身）"""
+    paths = []
+    for key in WATCH_PARAM_KEYS:
+        path = params.get(key) and watch_path(params[key])
+        if path and path not in paths:
+            paths.append(path)
+    frames = params.get('hit_fx_frames')
+    if isinstance(frames, (list, tuple)):
+        paths += list(frames)
+    elif frames:
+        paths.append(frames)
+    return paths
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def take_snapshot(paths):
+    """
+    记录每个路径的 (修改时间, 大小)，不存在的路径记为None
+    目录记录其中每个文件，帧的增删和修改都能被发现
+    """
+    snapshot = {}
+    for path in paths:
+        if os.path.isdir(path):
+            try:
+                names = os.listdir(path)
+            except OSError:
+                names = []
+            for name in names:
+                child = os.path.join(path, name)
+                snapshot[child] = _stat(child)
+        snapshot[path] = _stat(path)
+    return snapshot
+
+
+def changed_paths(before, after):
+    """两次快照之间发生变化（修改、新增或删除）的路径"""
+    return sorted(path for path in set(before) | set(after) if before.get(path) != after.get(path))
+
+
+class PackWatcher:
+    """
+    监视素材并在变化后重新构建
+    reload: 可选，每次构建前调用以重新读取参数（如重新加载清单文件），返回新的params
+    extra_paths: 额外监视的路径（如清单文件本身）
+    on_build(success, message, generator, changed): 每次构建完成后在监视线程中调用，首次构建时changed为空列表
+    用法:
+        watcher = PackWatcher(params, on_build=report)
+        watcher.run()   # 阻塞，直到在其他线程中调用 watcher.stop()
+    """
+    def __init__(self, params, on_build=None, progress_callback=None, reload=None, extra_paths=(),
+                 interval=WATCH_POLL_INTERVAL, debounce=WATCH_DEBOUNCE):
+        self.params = params
+        self.on_build = on_build
+        self.progress_callback = progress_callback
+        self.reload = reload
+        self.extra_paths = list(extra_paths)
+        self.interval = interval
+        self.debounce = debounce
+        self.stop_event = threading.Event()
+        self.generator = None
+        self.build_count = 0
+
+    def build_params(self):
+        """增量构建的参数：总是复用旧包和缓存，这是重新构建只处理变化文件的前提"""
+        params = dict(self.params)
+        params['incremental'] = True
+        if params.get('cache_dir') is None:
+            params['cache_dir'] = DEFAULT_CACHE_DIR
+        return params
+
+    def paths(self):
+        return watched_paths(self.params) + self.extra_paths
+
+    def build(self, changed):
+        """构建一次并调用on_build，返回 (success, message)"""
+        from core.resource_pack_generator import ResourcePackGenerator
+
+        if self.reload is not None:
+            try:
+                self.params = self.reload()
+            except Exception as e:
+                # 清单暂时无效（如正在编辑）时保留上一次的参数，等待下一次修改
+                self._report(False, f"无法重新加载参数: {e}", None, changed)
+                return False, str(e)
+        generator = ResourcePackGenerator(self.build_params(), self.progress_callback)
+        self.generator = generator
+        if self.stop_event.is_set():
+            generator.cancel()
+        success, message = generator.generate()
+        self.generator = None
+        self.build_count += 1
+        self._report(success, message, generator, changed)
+        return success, message
+
+    def _report(self, success, message, generator, changed):
+        if self.on_build is not None:
+            self.on_build(success, message, generator, changed)
+
+    def run(self):
+        """首先完整构建一次，然后持续监视，直到stop()"""
+        snapshot = take_snapshot(self.paths())
+        self.build([])
+        while not self.stop_event.wait(self.interval):
+            current = take_snapshot(self.paths())
+            if current == snapshot:
+                continue
+            # 防抖：保存文件时常常分几次写入，等到连续debounce秒没有变化再构建
+            stable_since = time.monotonic()
+            while time.monotonic() - stable_since < self.debounce:
+                if self.stop_event.wait(self.interval):
+                    return
+                latest = take_snapshot(self.paths())
+                if latest != current:
+                    current = latest
+                    stable_since = time.monotonic()
+            changed = changed_paths(snapshot, current)
+            # 构建期间发生的修改会在下一轮被发现
+            snapshot = current
+            paths = self.paths()
+            self.build(changed)
+            if self.paths() != paths:
+                # 重新加载的清单引用了不同的素材
+                snapshot = take_snapshot(self.paths())
+
+    def stop(self):
+        """停止监视（线程安全），正在进行的构建会被取消"""
+        self.stop_event.set()
+        generator = self.generator
+        if generator is not None:
+            generator.cancel()
@@ -0,0 +1,483 @@
+"""
+资源包ZIP写入器
+按文件类型选择压缩方式：已压缩的格式直接存储，其余条目按配置的级别deflate，
+大条目拆分成块在线程池中并行压缩后按顺序写入
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from core.progress import ProgressTracker
+from config.constants import (
+    STORED_EXTENSIONS, DEFAULT_ZIP_COMPRESS_LEVEL, ZIP_PARALLEL_THRESHOLD,
+    ZIP_DEFLATE_CHUNK_SIZE, ZIP_COPY_CHUNK_SIZE, CACHE_MIN_ENTRY_BYTES, REPRODUCIBLE_DATE_TIME,
+    REPRODUCIBLE_FILE_MODE
+)
+
+# 空的最终deflate块，用于结束由多个同步刷新块拼接而成的数据流
+_DEFLATE_END_BLOCK = zlib.compressobj(0, zlib.DEFLATED, -15).flush(zlib.Z_FINISH)
+
+# 缓存中压缩结果的头部：CRC32和原始大小
+_CACHED_DEFLATE_HEADER = struct.Struct('<IQ')
+
+# ZIP本地文件头：签名到扩展字段长度共30字节
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+# 写入ZIP注释的构建设置前缀，增量更新时据此判断旧包的压缩数据能否复用
+PACK_COMMENT_PREFIX = b'phira-pack:'
+
+
+def choose_compression(arcname):
+    """根据扩展名选择压缩方式：已压缩的格式存储，其余deflate"""
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def file_sha256(path):
+    """分块计算文件的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(ZIP_COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def deflate_chunk(data, level):
+    """
+    独立压缩一个数据块，以同步刷新结尾
+    多个这样的块按顺序拼接后加上结束块即为合法的deflate流
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class EntryReport:
+    """单个条目的写入结果"""
+    def __init__(self, arcname, compress_type, file_size, compress_size, seconds,
+                 cached=False, reused=False):
+        self.arcname = arcname
+        self.compress_type = compress_type
+        self.file_size = file_size
+        self.compress_size = compress_size
+        self.seconds = seconds
+        self.cached = cached
+        self.reused = reused
+
+    @property
+    def bytes_saved(self):
+        return self.file_size - self.compress_size
+
+    @property
+    def method_name(self):
+        return 'stored' if self.compress_type == zipfile.ZIP_STORED else 'deflated'
+
+    def __str__(self):
+        return (f"{self.arcname}: {self.method_name} {self.file_size} -> {self.compress_size} 字节，"
+                f"节省 {self.bytes_saved} 字节，耗时 {self.seconds * 1000:.1f} ms"
+                f"{'（缓存）' if self.cached else ''}{'（复用旧包）' if self.reused else ''}")
+
+
+class PackZipWriter:
+    """
+    把PackEntry列表写入ZIP文件
+    传入AssetCache时，deflate条目的压缩结果按内容哈希缓存，命中时直接写入已压缩的数据
+    传入previous（上一次构建的ZIP路径）时，未变化的源文件条目直接复制旧包中的压缩数据
+    引用已有资源包中条目的PackEntry（entry.ref）总是原样复制其压缩数据，保留原来的压缩方式
+    传入progress（ProgressTracker）时按文件和数据块上报进度
+    传入cancel_check时在每个条目和每个数据块之前调用，由它抛出异常来中止写入
+    reproducible为True时条目按名称排序，修改时间、权限和创建系统固定，ZIP注释中不记录构建时间，
+    相同的输入和压缩设置生成逐字节相同的文件（并行压缩的分块大小固定，与线程数无关）
+    用法:
+        with PackZipWriter(zip_path, compress_level=6) as writer:
+            writer.write_entries(entries)
+        writer.reports  # 每个条目的EntryReport
+    """
+    def __init__(self, zip_path, compress_level=DEFAULT_ZIP_COMPRESS_LEVEL, workers=None,
+                 parallel_threshold=ZIP_PARALLEL_THRESHOLD, cache=None, previous=None, progress=None,
+                 cancel_check=None, reproducible=False):
+        self.zip_path = zip_path
+        self.compress_level = compress_level
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.cache = cache
+        self.previous_path = previous
+        self.previous = None
+        self.progress = progress if progress is not None else ProgressTracker()
+        self.cancel_check = cancel_check
+        self.reproducible = reproducible
+        self.reports = []
+        self.zipf = None
+        self.pool = None
+        # 被引用的已有资源包 {路径: RawArchive}
+        self.sources = {}
+        self.started_at = time.time()
+
+    def __enter__(self):
+        self.started_at = time.time()
+        if self.previous_path:
+            self.previous = PreviousArchive.open(self.previous_path, self.build_settings())
+        self.zipf = zipfile.ZipFile(self.zip_path, 'w')
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.shutdown(wait=True)
+        if self.previous is not None:
+            self.previous.close()
+        for source in self.sources.values():
+            source.close()
+        self.sources = {}
+        settings = self.build_settings()
+        if not self.reproducible:
+            settings['built_at'] = self.started_at
+        self.zipf.comment = PACK_COMMENT_PREFIX + json.dumps(settings, sort_keys=True).encode('ascii')
+        self.zipf.close()
+        return False
+
+    def build_settings(self):
+        """影响压缩结果的设置，设置不同的旧包不能复用"""
+        return {
+            'level': self.compress_level,
+            'chunk': ZIP_DEFLATE_CHUNK_SIZE,
+            'parallel_threshold': self.parallel_threshold
+        }
+
+    def write_entries(self, entries):
+        """按顺序写入所有条目（可复现模式下按名称排序）"""
+        if self.reproducible:
+            entries = sorted(entries, key=lambda entry: entry.arcname)
+        for entry in entries:
+            self.write_entry(entry)
+        return self.reports
+
+    def write_entry(self, entry):
+        """写入单个条目并记录报告"""
+        start = time.perf_counter()
+        self._check_cancelled()
+        self.progress.start_file(entry.arcname)
+        if entry.ref is not None:
+            return self._write_referenced(entry, start)
+        compress_type = choose_compression(entry.arcname)
+        zinfo = self._make_zipinfo(entry, compress_type)
+        cached = False
+        reused = False
+        old_zinfo = None
+        if self.previous is not None and entry.src_path is not None:
+            old_zinfo = self.previous.find_unchanged(entry, zinfo)
+
+        if old_zinfo is not None:
+            self.previous.copy_raw(old_zinfo, zinfo, self.zipf)
+            reused = True
+        elif compress_type == zipfile.ZIP_STORED:
+            self._write_stored(entry, zinfo)
+        elif self.cache is not None and zinfo.file_size >= CACHE_MIN_ENTRY_BYTES:
+            cached = self._write_deflated_cached(entry, zinfo)
+        else:
+            self._write_deflated_any(entry, zinfo)
+
+        report = EntryReport(entry.arcname, compress_type, zinfo.file_size,
+                             zinfo.compress_size, time.perf_counter() - start, cached, reused)
+        self.reports.append(report)
+        self.progress.finish_file(zinfo.file_size)
+        return report
+
+    def _write_referenced(self, entry, start):
+        """原样复制已有资源包中的条目"""
+        from core.pack_reader import parse_pack_ref
+
+        zip_path, source_name = parse_pack_ref(entry.ref)
+        source = self.sources.get(zip_path)
+        if source is None:
+            source = self.sources[zip_path] = RawArchive(zip_path)
+        old = source.zipf.getinfo(source_name)
+        if self.reproducible:
+            zinfo = zipfile.ZipInfo(entry.arcname, date_time=REPRODUCIBLE_DATE_TIME)
+            zinfo.create_system = 3
+            zinfo.external_attr = REPRODUCIBLE_FILE_MODE << 16
+        else:
+            zinfo = zipfile.ZipInfo(entry.arcname, date_time=old.date_time)
+            zinfo.external_attr = old.external_attr
+        zinfo.compress_type = old.compress_type
+        source.copy_raw(old, zinfo, self.zipf)
+
+        report = EntryReport(entry.arcname, zinfo.compress_type, zinfo.file_size,
+                             zinfo.compress_size, time.perf_counter() - start, reused=True)
+        self.reports.append(report)
+        self.progress.finish_file(zinfo.file_size)
+        return report
+
+    def _make_zipinfo(self, entry, compress_type):
+        if self.reproducible:
+            zinfo = zipfile.ZipInfo(entry.arcname, date_time=REPRODUCIBLE_DATE_TIME)
+            zinfo.create_system = 3
+            zinfo.external_attr = REPRODUCIBLE_FILE_MODE << 16
+            zinfo.file_size = len(entry.data) if entry.data is not None else os.path.getsize(entry.src_path)
+        elif entry.data is not None:
+            zinfo = zipfile.ZipInfo(entry.arcname, date_time=time.localtime()[:6])
+            zinfo.external_attr = 0o644 << 16
+            zinfo.file_size = len(entry.data)
+        else:
+            zinfo = zipfile.ZipInfo.from_file(entry.src_path, entry.arcname)
+        zinfo.compress_type = compress_type
+        return zinfo
+
+    def _check_cancelled(self):
+        if self.cancel_check is not None:
+            self.cancel_check()
+
+    def _iter_chunks(self, entry, chunk_size):
+        """按块读取条目内容，源文件只读取一次"""
+        if entry.data is not None:
+            for offset in range(0, len(entry.data), chunk_size):
+                self._check_cancelled()
+                chunk = entry.data[offset:offset + chunk_size]
+                self.progress.advance(len(chunk))
+                yield chunk
+            return
+        with open(entry.src_path, 'rb') as src:
+            while True:
+                self._check_cancelled()
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                self.progress.advance(len(chunk))
+                yield chunk
+
+    def _write_stored(self, entry, zinfo):
+        with self.zipf.open(zinfo, 'w') as dst:
+            for chunk in self._iter_chunks(entry, ZIP_COPY_CHUNK_SIZE):
+                dst.write(chunk)
+
+    def _write_deflated_any(self, entry, zinfo, capture=False):
+        """按条目大小选择单线程或并行压缩，返回RawEntryWriter"""
+        if zinfo.file_size >= self.parallel_threshold:
+            return self._write_deflated_parallel(entry, zinfo, capture)
+        return self._write_deflated(entry, zinfo, capture)
+
+    def _write_deflated_cached(self, entry, zinfo):
+        """
+        以内容哈希和压缩参数为键查找已压缩的数据
+        返回是否命中缓存
+        """
+        if entry.data is not None:
+            content_digest = self.cache.data_digest(entry.data)
+        else:
+            content_digest = self.cache.file_digest(entry.src_path)
+        parallel = zinfo.file_size >= self.parallel_threshold
+        key = self.cache.make_key('deflate-v1', content_digest, self.compress_level,
+                                  parallel and ZIP_DEFLATE_CHUNK_SIZE)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            crc, file_size = _CACHED_DEFLATE_HEADER.unpack_from(cached)
+            zinfo.file_size = file_size
+            with RawEntryWriter(self.zipf, zinfo) as raw:
+                raw.write(memoryview(cached)[_CACHED_DEFLATE_HEADER.size:])
+                raw.crc = crc
+            return True
+
+        # 过大的条目不缓存，避免在内存中保留整份压缩结果
+        capture = zinfo.file_size <= self.cache.max_bytes // 8
+        raw = self._write_deflated_any(entry, zinfo, capture)
+        if capture:
+            header = _CACHED_DEFLATE_HEADER.pack(zinfo.CRC, zinfo.file_size)
+            self.cache.put(key, header + b''.join(raw.captured))
+        return False
+
+    def _write_deflated(self, entry, zinfo, capture=False):
+        """小条目直接在当前线程压缩"""
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+        crc = 0
+        with RawEntryWriter(self.zipf, zinfo, capture) as raw:
+            for chunk in self._iter_chunks(entry, ZIP_COPY_CHUNK_SIZE):
+                crc = zlib.crc32(chunk, crc)
+                raw.write(compressor.compress(chunk))
+            raw.write(compressor.flush(zlib.Z_FINISH))
+            raw.crc = crc
+        return raw
+
+    def _write_deflated_parallel(self, entry, zinfo, capture=False):
+        """大条目拆分成块，在线程池中并行压缩，再按原顺序写入"""
+        pending = deque()
+        max_pending = self.workers * 2
+        crc = 0
+        with RawEntryWriter(self.zipf, zinfo, capture) as raw:
+            for chunk in self._iter_chunks(entry, ZIP_DEFLATE_CHUNK_SIZE):
+                crc = zlib.crc32(chunk, crc)
+                pending.append(self.pool.submit(deflate_chunk, chunk, self.compress_level))
+                # 限制在途块的数量，避免大文件占满内存
+                while len(pending) >= max_pending:
+                    raw.write(pending.popleft().result())
+            while pending:
+                raw.write(pending.popleft().result())
+            raw.write(_DEFLATE_END_BLOCK)
+            raw.crc = crc
+        return raw
+
+
+class RawEntryWriter:
+    """
+    向ZipFile直接写入已压缩好的条目数据
+    先写入占位的本地文件头，结束时回填CRC和大小，与zipfile自身的写入流程一致
+    capture为True时同时保留写入的数据（用于写入缓存）
+    """
+    def __init__(self, zipf, zinfo, capture=False):
+        self.zipf = zipf
+        self.zinfo = zinfo
+        self.crc = 0
+        self.compress_size = 0
+        self.zip64 = False
+        self.captured = [] if capture else None
+
+    def __enter__(self):
+        zipf = self.zipf
+        zinfo = self.zinfo
+        zipf._writecheck(zinfo)
+        zinfo.flag_bits = 0
+        zinfo.compress_size = 0
+        zinfo.CRC = 0
+        # 与zipfile相同的判断：为可能超出4GB的条目预留zip64扩展字段
+        self.zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        zinfo.header_offset = zipf.fp.tell()
+        zipf.fp.write(zinfo.FileHeader(self.zip64))
+        return self
+
+    def write(self, data):
+        self.zipf.fp.write(data)
+        self.compress_size += len(data)
+        if self.captured is not None:
+            self.captured.append(bytes(data))
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            return False
+        zipf = self.zipf
+        zinfo = self.zinfo
+        zinfo.CRC = self.crc
+        zinfo.compress_size = self.compress_size
+        if not self.zip64 and zinfo.compress_size > zipfile.ZIP64_LIMIT:
+            raise RuntimeError(f"条目 {zinfo.filename} 压缩后超过4GB")
+
+        # 回填本地文件头
+        end = zipf.fp.tell()
+        zipf.fp.seek(zinfo.header_offset)
+        zipf.fp.write(zinfo.FileHeader(self.zip64))
+        zipf.fp.seek(end)
+
+        zipf.filelist.append(zinfo)
+        zipf.NameToInfo[zinfo.filename] = zinfo
+        zipf.start_dir = end
+        zipf._didModify = True
+        return False
+
+
+def read_pack_settings(zipf):
+    """读取ZIP注释中记录的构建设置，不是本工具生成的包返回None"""
+    comment = zipf.comment
+    if not comment.startswith(PACK_COMMENT_PREFIX):
+        return None
+    try:
+        return json.loads(comment[len(PACK_COMMENT_PREFIX):].decode('ascii'))
+    except ValueError:
+        return None
+
+
+class RawArchive:
+    """
+    以只读方式打开的ZIP，可以把其中条目的压缩数据原样复制到另一个ZIP中
+    用法:
+        with RawArchive(path) as archive:
+            archive.copy_raw(archive.zipf.getinfo(name), zinfo, zipf)
+    """
+    def __init__(self, path, zipf=None):
+        self.path = path
+        self.zipf = zipf if zipf is not None else zipfile.ZipFile(path, 'r')
+        self.fp = open(path, 'rb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def copy_raw(self, old, zinfo, zipf):
+        """把条目old的压缩数据原样复制到zipf中（条目信息为zinfo），不解压也不重新压缩"""
+        self.fp.seek(old.header_offset)
+        header = _LOCAL_HEADER.unpack(self.fp.read(_LOCAL_HEADER.size))
+        if header[0] != _LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"{os.path.basename(self.path)} 中 {old.filename} 的本地文件头损坏")
+        name_length, extra_length = header[-2], header[-1]
+        self.fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+        zinfo.file_size = old.file_size
+        with RawEntryWriter(zipf, zinfo) as raw:
+            remaining = old.compress_size
+            while remaining > 0:
+                chunk = self.fp.read(min(ZIP_COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"{os.path.basename(self.path)} 中 {old.filename} 的数据不完整")
+                raw.write(chunk)
+                remaining -= len(chunk)
+            raw.crc = old.CRC
+
+    def close(self):
+        self.fp.close()
+        self.zipf.close()
+
+
+class PreviousArchive(RawArchive):
+    """
+    上一次构建的资源包，用于增量更新
+    源文件的大小和修改时间都与旧条目一致、且在上次构建开始前就已修改完毕时直接判定未变化；
+    否则大小一致时计算CRC32与中央目录中记录的值比较
+    """
+    def __init__(self, path, zipf, built_at):
+        super().__init__(path, zipf)
+        self.built_at = built_at
+
+    @classmethod
+    def open(cls, path, settings):
+        """打开旧包，构建设置不一致或无法读取时返回None（即完整重建）"""
+        try:
+            zipf = zipfile.ZipFile(path, 'r')
+        except (OSError, zipfile.BadZipFile):
+            return None
+        old_settings = read_pack_settings(zipf)
+        if old_settings is None or any(old_settings.get(key) != value for key, value in settings.items()):
+            zipf.close()
+            return None
+        return cls(path, zipf, old_settings.get('built_at', 0))
+
+    def find_unchanged(self, entry, zinfo):
+        """返回与源文件内容一致的旧条目，没有则返回None"""
+        try:
+            old = self.zipf.getinfo(zinfo.filename)
+        except KeyError:
+            return None
+        if (old.compress_type != zinfo.compress_type or old.file_size != zinfo.file_size
+                or old.flag_bits & 0x1):
+            return None
+
+        # 修改时间一致，并且源文件在上次构建开始前2秒以上就已修改完毕（ZIP时间精度为2秒）
+        if old.date_time == zinfo.date_time and os.path.getmtime(entry.src_path) < self.built_at - 2:
+            return old
+
+        crc = 0
+        with open(entry.src_path, 'rb') as src:
+            while True:
+                chunk = src.read(ZIP_COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+        return old if crc == old.CRC else None
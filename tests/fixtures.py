@@ -0,0 +1,35 @@
+"""构建测试共用的素材和参数"""
+import os
+import struct
+import wave
+from PIL import Image
+from core.batch import default_params
+
+
+def write_texture(path, colour):
+    img = Image.new('RGBA', (120, 60), (0, 0, 0, 0))
+    img.paste(colour, (10, 5, 110, 55))
+    img.save(path)
+
+
+def write_sound(path, seconds=0.2, rate=44100):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(b''.join(struct.pack('<h', (i * 37) % 2000 - 1000) for i in range(int(rate * seconds))))
+
+
+def pack_params(assets_dir, output_dir, **overrides):
+    """在assets_dir中写入测试素材，返回输出到output_dir的构建参数（不使用资源缓存）"""
+    params = default_params()
+    for key, colour in (('tap_image', (255, 0, 0, 255)), ('drag_image', (0, 255, 0, 255)),
+                        ('hold_image', (0, 0, 255, 255))):
+        path = os.path.join(assets_dir, f"{key}.png")
+        write_texture(path, colour)
+        params[key] = path
+    params['tap_sound'] = os.path.join(assets_dir, 'tap.wav')
+    write_sound(params['tap_sound'])
+    params.update({'name': 'Test Pack', 'author': 'tests', 'output_path': output_dir, 'cache_dir': None})
+    params.update(overrides)
+    return params
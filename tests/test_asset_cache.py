@@ -0,0 +1,32 @@
+"""资源缓存大小统计的回归测试"""
+import tempfile
+import unittest
+from core.asset_cache import AssetCache
+
+
+class AssetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.cache = AssetCache(self._dir.name, max_bytes=1000)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_reput_same_key_replaces_size(self):
+        self.cache.put('a' * 64, b'x' * 100)
+        for size in (300, 300, 50):
+            self.cache.put('b' * 64, b'y' * size)
+        self.assertEqual(self.cache._total_bytes, 150)
+        self.assertEqual(self.cache.get('b' * 64), b'y' * 50)
+
+    def test_reput_does_not_evict_other_entries(self):
+        self.cache.put('a' * 64, b'x' * 400)
+        for _ in range(5):
+            self.cache.put('b' * 64, b'y' * 400)
+        self.assertEqual(self.cache.stats.evictions, 0)
+        self.assertEqual(self.cache._total_bytes, 800)
+        self.assertEqual(self.cache.get('a' * 64), b'x' * 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""构建服务请求校验的回归测试"""
+import http.client
+import os
+import tempfile
+import threading
+import unittest
+from core.build_service import BuildService, create_server
+
+
+class SubmitTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.service = BuildService(self._dir.name, workers=1, cache_dir=None)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_pack_name_is_kept_and_filename_is_sanitized(self):
+        job = self.service.submit({'params': {'name': "My Skin!"}})
+        self.assertEqual(job.params['name'], "My Skin!")
+        self.assertEqual(job.params['output_filename'], "My_Skin__ResourcePack.zip")
+
+    def test_output_stays_in_job_dir(self):
+        job = self.service.submit({'params': {'name': "../../evil"}})
+        zip_path = os.path.join(job.params['output_path'], job.params['output_filename'])
+        self.assertEqual(os.path.dirname(os.path.realpath(zip_path)), os.path.realpath(job.job_dir))
+
+
+class PostJobTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.server = create_server(BuildService(self._dir.name, workers=1, cache_dir=None), '127.0.0.1', 0,
+                                    quiet=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self._dir.cleanup()
+
+    def post(self, content_length, body=b'{}'):
+        connection = http.client.HTTPConnection(*self.server.server_address, timeout=10)
+        try:
+            connection.putrequest('POST', '/jobs')
+            connection.putheader('Content-Type', 'application/json')
+            connection.putheader('Content-Length', content_length)
+            connection.endheaders(body)
+            return connection.getresponse().status
+        finally:
+            connection.close()
+
+    def test_invalid_content_length_is_rejected(self):
+        for value in ('abc', '-1', str(10 ** 12)):
+            with self.subTest(value=value):
+                self.assertEqual(self.post(value), 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
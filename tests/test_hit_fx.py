@@ -0,0 +1,34 @@
+"""示例打击特效编码的回归测试"""
+import io
+import unittest
+from PIL import Image
+from config.constants import DEFAULT_MEMORY_CEILING
+from core.memory_budget import MemoryBudget
+from core.resource_pack_generator import render_placeholder_hit_fx, write_placeholder_hit_fx_png
+
+GRID = (320, 192, 64, 64, 5, 3)
+
+
+def _write(memory):
+    buffer = io.BytesIO()
+    write_placeholder_hit_fx_png(buffer, *GRID, memory=memory)
+    return buffer.getvalue()
+
+
+class PlaceholderHitFxTest(unittest.TestCase):
+    def test_within_ceiling_matches_pillow_bytes(self):
+        # 上限之内的输出与旧版本（Pillow编码）逐字节一致
+        buffer = io.BytesIO()
+        render_placeholder_hit_fx(*GRID).save(buffer, format='PNG')
+        self.assertEqual(_write(MemoryBudget(DEFAULT_MEMORY_CEILING)), buffer.getvalue())
+
+    def test_streamed_above_ceiling_matches_pixels(self):
+        # 行带高度（50行）不与帧高对齐，覆盖帧跨越行带边界的情况
+        memory = MemoryBudget(GRID[0] * 4 * 2 * 50)
+        with Image.open(io.BytesIO(_write(memory))) as img:
+            self.assertEqual(img.tobytes(), render_placeholder_hit_fx(*GRID).tobytes())
+        self.assertLessEqual(memory.peak, memory.ceiling)
+
+
+if __name__ == '__main__':
+    unittest.main()
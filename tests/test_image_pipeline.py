@@ -0,0 +1,36 @@
+"""解码缓存与内存上限的回归测试"""
+import io
+import unittest
+from PIL import Image
+from core.image_pipeline import ImagePipeline
+from core.memory_budget import MemoryBudget
+
+
+def _png(size):
+    buffer = io.BytesIO()
+    Image.new('RGBA', size, (1, 2, 3, 255)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class MakeRoomTest(unittest.TestCase):
+    def setUp(self):
+        self.memory = MemoryBudget(100000)
+        self.pipeline = ImagePipeline(self.memory.ceiling // 2, self.memory)
+        self.pipeline.decode(_png((100, 100)))
+
+    def test_fits_counts_cached_images(self):
+        self.assertEqual(self.memory.current, 40000)
+        self.assertFalse(self.memory.fits(80000))
+
+    def test_evicts_cache_when_that_makes_room(self):
+        self.assertTrue(self.pipeline.make_room(80000))
+        self.assertEqual(self.pipeline.cached_bytes, 0)
+        self.assertTrue(self.memory.fits(80000))
+
+    def test_keeps_cache_when_allocation_cannot_fit(self):
+        self.assertFalse(self.pipeline.make_room(200000))
+        self.assertEqual(self.pipeline.cached_bytes, 40000)
+
+
+if __name__ == '__main__':
+    unittest.main()
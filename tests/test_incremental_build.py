@@ -0,0 +1,46 @@
+"""增量构建复用旧资源包条目的测试"""
+import os
+import tempfile
+import unittest
+from core.resource_pack_generator import ResourcePackGenerator
+from tests.fixtures import pack_params, write_texture
+
+
+def _build(params):
+    generator = ResourcePackGenerator(params)
+    success, message = generator.generate()
+    if not success:
+        raise AssertionError(message)
+    return {item.arcname: item for item in generator.report}
+
+
+class IncrementalBuildTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.params = pack_params(self._dir.name, self._dir.name, incremental=True)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_rebuild_reuses_unchanged_entries(self):
+        first = _build(self.params)
+        self.assertFalse(any(item.reused for item in first.values()))
+
+        # 只修改一张纹理：其余素材直接复制旧包中的压缩数据
+        write_texture(self.params['drag_image'], (255, 255, 0, 255))
+        os.utime(self.params['drag_image'], ns=(0, 10 ** 18))
+        second = _build(self.params)
+        self.assertEqual(set(second), set(first))
+        self.assertFalse(second['drag.png'].reused)
+        for arcname in ('click.png', 'hold.png', 'tap.wav'):
+            self.assertTrue(second[arcname].reused, arcname)
+            self.assertEqual(second[arcname].compress_size, first[arcname].compress_size)
+
+    def test_full_rebuild_without_incremental(self):
+        _build(self.params)
+        self.params['incremental'] = False
+        self.assertFalse(any(item.reused for item in _build(self.params).values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""增量包生成与应用的测试"""
+import os
+import tempfile
+import unittest
+from core.pack_delta import DeltaError, apply_delta, create_delta
+from core.resource_pack_generator import ResourcePackGenerator
+from tests.fixtures import pack_params, write_texture
+
+
+class PackDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def path(self, *parts):
+        return os.path.join(self._dir.name, *parts)
+
+    def build(self, version, edit=None):
+        """构建一个版本的资源包，edit(params)可以在构建前修改素材和参数"""
+        for name in ('assets', 'output'):
+            os.makedirs(self.path(version, name))
+        params = pack_params(self.path(version, 'assets'), self.path(version, 'output'))
+        if edit is not None:
+            edit(params)
+        success, message = ResourcePackGenerator(params).generate()
+        self.assertTrue(success, message)
+        return message
+
+    @staticmethod
+    def edit_v2(params):
+        # 修改一张纹理、删除一张、新增一张，并修改info.yml
+        write_texture(params['tap_image'], (255, 128, 0, 255))
+        params['flick_image'] = os.path.join(os.path.dirname(params['tap_image']), 'flick_image.png')
+        write_texture(params['flick_image'], (128, 0, 255, 255))
+        params['drag_image'] = ''
+        params['description'] = "v2"
+
+    @staticmethod
+    def read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_apply_delta_rebuilds_new_pack(self):
+        old = self.build('v1')
+        new = self.build('v2', self.edit_v2)
+        delta = self.path('v1-v2.delta.zip')
+        report = create_delta(old, new, delta)
+        self.assertIn('click.png', report.changed)
+        self.assertIn('drag.png', report.removed)
+        self.assertIn('hold.png', report.copied)
+
+        rebuilt = self.path('rebuilt.zip')
+        result = apply_delta(old, delta, rebuilt)
+        self.assertTrue(result.identical)
+        self.assertEqual(self.read(rebuilt), self.read(new))
+
+    def test_apply_delta_rejects_other_old_pack(self):
+        old = self.build('v1')
+        new = self.build('v2', self.edit_v2)
+        delta = self.path('v1-v2.delta.zip')
+        create_delta(old, new, delta)
+        # 增量包要从旧包复制的hold.png在这个版本中内容不同
+        other = self.build('other', lambda params: write_texture(params['hold_image'], (0, 0, 0, 255)))
+        with self.assertRaises(DeltaError):
+            apply_delta(other, delta, self.path('rebuilt.zip'))
+        self.assertFalse(os.path.exists(self.path('rebuilt.zip')))
+
+
+if __name__ == '__main__':
+    unittest.main()
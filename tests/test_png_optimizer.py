@@ -0,0 +1,47 @@
+"""PNG无损优化的回归测试"""
+import io
+import random
+import unittest
+from PIL import Image
+from core.png_optimizer import optimize_png
+
+
+def _encode(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class OptimizePngTest(unittest.TestCase):
+    def test_multicolour_rgba_round_trips(self):
+        # 少于256种颜色、带半透明alpha的RGBA图像：调色板候选有损时必须被拒绝
+        rng = random.Random(1)
+        colours = [(rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice((0, 128, 255)))
+                   for _ in range(200)]
+        img = Image.new('RGBA', (64, 64))
+        img.putdata([colours[rng.randrange(len(colours))] for _ in range(64 * 64)])
+
+        optimized, result = optimize_png('test.png', _encode(img))
+        with Image.open(io.BytesIO(optimized)) as decoded:
+            self.assertEqual(decoded.convert('RGBA').tobytes(), img.tobytes())
+        self.assertLessEqual(result.optimized_size, result.original_size)
+
+    def test_ancillary_metadata_is_stripped(self):
+        from PIL import ImageCms
+
+        icc_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+        img = Image.new('RGBA', (64, 64), (10, 20, 30, 255))
+        img.paste((200, 0, 0, 128), (0, 0, 32, 32))
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG', icc_profile=icc_profile)
+        self.assertIn(b'iCCP', buffer.getvalue())
+
+        optimized, result = optimize_png('test.png', buffer.getvalue())
+        self.assertIsNotNone(result.mode)
+        self.assertNotIn(b'iCCP', optimized)
+        with Image.open(io.BytesIO(optimized)) as decoded:
+            self.assertEqual(decoded.convert('RGBA').tobytes(), img.tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
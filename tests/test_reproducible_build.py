@@ -0,0 +1,41 @@
+"""可复现构建的测试"""
+import os
+import tempfile
+import time
+import unittest
+from core.resource_pack_generator import ResourcePackGenerator
+from tests.fixtures import pack_params
+
+
+class ReproducibleBuildTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.assets_dir = os.path.join(self._dir.name, 'assets')
+        os.makedirs(self.assets_dir)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def build(self, output_name, mtime_ns):
+        output_dir = os.path.join(self._dir.name, output_name)
+        os.makedirs(output_dir)
+        params = pack_params(self.assets_dir, output_dir, reproducible=True, incremental=False)
+        # 源文件的修改时间和构建时间都不能影响输出
+        for key in ('tap_image', 'drag_image', 'hold_image', 'tap_sound'):
+            os.utime(params[key], ns=(mtime_ns, mtime_ns))
+        generator = ResourcePackGenerator(params)
+        success, message = generator.generate()
+        self.assertTrue(success, message)
+        with open(message, 'rb') as f:
+            return generator.pack_sha256, f.read()
+
+    def test_two_builds_have_the_same_sha256(self):
+        first_sha256, first = self.build('first', 10 ** 18)
+        time.sleep(1.1)
+        second_sha256, second = self.build('second', 2 * 10 ** 18)
+        self.assertEqual(first_sha256, second_sha256)
+        self.assertEqual(first, second)
+
+
+if __name__ == '__main__':
+    unittest.main()
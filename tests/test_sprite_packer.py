@@ -0,0 +1,86 @@
+"""打击特效帧列表和精灵图拼合的回归测试"""
+import io
+import os
+import tempfile
+import unittest
+from PIL import Image
+from core.memory_budget import MemoryBudget
+from core.sprite_packer import list_frame_files, plan_layout, read_animation, write_animation_png, write_frames_png
+
+
+class ListFrameFilesTest(unittest.TestCase):
+    def test_directory_is_naturally_sorted(self):
+        with tempfile.TemporaryDirectory() as frames_dir:
+            for name in ('frame10.png', 'frame2.png', 'frame1.png', 'notes.txt'):
+                open(os.path.join(frames_dir, name), 'wb').close()
+            names = [os.path.basename(path) for path in list_frame_files(frames_dir)]
+        self.assertEqual(names, ['frame1.png', 'frame2.png', 'frame10.png'])
+
+    def test_explicit_list_keeps_given_order(self):
+        paths = ['b/frame10.png', 'a/frame2.png', 'c/frame1.png']
+        self.assertEqual(list_frame_files(paths), paths)
+
+
+class WriteFramesPngTest(unittest.TestCase):
+    def test_streamed_sheet_stays_within_ceiling(self):
+        with tempfile.TemporaryDirectory() as frames_dir:
+            paths = []
+            for index in range(256):
+                path = os.path.join(frames_dir, f"{index}.png")
+                Image.new('RGBA', (16, 16), (index, 255 - index, 0, 255)).save(path)
+                paths.append(path)
+            layout = plan_layout(paths)
+            unlimited = io.BytesIO()
+            write_frames_png(unlimited, paths, layout)
+            memory = MemoryBudget(131072)
+            streamed = io.BytesIO()
+            write_frames_png(streamed, paths, layout, memory)
+        self.assertLessEqual(memory.peak, memory.ceiling)
+        with Image.open(io.BytesIO(unlimited.getvalue())) as expected, \
+                Image.open(io.BytesIO(streamed.getvalue())) as actual:
+            self.assertEqual(actual.tobytes(), expected.tobytes())
+
+    def test_explicit_list_fills_spare_cells_with_last_frame(self):
+        colours = [(index * 40, 0, 255 - index * 40, 255) for index in range(5)]
+        with tempfile.TemporaryDirectory() as frames_dir:
+            paths = []
+            for index, colour in enumerate(colours):
+                path = os.path.join(frames_dir, f"{index}.png")
+                Image.new('RGBA', (10, 10), colour).save(path)
+                paths.append(path)
+            layout = plan_layout(list_frame_files(paths))
+            self.assertEqual((layout.cols, layout.rows, layout.empty_cells), (3, 2, 1))
+            # 整张编码和流式编码（上限小于一行帧时按单行帧的行带处理）都要填满空格
+            for memory in (None, MemoryBudget(1000)):
+                buffer = io.BytesIO()
+                write_frames_png(buffer, paths, layout, memory)
+                with Image.open(io.BytesIO(buffer.getvalue())) as sheet:
+                    cells = [sheet.getpixel((col * 10 + 5, row * 10 + 5)) for row in range(2) for col in range(3)]
+                self.assertEqual(cells, colours + [colours[-1]])
+
+
+class AnimationSheetTest(unittest.TestCase):
+    def test_spare_cells_repeat_last_frame(self):
+        # 7帧无法分解为宽高比不超过MAX_GRID_ASPECT的网格，拼合为3x3网格，多出2格
+        colours = [(index * 30, 255 - index * 30, 0) for index in range(7)]
+        frames = [Image.new('RGB', (8, 8), colour) for colour in colours]
+        buffer = io.BytesIO()
+        frames[0].save(buffer, format='GIF', save_all=True, append_images=frames[1:], duration=100, loop=0)
+        data = buffer.getvalue()
+
+        animation = read_animation(data)
+        layout = animation.layout()
+        self.assertEqual((layout.cols, layout.rows, layout.empty_cells), (3, 3, 2))
+        # 每格仍播放100毫秒
+        self.assertEqual(animation.sheet_duration(layout), 0.9)
+
+        sheet_png = io.BytesIO()
+        write_animation_png(sheet_png, data, layout)
+        with Image.open(io.BytesIO(sheet_png.getvalue())) as sheet:
+            sheet = sheet.convert('RGBA')
+            cells = [sheet.getpixel((col * 8 + 4, row * 8 + 4)) for row in range(3) for col in range(3)]
+        self.assertEqual(cells, [colour + (255,) for colour in colours] + [colours[-1] + (255,)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
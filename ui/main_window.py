@@ -2,41 +2,111 @@
 Phira资源包生成器的UI界面
 """
 import os
+import time
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QLineEdit, 
                              QFileDialog, QTextEdit, QGroupBox, QGridLayout,
-                             QMessageBox, QSpinBox, QDoubleSpinBox, QScrollArea)
+                             QMessageBox, QSpinBox, QDoubleSpinBox, QScrollArea, QProgressBar)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QFont, QColor, QPalette
-from PIL import Image
-import core.resource_pack_generator
+from PyQt6.QtGui import QFont, QColor, QPalette, QPixmap
+from ui.thumbnail_loader import ThumbnailLoader
+from core.pack_reader import read_pack
 from config.constants import (
     APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT, DARK_THEME_STYLESHEET,
     DEFAULT_FX_COLS, DEFAULT_FX_ROWS, DEFAULT_FX_TOTAL_WIDTH, DEFAULT_FX_TOTAL_HEIGHT,
     DEFAULT_FX_FRAME_WIDTH, DEFAULT_FX_FRAME_HEIGHT, DEFAULT_FX_DURATION, 
-    DEFAULT_FX_SCALE, DEFAULT_FX_ROTATE, AUDIO_FILTER, IMAGE_FILTER, AUDIO_MAPPINGS,
-    DEFAULT_HOLD_ATLAS, DEFAULT_HOLD_ATLAS_MH
+    DEFAULT_FX_SCALE, DEFAULT_FX_ROTATE, AUDIO_FILTER, IMAGE_FILTER, PACK_FILTER, AUDIO_MAPPINGS, IMAGE_MAPPINGS,
+    DEFAULT_HOLD_ATLAS, DEFAULT_HOLD_ATLAS_MH, DEFAULT_CACHE_DIR, DEFAULT_OPTIMIZE_PNG,
+    DEFAULT_PROCESS_HIT_SOUNDS, PROGRESS_BAR_STEPS, THUMBNAIL_SIZE, DEFAULT_TRIM_TRANSPARENT,
+    DEFAULT_TEXTURE_MAX_EDGE, DEFAULT_TEXTURE_POT, DEFAULT_TEXTURE_VRAM_BUDGET, DEFAULT_REPRODUCIBLE
 )
 
 
 class GenerateWorker(QThread):
     """用于在后台生成资源包的线程"""
     progress_signal = pyqtSignal(str)
+    progress_event_signal = pyqtSignal(object)
     finished_signal = pyqtSignal(bool, str)
 
     def __init__(self, params):
         super().__init__()
         self.params = params
+        self.generator = None
+        self.cancel_requested = False
+
+    def cancel(self):
+        """请求取消（在界面线程中调用）"""
+        self.cancel_requested = True
+        generator = self.generator
+        if generator is not None:
+            generator.cancel()
 
     def run(self):
         try:
-            generator = resource_pack_generator.ResourcePackGenerator(self.params)
+            # 首次生成时才加载构建模块（及其依赖的Pillow、PyYAML），加快界面启动
+            from core.resource_pack_generator import ResourcePackGenerator
+
+            generator = ResourcePackGenerator(
+                self.params, progress_callback=self.progress_event_signal.emit
+            )
+            self.generator = generator
+            # 生成器创建之前就点击了取消
+            if self.cancel_requested:
+                generator.cancel()
             success, message = generator.generate()
+            if success:
+                for line in generator.format_report():
+                    self.progress_signal.emit(line)
             self.finished_signal.emit(success, message)
         except Exception as e:
             self.finished_signal.emit(False, f"生成过程中发生错误: {str(e)}")
 
 
+class WatchWorker(QThread):
+    """监视模式：先构建一次，之后素材变化时在后台增量重新构建，直到被取消"""
+    progress_signal = pyqtSignal(str)
+    progress_event_signal = pyqtSignal(object)
+    finished_signal = pyqtSignal(bool, str)
+
+    def __init__(self, params):
+        super().__init__()
+        self.params = params
+        self.watcher = None
+        self.cancel_requested = False
+
+    def cancel(self):
+        """停止监视（在界面线程中调用）"""
+        self.cancel_requested = True
+        watcher = self.watcher
+        if watcher is not None:
+            watcher.stop()
+
+    def on_build(self, success, message, generator, changed):
+        stamp = time.strftime('%H:%M:%S')
+        if changed:
+            names = ', '.join(os.path.basename(path) for path in changed)
+            self.progress_signal.emit(f"[{stamp}] 检测到变化: {names}")
+        if success:
+            seconds = sum(generator.stage_timings.values())
+            self.progress_signal.emit(f"[{stamp}] 资源包已更新（{seconds:.2f}s）: {message}")
+        elif not self.cancel_requested:
+            self.progress_signal.emit(f"[{stamp}] 生成失败: {message}")
+
+    def run(self):
+        try:
+            from core.watcher import PackWatcher
+
+            self.watcher = PackWatcher(self.params, on_build=self.on_build,
+                                       progress_callback=self.progress_event_signal.emit)
+            # 窗口创建监视器之前就点击了停止
+            if self.cancel_requested:
+                self.watcher.stop()
+            self.watcher.run()
+            self.finished_signal.emit(False, "已停止监视")
+        except Exception as e:
+            self.finished_signal.emit(False, f"监视过程中发生错误: {str(e)}")
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -58,6 +128,15 @@ class MainWindow(QMainWindow):
         # 设置现代化的深色主题样式
         self.setStyleSheet(DARK_THEME_STYLESHEET)
         
+        # 图像缩略图在线程池中解码，界面线程只负责显示
+        self.thumbnail_loader = ThumbnailLoader(self)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.thumbnail_loader.thumbnail_failed.connect(self.on_thumbnail_failed)
+        # 缩略图标签及其对应的路径输入框
+        self.thumbnail_labels = []
+        # 等待根据图片尺寸计算holdAtlas的路径: {路径: 'hold' 或 'hold_mh'}
+        self.pending_hold_atlas = {}
+        
         # 设置内容小部件的布局
         main_layout = QVBoxLayout(content_widget)
         main_layout.setSpacing(15)
@@ -96,6 +175,10 @@ class MainWindow(QMainWindow):
         hold_atlas_group = self.create_hold_atlas_group()
         main_layout.addWidget(hold_atlas_group)
         
+        # 构建选项组
+        build_options_group = self.create_build_options_group()
+        main_layout.addWidget(build_options_group)
+        
         # 输出路径组
         output_group = self.create_output_group()
         main_layout.addWidget(output_group)
@@ -103,6 +186,26 @@ class MainWindow(QMainWindow):
         # 控制按钮组
         button_layout = QHBoxLayout()
         
+        self.open_pack_button = QPushButton("打开资源包")
+        self.open_pack_button.setObjectName("open_pack_button")
+        self.open_pack_button.setStyleSheet("""
+            QPushButton#open_pack_button {
+                background-color: #3498db;
+                font-weight: bold;
+                min-height: 40px;
+                font-size: 14px;
+                padding: 12px 20px;
+            }
+            QPushButton#open_pack_button:hover {
+                background-color: #2980b9;
+            }
+            QPushButton#open_pack_button:pressed {
+                background-color: #2471a3;
+            }
+        """)
+        self.open_pack_button.clicked.connect(self.open_pack)
+        button_layout.addWidget(self.open_pack_button)
+        
         self.generate_button = QPushButton("开始生成")
         self.generate_button.setObjectName("generate_button")
         self.generate_button.setStyleSheet("""
@@ -123,6 +226,27 @@ class MainWindow(QMainWindow):
         self.generate_button.clicked.connect(self.start_generation)
         button_layout.addWidget(self.generate_button)
         
+        self.cancel_button = QPushButton("取消生成")
+        self.cancel_button.setObjectName("cancel_button")
+        self.cancel_button.setStyleSheet("""
+            QPushButton#cancel_button {
+                background-color: #f39c12;
+                font-weight: bold;
+                min-height: 40px;
+                font-size: 14px;
+                padding: 12px 20px;
+            }
+            QPushButton#cancel_button:hover {
+                background-color: #e67e22;
+            }
+            QPushButton#cancel_button:pressed {
+                background-color: #d35400;
+            }
+        """)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_generation)
+        button_layout.addWidget(self.cancel_button)
+        
         self.clear_button = QPushButton("清空")
         self.clear_button.setObjectName("clear_button")
         self.clear_button.setStyleSheet("""
@@ -145,6 +269,16 @@ class MainWindow(QMainWindow):
         
         main_layout.addLayout(button_layout)
         
+        # 进度条和当前阶段
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, PROGRESS_BAR_STEPS)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setTextVisible(False)
+        main_layout.addWidget(self.progress_bar)
+        self.progress_label = QLabel("")
+        main_layout.addWidget(self.progress_label)
+        self.last_progress_stage = None
+        
         # 日志输出框
         self.log_text_edit = QTextEdit()
         self.log_text_edit.setMaximumHeight(150)
@@ -261,6 +395,7 @@ class MainWindow(QMainWindow):
         self.tap_image_button.setObjectName("browse_button")
         self.tap_image_button.clicked.connect(lambda: self.browse_file(self.tap_image_line_edit, "选择Tap图像", IMAGE_FILTER))
         row1_layout.addWidget(self.tap_image_button)
+        row1_layout.addWidget(self.create_thumbnail_label(self.tap_image_line_edit))
         
         # Tap双押图像
         tap_mh_label = QLabel("Tap双押图像:")
@@ -273,6 +408,7 @@ class MainWindow(QMainWindow):
         self.tap_mh_image_button.setObjectName("browse_button")
         self.tap_mh_image_button.clicked.connect(lambda: self.browse_file(self.tap_mh_image_line_edit, "选择Tap双押图像", IMAGE_FILTER))
         row1_layout.addWidget(self.tap_mh_image_button)
+        row1_layout.addWidget(self.create_thumbnail_label(self.tap_mh_image_line_edit))
         row1_layout.addStretch()  # 添加弹性空间
         layout.addLayout(row1_layout)
         
@@ -289,6 +425,7 @@ class MainWindow(QMainWindow):
         self.drag_image_button.setObjectName("browse_button")
         self.drag_image_button.clicked.connect(lambda: self.browse_file(self.drag_image_line_edit, "选择Drag图像", IMAGE_FILTER))
         row2_layout.addWidget(self.drag_image_button)
+        row2_layout.addWidget(self.create_thumbnail_label(self.drag_image_line_edit))
         
         # Drag双押图像
         drag_mh_label = QLabel("Drag双押图像:")
@@ -301,6 +438,7 @@ class MainWindow(QMainWindow):
         self.drag_mh_image_button.setObjectName("browse_button")
         self.drag_mh_image_button.clicked.connect(lambda: self.browse_file(self.drag_mh_image_line_edit, "选择Drag双押图像", IMAGE_FILTER))
         row2_layout.addWidget(self.drag_mh_image_button)
+        row2_layout.addWidget(self.create_thumbnail_label(self.drag_mh_image_line_edit))
         row2_layout.addStretch()  # 添加弹性空间
         layout.addLayout(row2_layout)
         
@@ -317,6 +455,7 @@ class MainWindow(QMainWindow):
         self.flick_image_button.setObjectName("browse_button")
         self.flick_image_button.clicked.connect(lambda: self.browse_file(self.flick_image_line_edit, "选择Flick图像", IMAGE_FILTER))
         row3_layout.addWidget(self.flick_image_button)
+        row3_layout.addWidget(self.create_thumbnail_label(self.flick_image_line_edit))
         
         # Flick双押图像
         flick_mh_label = QLabel("Flick双押图像:")
@@ -329,6 +468,7 @@ class MainWindow(QMainWindow):
         self.flick_mh_image_button.setObjectName("browse_button")
         self.flick_mh_image_button.clicked.connect(lambda: self.browse_file(self.flick_mh_image_line_edit, "选择Flick双押图像", IMAGE_FILTER))
         row3_layout.addWidget(self.flick_mh_image_button)
+        row3_layout.addWidget(self.create_thumbnail_label(self.flick_mh_image_line_edit))
         row3_layout.addStretch()  # 添加弹性空间
         layout.addLayout(row3_layout)
         
@@ -345,6 +485,7 @@ class MainWindow(QMainWindow):
         self.hold_image_button.setObjectName("browse_button")
         self.hold_image_button.clicked.connect(lambda: self.browse_file(self.hold_image_line_edit, "选择Hold图像", IMAGE_FILTER, is_hold=True))
         row4_layout.addWidget(self.hold_image_button)
+        row4_layout.addWidget(self.create_thumbnail_label(self.hold_image_line_edit))
         
         # Hold双押图像
         hold_mh_label = QLabel("Hold双押图像:")
@@ -357,6 +498,7 @@ class MainWindow(QMainWindow):
         self.hold_mh_image_button.setObjectName("browse_button")
         self.hold_mh_image_button.clicked.connect(lambda: self.browse_file(self.hold_mh_image_line_edit, "选择Hold双押图像", IMAGE_FILTER, is_hold_mh=True))
         row4_layout.addWidget(self.hold_mh_image_button)
+        row4_layout.addWidget(self.create_thumbnail_label(self.hold_mh_image_line_edit))
         row4_layout.addStretch()  # 添加弹性空间
         layout.addLayout(row4_layout)
         
@@ -499,9 +641,24 @@ class MainWindow(QMainWindow):
         self.hit_fx_image_button.setObjectName("browse_button")
         self.hit_fx_image_button.clicked.connect(lambda: self.browse_file(self.hit_fx_image_line_edit, "选择打击特效图片", IMAGE_FILTER))
         row6_layout.addWidget(self.hit_fx_image_button)
+        row6_layout.addWidget(self.create_thumbnail_label(self.hit_fx_image_line_edit))
         row6_layout.addStretch()  # 添加弹性空间
         layout.addLayout(row6_layout)
         
+        # 第七行：打击特效帧目录（自动拼合为精灵图，行列数和帧尺寸自动推导）
+        row7_layout = QHBoxLayout()
+        label11 = QLabel("打击特效帧目录:")
+        label11.setFixedWidth(100)
+        row7_layout.addWidget(label11)
+        self.hit_fx_frames_line_edit = QLineEdit()
+        self.hit_fx_frames_line_edit.setPlaceholderText("选择包含单帧图片的目录（设置后忽略上面的网格参数和特效图片）")
+        row7_layout.addWidget(self.hit_fx_frames_line_edit)
+        self.hit_fx_frames_button = QPushButton("浏览...")
+        self.hit_fx_frames_button.setObjectName("browse_button")
+        self.hit_fx_frames_button.clicked.connect(self.browse_hit_fx_frames_directory)
+        row7_layout.addWidget(self.hit_fx_frames_button)
+        layout.addLayout(row7_layout)
+        
         group.setLayout(layout)
         return group
     
@@ -541,6 +698,184 @@ class MainWindow(QMainWindow):
         group.setLayout(layout)
         return group
     
+    def create_thumbnail_label(self, line_edit):
+        """创建显示路径输入框中图片缩略图的标签，路径变化时自动刷新"""
+        label = QLabel()
+        label.setFixedSize(THUMBNAIL_SIZE + 4, THUMBNAIL_SIZE + 4)
+        label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        label.setStyleSheet("border: 1px solid #34495e; border-radius: 4px;")
+        self.thumbnail_labels.append((label, line_edit))
+        line_edit.textChanged.connect(lambda text: self.request_thumbnail(label, text.strip()))
+        return label
+    
+    def request_thumbnail(self, label, path):
+        """清空旧的缩略图并在后台加载新的"""
+        label.clear()
+        label.setToolTip("")
+        if path:
+            self.thumbnail_loader.request(path)
+    
+    def on_thumbnail_ready(self, path, image, source_size):
+        """缩略图解码完成：显示在路径相同的所有输入框旁，并按需计算holdAtlas"""
+        pixmap = None
+        for label, line_edit in self.thumbnail_labels:
+            if line_edit.text().strip() == path:
+                if pixmap is None:
+                    pixmap = QPixmap.fromImage(image)
+                label.setPixmap(pixmap)
+                label.setToolTip(f"{source_size[0]}x{source_size[1]}")
+        
+        target = self.pending_hold_atlas.pop(path, None)
+        if target is not None:
+            self.set_hold_atlas_from_size(target, *source_size)
+    
+    def on_thumbnail_failed(self, path, message):
+        """图片无法解码：提示错误，待计算的holdAtlas使用默认值"""
+        for label, line_edit in self.thumbnail_labels:
+            if line_edit.text().strip() == path:
+                label.setText("?")
+                label.setToolTip(message)
+        
+        target = self.pending_hold_atlas.pop(path, None)
+        if target is not None:
+            self.log_text_edit.append(f"无法读取图像文件: {message}")
+            # 如果读取失败，使用默认值
+            if target == 'hold':
+                self.hold_atlas_x_spinbox.setValue(DEFAULT_HOLD_ATLAS[0])
+                self.hold_atlas_y_spinbox.setValue(DEFAULT_HOLD_ATLAS[1])
+            else:
+                self.hold_atlas_mh_x_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[0])
+                self.hold_atlas_mh_y_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[1])
+    
+    def set_hold_atlas_from_size(self, target, width, height):
+        """以图片中心作为atlas坐标"""
+        # 计算中心坐标，作为atlas坐标
+        center_x = width // 2
+        center_y = height // 2
+        
+        # 限制在合理范围内
+        center_x = min(center_x, 200)
+        center_y = min(center_y, 200)
+        
+        if target == 'hold':
+            # 设置holdAtlas坐标
+            self.hold_atlas_x_spinbox.setValue(center_x)
+            self.hold_atlas_y_spinbox.setValue(center_y)
+        else:
+            # 设置holdAtlasMH坐标
+            self.hold_atlas_mh_x_spinbox.setValue(center_x)
+            self.hold_atlas_mh_y_spinbox.setValue(center_y)
+    
+    def closeEvent(self, event):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        self.thumbnail_loader.shutdown()
+        super().closeEvent(event)
+    
+    def create_toggle_button(self, checked):
+        """创建与“特效可旋转”相同样式的是/否开关按钮"""
+        button = QPushButton("是" if checked else "否")
+        button.setCheckable(True)
+        button.setChecked(checked)
+        button.clicked.connect(lambda: button.setText("是" if button.isChecked() else "否"))
+        button.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                border: 2px solid #c0392b;
+                color: white;
+                padding: 8px 16px;
+                border-radius: 6px;
+                font-weight: bold;
+                min-width: 60px;
+            }
+            QPushButton:checked {
+                background-color: #2ecc71;
+                border: 2px solid #27ae60;
+            }
+        """)
+        return button
+    
+    def create_build_options_group(self):
+        group = QGroupBox("构建选项")
+        group_layout = QVBoxLayout()
+        
+        # 第一行：各处理阶段的开关
+        layout = QHBoxLayout()
+        
+        # PNG无损优化
+        label = QLabel("PNG无损优化:")
+        label.setFixedWidth(100)
+        layout.addWidget(label)
+        self.optimize_png_toggle = self.create_toggle_button(DEFAULT_OPTIMIZE_PNG)
+        layout.addWidget(self.optimize_png_toggle)
+        
+        # 裁剪透明边距
+        label = QLabel("裁剪透明边距:")
+        label.setFixedWidth(100)
+        layout.addWidget(label)
+        self.trim_transparent_toggle = self.create_toggle_button(DEFAULT_TRIM_TRANSPARENT)
+        self.trim_transparent_toggle.setToolTip("裁掉音符纹理上下完全透明的行，Hold纹理同步调整holdAtlas")
+        layout.addWidget(self.trim_transparent_toggle)
+        
+        # 打击音预处理
+        label = QLabel("打击音预处理:")
+        label.setFixedWidth(100)
+        layout.addWidget(label)
+        self.process_hit_sounds_toggle = self.create_toggle_button(DEFAULT_PROCESS_HIT_SOUNDS)
+        self.process_hit_sounds_toggle.setToolTip("WAV打击音：去除首尾静音、峰值归一化、混为单声道并重采样")
+        layout.addWidget(self.process_hit_sounds_toggle)
+        
+        # 可复现构建
+        label = QLabel("可复现构建:")
+        label.setFixedWidth(100)
+        layout.addWidget(label)
+        self.reproducible_toggle = self.create_toggle_button(DEFAULT_REPRODUCIBLE)
+        self.reproducible_toggle.setToolTip("条目排序、固定时间戳和权限，相同输入生成逐字节相同的资源包")
+        layout.addWidget(self.reproducible_toggle)
+        
+        layout.addStretch()  # 添加弹性空间
+        group_layout.addLayout(layout)
+        
+        # 第二行：纹理尺寸预算
+        row2_layout = QHBoxLayout()
+        label = QLabel("纹理最大边长:")
+        label.setFixedWidth(100)
+        row2_layout.addWidget(label)
+        self.texture_max_edge_spinbox = QSpinBox()
+        self.texture_max_edge_spinbox.setRange(0, 8192)
+        self.texture_max_edge_spinbox.setSpecialValueText("不限制")
+        self.texture_max_edge_spinbox.setValue(DEFAULT_TEXTURE_MAX_EDGE)
+        row2_layout.addWidget(self.texture_max_edge_spinbox)
+        
+        label = QLabel("尺寸取2的幂:")
+        label.setFixedWidth(100)
+        row2_layout.addWidget(label)
+        self.texture_pot_toggle = self.create_toggle_button(DEFAULT_TEXTURE_POT)
+        self.texture_pot_toggle.setToolTip("等比缩小使宽度为2的幂，并在上下补透明行；打击特效不做调整")
+        row2_layout.addWidget(self.texture_pot_toggle)
+        
+        label = QLabel("显存上限(MB):")
+        label.setFixedWidth(100)
+        row2_layout.addWidget(label)
+        self.texture_vram_budget_spinbox = QSpinBox()
+        self.texture_vram_budget_spinbox.setRange(0, 4096)
+        self.texture_vram_budget_spinbox.setSpecialValueText("不限制")
+        self.texture_vram_budget_spinbox.setValue(DEFAULT_TEXTURE_VRAM_BUDGET // (1024 * 1024))
+        row2_layout.addWidget(self.texture_vram_budget_spinbox)
+        
+        label = QLabel("监视模式:")
+        label.setFixedWidth(100)
+        row2_layout.addWidget(label)
+        self.watch_toggle = self.create_toggle_button(False)
+        self.watch_toggle.setToolTip("生成后继续监视所有素材，文件保存后自动增量重新生成，直到点击停止监视")
+        row2_layout.addWidget(self.watch_toggle)
+        row2_layout.addStretch()  # 添加弹性空间
+        group_layout.addLayout(row2_layout)
+        
+        group.setLayout(group_layout)
+        return group
+    
     def create_output_group(self):
         group = QGroupBox("输出设置")
         layout = QHBoxLayout()
@@ -565,38 +900,48 @@ class MainWindow(QMainWindow):
             line_edit.setText(file_path)
             
             # 如果是hold或hold_mh图像，则自动计算atlas坐标
+            # 图片尺寸由缩略图加载线程读取，读取完成后在on_thumbnail_ready中设置
             if is_hold or is_hold_mh:
-                try:
-                    # 获取图像尺寸
-                    with Image.open(file_path) as img:
-                        width, height = img.size
-                        
-                        # 计算中心坐标，作为atlas坐标
-                        center_x = width // 2
-                        center_y = height // 2
-                        
-                        # 限制在合理范围内
-                        center_x = min(center_x, 200)
-                        center_y = min(center_y, 200)
-                        
-                        if is_hold:
-                            # 设置holdAtlas坐标
-                            self.hold_atlas_x_spinbox.setValue(center_x)
-                            self.hold_atlas_y_spinbox.setValue(center_y)
-                        elif is_hold_mh:
-                            # 设置holdAtlasMH坐标
-                            self.hold_atlas_mh_x_spinbox.setValue(center_x)
-                            self.hold_atlas_mh_y_spinbox.setValue(center_y)
-                            
-                except Exception as e:
-                    print(f"无法读取图像文件: {e}")
-                    # 如果读取失败，使用默认值
-                    if is_hold:
-                        self.hold_atlas_x_spinbox.setValue(DEFAULT_HOLD_ATLAS[0])
-                        self.hold_atlas_y_spinbox.setValue(DEFAULT_HOLD_ATLAS[1])
-                    elif is_hold_mh:
-                        self.hold_atlas_mh_x_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[0])
-                        self.hold_atlas_mh_y_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[1])
+                self.pending_hold_atlas[file_path] = 'hold' if is_hold else 'hold_mh'
+                # setText可能没有触发刷新（路径未变化），这里再请求一次，已缓存时会立即完成
+                if not self.thumbnail_loader.request(file_path):
+                    self.on_thumbnail_failed(file_path, "文件不存在")
+    
+    def open_pack(self):
+        """打开已有的资源包：只读取info.yml和目录，条目以惰性引用填入各输入框，重新生成时原样复制"""
+        zip_path, _ = QFileDialog.getOpenFileName(self, "打开资源包", "", PACK_FILTER)
+        if not zip_path:
+            return
+        try:
+            opened = read_pack(zip_path)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"无法打开资源包：{e}")
+            return
+        self.load_params(opened.params)
+        if not self.output_path_line_edit.text().strip():
+            self.output_path_line_edit.setText(os.path.dirname(opened.zip_path))
+        for line in opened.format_report():
+            self.log_text_edit.append(line)
+    
+    def load_params(self, params):
+        """把参数填入界面，params中没有的键保持当前值"""
+        for key in ('name', 'author'):
+            if key in params:
+                getattr(self, f"{key}_line_edit").setText(params[key])
+        if 'description' in params:
+            self.description_text_edit.setPlainText(params['description'])
+        # 素材路径：资源包中没有的素材清空，避免混入之前填写的文件
+        for key in list(AUDIO_MAPPINGS) + list(IMAGE_MAPPINGS) + ['hit_fx_image']:
+            getattr(self, f"{key}_line_edit").setText(params.get(key, ''))
+        self.hit_fx_frames_line_edit.clear()
+        for key in ('fx_cols', 'fx_rows', 'fx_total_width', 'fx_total_height', 'fx_frame_width',
+                    'fx_frame_height', 'fx_duration', 'fx_scale', 'hold_atlas_x', 'hold_atlas_y',
+                    'hold_atlas_mh_x', 'hold_atlas_mh_y'):
+            if key in params:
+                getattr(self, f"{key}_spinbox").setValue(params[key])
+        if 'fx_rotate' in params:
+            self.fx_rotate_checkbox.setChecked(bool(params['fx_rotate']))
+            self.fx_rotate_checkbox.setText("是" if params['fx_rotate'] else "否")
     
     def browse_output_directory(self):
         """浏览输出目录对话框"""
@@ -606,6 +951,14 @@ class MainWindow(QMainWindow):
         if directory:
             self.output_path_line_edit.setText(directory)
     
+    def browse_hit_fx_frames_directory(self):
+        """浏览打击特效帧目录对话框"""
+        directory = QFileDialog.getExistingDirectory(
+            self, "选择打击特效帧目录", ""
+        )
+        if directory:
+            self.hit_fx_frames_line_edit.setText(directory)
+    
     def start_generation(self):
         """开始生成资源包"""
         # 收集所有参数
@@ -638,13 +991,24 @@ class MainWindow(QMainWindow):
             'fx_scale': self.fx_scale_spinbox.value(),
             'fx_rotate': self.fx_rotate_checkbox.isChecked(),
             'hit_fx_image': self.hit_fx_image_line_edit.text().strip(),
+            'hit_fx_frames': self.hit_fx_frames_line_edit.text().strip(),
             
             'hold_atlas_x': self.hold_atlas_x_spinbox.value(),
             'hold_atlas_y': self.hold_atlas_y_spinbox.value(),
             'hold_atlas_mh_x': self.hold_atlas_mh_x_spinbox.value(),
             'hold_atlas_mh_y': self.hold_atlas_mh_y_spinbox.value(),
             
-            'output_path': self.output_path_line_edit.text().strip()
+            'optimize_png': self.optimize_png_toggle.isChecked(),
+            'trim_transparent': self.trim_transparent_toggle.isChecked(),
+            'texture_max_edge': self.texture_max_edge_spinbox.value(),
+            'texture_pot': self.texture_pot_toggle.isChecked(),
+            'texture_vram_budget': self.texture_vram_budget_spinbox.value() * 1024 * 1024,
+            'process_hit_sounds': self.process_hit_sounds_toggle.isChecked(),
+            'reproducible': self.reproducible_toggle.isChecked(),
+            
+            'output_path': self.output_path_line_edit.text().strip(),
+            'cache_dir': DEFAULT_CACHE_DIR,
+            'incremental': True
         }
         
         # 验证必要参数
@@ -657,11 +1021,20 @@ class MainWindow(QMainWindow):
             
         # 禁用生成按钮，防止重复点击
         self.generate_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText("")
+        self.last_progress_stage = None
         self.log_text_edit.append("开始生成资源包...")
         
         # 创建并启动工作线程
-        self.worker = GenerateWorker(params)
+        if self.watch_toggle.isChecked():
+            self.cancel_button.setText("停止监视")
+            self.worker = WatchWorker(params)
+        else:
+            self.worker = GenerateWorker(params)
         self.worker.progress_signal.connect(self.update_log)
+        self.worker.progress_event_signal.connect(self.update_progress)
         self.worker.finished_signal.connect(self.on_generation_finished)
         self.worker.start()
     
@@ -669,11 +1042,34 @@ class MainWindow(QMainWindow):
         """更新日志"""
         self.log_text_edit.append(message)
     
+    def update_progress(self, event):
+        """根据ProgressEvent更新进度条、当前阶段文字，阶段切换时记录日志"""
+        self.progress_bar.setValue(int(event.fraction * PROGRESS_BAR_STEPS))
+        self.progress_label.setText(str(event))
+        if event.stage != self.last_progress_stage:
+            self.last_progress_stage = event.stage
+            if event.stage != 'done':
+                self.log_text_edit.append(f"[{event.stage_index + 1}/{event.stage_count}] {event.stage_label}")
+    
+    def cancel_generation(self):
+        """取消正在进行的生成"""
+        if self.worker is not None and self.worker.isRunning():
+            self.cancel_button.setEnabled(False)
+            self.log_text_edit.append("正在停止监视..." if isinstance(self.worker, WatchWorker) else "正在取消...")
+            self.worker.cancel()
+    
     def on_generation_finished(self, success, message):
         """生成完成回调"""
         self.generate_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setText("取消生成")
+        if not success:
+            self.progress_bar.setValue(0)
         self.log_text_edit.append(message)
         
+        if not success and self.worker.cancel_requested:
+            # 用户主动取消，不弹出错误提示
+            return
         if success:
             QMessageBox.information(self, "成功", f"资源包生成成功！\n位置：{message}")
         else:
@@ -718,6 +1114,7 @@ class MainWindow(QMainWindow):
             self.fx_rotate_checkbox.setChecked(DEFAULT_FX_ROTATE)
             self.fx_rotate_checkbox.setText("是")
             self.hit_fx_image_line_edit.clear()
+            self.hit_fx_frames_line_edit.clear()
             
             # 重置Hold Atlas参数
             self.hold_atlas_x_spinbox.setValue(DEFAULT_HOLD_ATLAS[0])
@@ -725,5 +1122,21 @@ class MainWindow(QMainWindow):
             self.hold_atlas_mh_x_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[0])
             self.hold_atlas_mh_y_spinbox.setValue(DEFAULT_HOLD_ATLAS_MH[1])
             
+            # 重置构建选项
+            self.optimize_png_toggle.setChecked(DEFAULT_OPTIMIZE_PNG)
+            self.optimize_png_toggle.setText("是" if DEFAULT_OPTIMIZE_PNG else "否")
+            self.trim_transparent_toggle.setChecked(DEFAULT_TRIM_TRANSPARENT)
+            self.trim_transparent_toggle.setText("是" if DEFAULT_TRIM_TRANSPARENT else "否")
+            self.texture_max_edge_spinbox.setValue(DEFAULT_TEXTURE_MAX_EDGE)
+            self.texture_pot_toggle.setChecked(DEFAULT_TEXTURE_POT)
+            self.texture_pot_toggle.setText("是" if DEFAULT_TEXTURE_POT else "否")
+            self.texture_vram_budget_spinbox.setValue(DEFAULT_TEXTURE_VRAM_BUDGET // (1024 * 1024))
+            self.process_hit_sounds_toggle.setChecked(DEFAULT_PROCESS_HIT_SOUNDS)
+            self.process_hit_sounds_toggle.setText("是" if DEFAULT_PROCESS_HIT_SOUNDS else "否")
+            self.reproducible_toggle.setChecked(DEFAULT_REPRODUCIBLE)
+            self.reproducible_toggle.setText("是" if DEFAULT_REPRODUCIBLE else "否")
+            self.watch_toggle.setChecked(False)
+            self.watch_toggle.setText("否")
+            
             self.log_text_edit.clear()
             self.log_text_edit.append("已清空所有字段")
\ No newline at end of file
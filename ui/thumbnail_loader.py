@@ -0,0 +1,133 @@
+"""
+图像缩略图的后台加载
+在线程池中解码（JPEG使用draft按缩小的尺寸解码），结果按 (路径, 修改时间) 放入有内存上限的LRU缓存，
+界面线程只负责把解码好的QImage显示出来
+路径也可以是已有资源包中条目的惰性引用（core.pack_reader），此时在线程池中才解压该条目
+"""
+from collections import OrderedDict
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QImage
+from config.constants import THUMBNAIL_SIZE, THUMBNAIL_CACHE_MAX_BYTES, THUMBNAIL_WORKERS
+from core.pack_reader import open_asset, asset_mtime_ns
+
+
+class ThumbnailCache:
+    """
+    缩略图LRU缓存，按QImage占用的字节数限制总大小
+    只在界面线程中访问
+    """
+    def __init__(self, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key, image, source_size):
+        cost = image.sizeInBytes()
+        if cost > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[0].sizeInBytes()
+        self._items[key] = (image, source_size)
+        self.total_bytes += cost
+        while self.total_bytes > self.max_bytes:
+            _, (evicted, _) = self._items.popitem(last=False)
+            self.total_bytes -= evicted.sizeInBytes()
+
+
+class _ThumbnailSignals(QObject):
+    # 路径, 修改时间（纳秒，超出C++ int范围，用object传递）, QImage, 原图尺寸 (宽, 高)
+    finished = pyqtSignal(str, object, object, object)
+    # 路径, 修改时间, 错误信息
+    failed = pyqtSignal(str, object, str)
+
+
+class _ThumbnailTask(QRunnable):
+    """在线程池中解码一张图片并生成缩略图"""
+    def __init__(self, path, mtime_ns, size):
+        super().__init__()
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.signals = _ThumbnailSignals()
+
+    def run(self):
+        try:
+            from PIL import Image
+
+            with open_asset(self.path) as fp, Image.open(fp) as img:
+                source_size = img.size
+                # 对JPEG直接按接近目标的尺寸解码，4K图片也只需解码很小的数据量
+                img.draft('RGB', (self.size, self.size))
+                img.thumbnail((self.size, self.size))
+                thumb = img.convert('RGBA')
+            data = thumb.tobytes()
+            # copy()使QImage拥有自己的数据，不再引用Python的bytes对象
+            image = QImage(data, thumb.width, thumb.height, thumb.width * 4,
+                           QImage.Format.Format_RGBA8888).copy()
+        except Exception as e:
+            self.signals.failed.emit(self.path, self.mtime_ns, str(e))
+            return
+        self.signals.finished.emit(self.path, self.mtime_ns, image, source_size)
+
+
+class ThumbnailLoader(QObject):
+    """
+    按路径请求缩略图
+    已缓存时立即发出thumbnail_ready，否则提交到线程池，解码完成后在界面线程中发出
+    """
+    # 路径, QImage, 原图尺寸 (宽, 高)
+    thumbnail_ready = pyqtSignal(str, object, object)
+    # 路径, 错误信息
+    thumbnail_failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None, size=THUMBNAIL_SIZE, max_bytes=THUMBNAIL_CACHE_MAX_BYTES,
+                 workers=THUMBNAIL_WORKERS):
+        super().__init__(parent)
+        self.size = size
+        self.cache = ThumbnailCache(max_bytes)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self._pending = set()
+
+    def request(self, path):
+        """请求一张缩略图；文件不存在时返回False"""
+        try:
+            mtime_ns = asset_mtime_ns(path)
+        except OSError:
+            return False
+        key = (path, mtime_ns)
+        cached = self.cache.get(key)
+        if cached is not None:
+            image, source_size = cached
+            self.thumbnail_ready.emit(path, image, source_size)
+            return True
+        if key in self._pending:
+            return True
+
+        self._pending.add(key)
+        task = _ThumbnailTask(path, mtime_ns, self.size)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self.pool.start(task)
+        return True
+
+    def _on_finished(self, path, mtime_ns, image, source_size):
+        self._pending.discard((path, mtime_ns))
+        self.cache.put((path, mtime_ns), image, source_size)
+        self.thumbnail_ready.emit(path, image, source_size)
+
+    def _on_failed(self, path, mtime_ns, message):
+        self._pending.discard((path, mtime_ns))
+        self.thumbnail_failed.emit(path, message)
+
+    def shutdown(self):
+        """等待正在解码的任务结束（窗口关闭时调用）"""
+        self.pool.clear()
+        self.pool.waitForDone()